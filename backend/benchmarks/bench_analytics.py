@@ -0,0 +1,157 @@
+"""Detailed analytics latency: Python-side counting vs aggregation pipelines.
+
+Seeds a scratch MongoDB database (dropped afterwards) and times the old
+load-everything implementation against ``/api/analytics/detailed``. The old
+version is run without its 1000-document cap so both see the full data.
+
+    MONGO_URL=mongodb://localhost:27017 python backend/benchmarks/bench_analytics.py --passengers 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def build_data(airports: int, flights: int, passengers: int, seed: int):
+    rng = random.Random(seed)
+    codes = [f"A{i:04d}" for i in range(airports)]
+    airport_docs = [{"code": code, "name": f"Airport {code}", "city": code} for code in codes]
+    flight_docs = []
+    for i in range(flights):
+        source, destination = rng.sample(codes, 2)
+        flight_docs.append({
+            "flight_id": f"FL{i:05d}",
+            "source_code": source,
+            "destination_code": destination,
+            "departure_time": f"{rng.randrange(24):02d}:{rng.randrange(0, 60, 5):02d}",
+            "total_seats": 180,
+            "booked_seats": 0
+        })
+    passenger_docs = []
+    queue_docs = []
+    for i in range(passengers):
+        flight = rng.choice(flight_docs)
+        status = rng.choices(["pending", "boarded", "cancelled"], weights=[6, 3, 1])[0]
+        ticket_id = f"TKT{i:08d}"
+        passenger_docs.append({
+            "ticket_id": ticket_id,
+            "name": f"Passenger {i}",
+            "passport": f"P{i:08d}",
+            "flight_id": flight['flight_id'],
+            "seat_number": "1A",
+            "status": status
+        })
+        if status != "cancelled":
+            flight['booked_seats'] += 1
+        if status == "pending" and rng.random() < 0.2:
+            queue_docs.append({"ticket_id": ticket_id, "passenger_name": f"Passenger {i}",
+                               "flight_id": flight['flight_id'], "position": i})
+    return airport_docs, flight_docs, passenger_docs, queue_docs
+
+
+async def legacy_detailed_analytics(store):
+    """The pre-aggregation implementation, uncapped"""
+    airports = await store.airports.all()
+    flights = await store.flights.all()
+    passengers = await store.passengers.all()
+    status_counts = {
+        "pending": sum(1 for p in passengers if p['status'] == 'pending'),
+        "boarded": sum(1 for p in passengers if p['status'] == 'boarded'),
+        "cancelled": sum(1 for p in passengers if p['status'] == 'cancelled')
+    }
+    flight_occupancy = []
+    for flight in flights:
+        occupancy_rate = (flight['booked_seats'] / flight['total_seats'] * 100) if flight['total_seats'] > 0 else 0
+        flight_occupancy.append({
+            "flight_id": flight['flight_id'],
+            "route": f"{flight['source_code']}-{flight['destination_code']}",
+            "booked": flight['booked_seats'],
+            "total": flight['total_seats'],
+            "occupancy": round(occupancy_rate, 2)
+        })
+    airport_stats = []
+    for airport in airports:
+        departures = sum(1 for f in flights if f['source_code'] == airport['code'])
+        arrivals = sum(1 for f in flights if f['destination_code'] == airport['code'])
+        airport_stats.append({
+            "code": airport['code'],
+            "name": airport['name'],
+            "departures": departures,
+            "arrivals": arrivals,
+            "total_flights": departures + arrivals
+        })
+    all_queues = await store.boarding_queue.all()
+    queue_by_flight = {}
+    for item in all_queues:
+        queue_by_flight[item['flight_id']] = queue_by_flight.get(item['flight_id'], 0) + 1
+    return {
+        "status_distribution": status_counts,
+        "flight_occupancy": sorted(flight_occupancy, key=lambda x: x['occupancy'], reverse=True),
+        "airport_statistics": sorted(airport_stats, key=lambda x: x['total_flights'], reverse=True),
+        "queue_statistics": queue_by_flight,
+        "total_revenue": len([p for p in passengers if p['status'] != 'cancelled']) * 5000,
+        "cancellation_rate": round((status_counts['cancelled'] / len(passengers) * 100) if passengers else 0, 2)
+    }
+
+
+async def timed(fn, runs: int):
+    timings = []
+    result = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = await fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return result, timings
+
+
+async def run(args):
+    os.environ["DB_NAME"] = args.db_name
+    import server  # noqa: E402  (reads DB_NAME at import)
+
+    store = server.store
+    await store.drop()
+    started = time.perf_counter()
+    airports, flights, passengers, queues = build_data(args.airports, args.flights, args.passengers, args.seed)
+    await store.airports.insert_many(airports)
+    await store.flights.insert_many(flights)
+    for start in range(0, len(passengers), 10000):
+        await store.passengers.insert_many(passengers[start:start + 10000])
+    if queues:
+        await store.boarding_queue.insert_many(queues)
+    print(f"seeded {len(airports)} airports / {len(flights)} flights / {len(passengers)} passengers "
+          f"/ {len(queues)} queued in {time.perf_counter() - started:.2f}s")
+
+    try:
+        legacy, legacy_times = await timed(lambda: legacy_detailed_analytics(store), args.runs)
+        current, current_times = await timed(server.get_detailed_analytics, args.runs)
+        same = (legacy['status_distribution'] == current['status_distribution']
+                and legacy['queue_statistics'] == current['queue_statistics']
+                and legacy['total_revenue'] == current['total_revenue'])
+        print(f"{'implementation':<16}{'mean ms':>10}{'p50 ms':>10}{'max ms':>10}")
+        for name, timings in (("python", legacy_times), ("aggregation", current_times)):
+            print(f"{name:<16}{statistics.mean(timings):>10.1f}"
+                  f"{statistics.median(timings):>10.1f}{max(timings):>10.1f}")
+        print(f"results match: {same}")
+    finally:
+        await store.drop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--airports", type=int, default=200)
+    parser.add_argument("--flights", type=int, default=2000)
+    parser.add_argument("--passengers", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--db-name", default="bench_analytics")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
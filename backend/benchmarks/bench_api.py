@@ -0,0 +1,311 @@
+"""Per-route latency and throughput of the API, driven in process.
+
+Seeds synthetic airports, flights, passengers, queues and cancellations,
+runs the app's startup hooks, then sends each route a fixed number of
+requests through ``httpx.ASGITransport`` with ``--concurrency`` in flight.
+No server process or network hop is involved, so the numbers are the
+app and its storage. Reports requests/s and p50/p95/p99 per route.
+
+Storage is the in-process memory backend by default; ``--backend mongo``
+uses MONGO_URL with a scratch database that is dropped afterwards. The
+response cache is disabled unless ``--cache`` is given, so every read
+hits storage.
+
+    python backend/benchmarks/bench_api.py --passengers 100000 --save-baseline baseline.json
+    python backend/benchmarks/bench_api.py --passengers 100000 --baseline baseline.json
+
+With ``--baseline``, the run exits non-zero if any route's p50, p95 or p99
+is slower than the baseline by more than ``--tolerance`` (and by at least
+``--min-delta-ms``), if its throughput drops by the same factor, or if it
+returns more error responses than it did in the baseline.
+Destructive and streaming routes (reset, initialize, import, restore,
+deletes, exports, /events) are not benchmarked.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from itertools import count
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+LATENCY_METRICS = ("p50", "p95", "p99")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def build_data(args, seat_label):
+    rng = random.Random(args.seed)
+    codes = [f"A{i:04d}" for i in range(args.airports)]
+    airports = [{"id": f"ap-{i}", "code": code, "name": f"Airport {code}", "city": f"City {i % 97}"}
+                for i, code in enumerate(codes)]
+    flights = []
+    for i in range(args.flights):
+        source, destination = rng.sample(codes, 2)
+        flights.append({
+            "id": f"fl-{i}", "flight_id": f"FL{i:05d}", "source_code": source, "destination_code": destination,
+            "departure_time": f"{rng.randrange(24):02d}:{rng.randrange(0, 60, 5):02d}",
+            "duration_minutes": rng.randrange(45, 600, 5), "total_seats": 180, "booked_seats": 0
+        })
+    # Leave a third of every flight free for the booking workload
+    capacity = len(flights) * 120
+    if args.passengers > capacity:
+        raise SystemExit(f"--passengers exceeds seeded capacity ({capacity}); raise --flights")
+    passengers = []
+    for i in range(args.passengers):
+        flight = flights[i % len(flights)]
+        passengers.append({
+            "ticket_id": f"TKT{i:08X}", "name": f"Passenger {i}", "passport": f"P{i:08d}",
+            "flight_id": flight['flight_id'], "seat_number": seat_label(flight['booked_seats']),
+            "status": "pending"
+        })
+        flight['booked_seats'] += 1
+    return airports, flights, passengers
+
+
+async def seed(server, args):
+    from seat_map import seat_label
+
+    per_route = args.warmup + args.requests
+    if args.passengers < args.queued + 2 * per_route:
+        raise SystemExit("--passengers must cover --queued plus enqueue and cancellation pools "
+                         "of --warmup + --requests each")
+    airports, flights, passengers = build_data(args, seat_label)
+    rng = random.Random(args.seed + 1)
+    pending = passengers[:]
+    rng.shuffle(pending)
+    queued = pending[:args.queued]
+    enqueue_pool = pending[args.queued:args.queued + per_route]
+    cancel_pool = pending[args.queued + per_route:args.queued + 2 * per_route]
+
+    store = server.store
+    await store.airports.insert_many(airports)
+    await store.flights.insert_many(flights)
+    for start in range(0, len(passengers), 10000):
+        await store.passengers.insert_many(passengers[start:start + 10000])
+    positions = {}
+    queue_items = []
+    for passenger in queued:
+        position = positions.get(passenger['flight_id'], 0)
+        positions[passenger['flight_id']] = position + 1
+        queue_items.append({"ticket_id": passenger['ticket_id'], "passenger_name": passenger['name'],
+                            "flight_id": passenger['flight_id'], "position": position})
+    if queue_items:
+        await store.boarding_queue.insert_many(queue_items)
+    history = passengers[:args.cancellations]
+    if history:
+        await store.cancellations.insert_many([
+            {"ticket_id": f"OLD{i:08X}", "passenger_name": p['name'], "flight_id": p['flight_id'],
+             "timestamp": f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}+00:00"}
+            for i, p in enumerate(history)
+        ])
+    for handler in server.app.router.on_startup:
+        await handler()
+
+    return {
+        "codes": [a['code'] for a in airports],
+        "flight_ids": [f['flight_id'] for f in flights],
+        "tickets": [p['ticket_id'] for p in passengers],
+        "queued_flights": sorted(positions),
+        "enqueue": [(p['flight_id'], p['ticket_id']) for p in enqueue_pool],
+        "cancel": [p['ticket_id'] for p in cancel_pool],
+        "free_seats": {f['flight_id']: f['booked_seats'] for f in flights},
+        "seat_label": seat_label
+    }
+
+
+def build_routes(state, rng):
+    """Route name -> callable returning (method, path, params, json) for the i-th request"""
+    codes, flight_ids, tickets = state["codes"], state["flight_ids"], state["tickets"]
+    queued = state["queued_flights"] or flight_ids
+    enqueue, cancel = iter(state["enqueue"]), iter(state["cancel"])
+    booking = count()
+
+    def book(i):
+        flight_id = flight_ids[next(booking) % len(flight_ids)]
+        seat = state["free_seats"][flight_id]
+        state["free_seats"][flight_id] += 1
+        return ("POST", "/api/passengers", None, {"name": f"Bench {i}", "passport": f"B{i:08d}",
+                                                  "flight_id": flight_id, "seat_number": state["seat_label"](seat)})
+
+    def queue_next(i):
+        flight_id, ticket_id = next(enqueue)
+        return ("POST", f"/api/boarding-queue/{flight_id}/enqueue", {"ticket_id": ticket_id}, None)
+
+    def clock():
+        return f"{rng.randrange(24):02d}:{rng.randrange(60):02d}"
+
+    return {
+        "GET /airports": lambda i: ("GET", "/api/airports", None, None),
+        "GET /flights?limit=100": lambda i: ("GET", "/api/flights", {"limit": 100}, None),
+        "GET /passengers?flight_id": lambda i: ("GET", "/api/passengers",
+                                                {"flight_id": rng.choice(flight_ids), "limit": 100}, None),
+        "GET /passengers/search/{id}": lambda i: ("GET", f"/api/passengers/search/{rng.choice(tickets)}", None, None),
+        "GET /passengers/hash-table/stats": lambda i: ("GET", "/api/passengers/hash-table/stats", None, None),
+        "GET /flights/{id}/seats": lambda i: ("GET", f"/api/flights/{rng.choice(flight_ids)}/seats", None, None),
+        "GET /flights/{id}/seats/next": lambda i: ("GET", f"/api/flights/{rng.choice(flight_ids)}/seats/next",
+                                                   {"count": 3}, None),
+        "GET /graph/adjacency-list": lambda i: ("GET", "/api/graph/adjacency-list", None, None),
+        "GET /graph/bfs/{a}/{b}": lambda i: ("GET", "/api/graph/bfs/{}/{}".format(*rng.sample(codes, 2)), None, None),
+        "GET /graph/itinerary/{a}/{b}": lambda i: ("GET", "/api/graph/itinerary/{}/{}".format(*rng.sample(codes, 2)),
+                                                   None, None),
+        "GET /boarding-queue/{id}": lambda i: ("GET", f"/api/boarding-queue/{rng.choice(queued)}", {"limit": 50}, None),
+        "GET /cancellations?limit=100": lambda i: ("GET", "/api/cancellations", {"limit": 100}, None),
+        "GET /scheduler/next": lambda i: ("GET", "/api/scheduler/next", {"k": 10, "after": clock()}, None),
+        "GET /analytics": lambda i: ("GET", "/api/analytics", None, None),
+        "GET /analytics/detailed": lambda i: ("GET", "/api/analytics/detailed", None, None),
+        "GET /dashboard/snapshot": lambda i: ("GET", "/api/dashboard/snapshot",
+                                              {"sections": "analytics,cancellations,boarding_queues"}, None),
+        "POST /passengers": book,
+        "POST /boarding-queue/{id}/enqueue": queue_next,
+        "POST /boarding-queue/{id}/dequeue": lambda i: ("POST", f"/api/boarding-queue/{queued[i % len(queued)]}/dequeue",
+                                                        None, None),
+        "POST /cancellations/push": lambda i: ("POST", "/api/cancellations/push", {"ticket_id": next(cancel)}, None),
+        "POST /cancellations/pop": lambda i: ("POST", "/api/cancellations/pop", None, None),
+    }
+
+
+async def drive(client, make_request, first: int, total: int, concurrency: int):
+    """Send requests `first`.. `first + total - 1` with at most `concurrency` in flight.
+
+    Returns the timings, the number of error responses and the wall time.
+    """
+    timings, errors = [], 0
+    issued = count(first)
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(issued)
+            if i >= first + total:
+                return
+            method, path, params, body = make_request(i)
+            t0 = time.perf_counter()
+            response = await client.request(method, path, params=params, json=body)
+            timings.append((time.perf_counter() - t0) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return timings, errors, time.perf_counter() - started
+
+
+def compare(results, baseline, tolerance: float, min_delta_ms: float):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        # A route that starts failing may well get faster, so errors are checked on their own
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name}: {current['errors']} errors > baseline {previous.get('errors', 0)}")
+        for metric in LATENCY_METRICS:
+            allowed = max(previous[metric] * (1 + tolerance), previous[metric] + min_delta_ms)
+            if current[metric] > allowed:
+                regressions.append(f"{name}: {metric} {current[metric]:.2f} ms > {allowed:.2f} ms "
+                                   f"(baseline {previous[metric]:.2f} ms)")
+        if current["rps"] < previous["rps"] / (1 + tolerance):
+            regressions.append(f"{name}: {current['rps']:.0f} req/s < baseline {previous['rps']:.0f} req/s "
+                               f"/ {1 + tolerance:.2f}")
+    return regressions
+
+
+async def run(args):
+    os.environ["STORAGE_BACKEND"] = args.backend
+    os.environ["DB_NAME"] = args.db_name
+    import server  # noqa: E402  (reads STORAGE_BACKEND and DB_NAME at import)
+
+    logging.getLogger("server").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if not args.cache:
+        server.response_cache.max_bytes = 0
+
+    await server.store.drop()
+    started = time.perf_counter()
+    state = await seed(server, args)
+    print(f"seeded {args.airports} airports / {args.flights} flights / {args.passengers} passengers / "
+          f"{args.queued} queued ({args.backend}) in {time.perf_counter() - started:.2f}s")
+
+    routes = build_routes(state, random.Random(args.seed + 2))
+    if args.routes:
+        wanted = [pattern.strip() for pattern in args.routes.split(",")]
+        routes = {name: route for name, route in routes.items() if any(pattern in name for pattern in wanted)}
+
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            print(f"{'route':<36}{'reqs':>7}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+            for name, route in routes.items():
+                # Untimed warm-up so lazily built state (index orders, seat maps) is not charged to the run
+                await drive(client, route, 0, args.warmup, args.concurrency)
+                timings, errors, elapsed = await drive(client, route, args.warmup, args.requests, args.concurrency)
+                results[name] = {
+                    "requests": len(timings),
+                    "errors": errors,
+                    "rps": round(len(timings) / elapsed, 1),
+                    **{metric: round(percentile(timings, int(metric[1:])), 3) for metric in LATENCY_METRICS}
+                }
+                row = results[name]
+                print(f"{name:<36}{row['requests']:>7}{errors:>8}{row['rps']:>10.0f}"
+                      f"{row['p50']:>10.2f}{row['p95']:>10.2f}{row['p99']:>10.2f}")
+    finally:
+        if args.backend == "mongo":
+            await server.store.drop()
+
+    config = {key: getattr(args, key) for key in
+              ("backend", "airports", "flights", "passengers", "queued", "cancellations",
+               "warmup", "requests", "concurrency", "cache")}
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps({"config": config, "results": results}, indent=2) + "\n")
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        stored = json.loads(Path(args.baseline).read_text())
+        if stored.get("config") != config:
+            print(f"baseline was recorded with different settings: {stored.get('config')}")
+            return 2
+        regressions = compare(results, stored["results"], args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("memory", "mongo"), default="memory")
+    parser.add_argument("--db-name", default="bench_api")
+    parser.add_argument("--airports", type=int, default=200)
+    parser.add_argument("--flights", type=int, default=2000)
+    parser.add_argument("--passengers", type=int, default=100000)
+    parser.add_argument("--queued", type=int, default=5000)
+    parser.add_argument("--cancellations", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per route")
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--routes", help="comma-separated substrings selecting routes to run")
+    parser.add_argument("--cache", action="store_true", help="leave the response cache enabled")
+    parser.add_argument("--baseline", help="fail if results regress against this baseline file")
+    parser.add_argument("--save-baseline", help="write this run's results as a baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=7)
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
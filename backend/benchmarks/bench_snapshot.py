@@ -0,0 +1,125 @@
+"""Snapshot save/restore throughput against the NDJSON export format.
+
+Generates synthetic collections in memory (no MongoDB needed) and times
+serialising them to disk and reading them back as documents, once as a
+columnar snapshot and once as the line-per-document JSON export.
+
+    python backend/benchmarks/bench_snapshot.py --passengers 1000000
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from snapshot import INT_COLUMN, STRING_COLUMN, SnapshotReader, SnapshotWriter  # noqa: E402
+
+SCHEMAS = {
+    "airports": {"id": STRING_COLUMN, "code": STRING_COLUMN, "name": STRING_COLUMN, "city": STRING_COLUMN},
+    "flights": {"id": STRING_COLUMN, "flight_id": STRING_COLUMN, "source_code": STRING_COLUMN,
+                "destination_code": STRING_COLUMN, "departure_time": STRING_COLUMN,
+                "duration_minutes": INT_COLUMN, "total_seats": INT_COLUMN, "booked_seats": INT_COLUMN},
+    "passengers": {"ticket_id": STRING_COLUMN, "name": STRING_COLUMN, "passport": STRING_COLUMN,
+                   "flight_id": STRING_COLUMN, "seat_number": STRING_COLUMN, "status": STRING_COLUMN}
+}
+
+
+def build_data(airports: int, flights: int, passengers: int, seed: int):
+    rng = random.Random(seed)
+    codes = [f"A{i:04d}" for i in range(airports)]
+    data = {
+        "airports": [{"id": f"ap-{i}", "code": code, "name": f"Airport {code}", "city": f"City {i % 97}"}
+                     for i, code in enumerate(codes)],
+        "flights": [],
+        "passengers": []
+    }
+    for i in range(flights):
+        source, destination = rng.sample(codes, 2)
+        data["flights"].append({
+            "id": f"fl-{i}", "flight_id": f"FL{i:05d}", "source_code": source, "destination_code": destination,
+            "departure_time": f"{rng.randrange(24):02d}:{rng.randrange(0, 60, 5):02d}",
+            "duration_minutes": rng.randrange(45, 600, 5), "total_seats": 180, "booked_seats": 0
+        })
+    for i in range(passengers):
+        data["passengers"].append({
+            "ticket_id": f"TKT{i:08X}", "name": f"Passenger {i}", "passport": f"P{i:08d}",
+            "flight_id": f"FL{rng.randrange(flights):05d}",
+            "seat_number": f"{rng.randrange(1, 31)}{'ABCDEF'[rng.randrange(6)]}",
+            "status": rng.choice(["pending", "pending", "boarded", "cancelled"])
+        })
+    return data
+
+
+def save_snapshot(data, path: Path):
+    writer = SnapshotWriter()
+    for name, docs in data.items():
+        table = writer.table(name, SCHEMAS[name])
+        for start in range(0, len(docs), 1000):
+            table.extend(docs[start:start + 1000])
+    path.write_bytes(writer.to_bytes())
+
+
+def restore_snapshot(path: Path, batch_size: int) -> int:
+    rows = 0
+    with SnapshotReader(path) as reader:
+        for name in reader.table_names():
+            for batch in reader.rows(name, batch_size):
+                rows += len(batch)
+    return rows
+
+
+def save_ndjson(data, path: Path):
+    with open(path, "w") as out:
+        for name, docs in data.items():
+            for doc in docs:
+                out.write(json.dumps({"collection": name, "data": doc}) + "\n")
+
+
+def restore_ndjson(path: Path, batch_size: int) -> int:
+    rows = 0
+    batch = []
+    with open(path) as source:
+        for line in source:
+            batch.append(json.loads(line)["data"])
+            if len(batch) >= batch_size:
+                rows += len(batch)
+                batch = []
+    return rows + len(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--airports", type=int, default=500)
+    parser.add_argument("--flights", type=int, default=10000)
+    parser.add_argument("--passengers", type=int, default=500000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    data = build_data(args.airports, args.flights, args.passengers, args.seed)
+    total = sum(len(docs) for docs in data.values())
+    print(f"{total} documents ({args.passengers} passengers)")
+    print(f"{'format':<10}{'MB':>9}{'save s':>9}{'save rows/s':>14}{'restore s':>11}{'restore rows/s':>16}")
+    with tempfile.TemporaryDirectory() as scratch:
+        for label, save, restore, filename in (
+            ("snapshot", save_snapshot, restore_snapshot, "state.snap"),
+            ("ndjson", save_ndjson, restore_ndjson, "state.ndjson")
+        ):
+            path = Path(scratch) / filename
+            t0 = time.perf_counter()
+            save(data, path)
+            saved = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            rows = restore(path, args.batch_size)
+            restored = time.perf_counter() - t0
+            assert rows == total, (label, rows, total)
+            print(f"{label:<10}{path.stat().st_size / 1e6:>9.1f}{saved:>9.2f}{total / saved:>14,.0f}"
+                  f"{restored:>11.2f}{total / restored:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""All-pairs hop distances and reachability over the route graph.
+
+Distances are computed per connected component and cached. Small
+components get a dense matrix from boolean frontier products; large ones
+are answered one origin row at a time with vectorised BFS sweeps over the
+CSR arrays. Route graph mutations only drop the components they touch.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from route_graph import RouteGraph
+
+# Components up to this many airports get a full dense matrix
+DENSE_COMPONENT_LIMIT = 512
+UNREACHABLE = -1
+# Cached distances are stored as int16 to halve memory; hop counts never get close
+CACHE_DTYPE = np.int16
+
+
+def bfs_hops(offsets: np.ndarray, targets: np.ndarray, source: int) -> np.ndarray:
+    """Hop distance from ``source`` to every node, ``-1`` when unreachable"""
+    dist = np.full(len(offsets) - 1, UNREACHABLE, dtype=np.int32)
+    dist[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    level = 0
+    while frontier.size:
+        level += 1
+        starts = offsets[frontier]
+        counts = offsets[frontier + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            break
+        # Gather every neighbour of the frontier in one indexed read
+        shift = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        neighbors = targets[shift + np.arange(total)]
+        neighbors = np.unique(neighbors[dist[neighbors] < 0])
+        dist[neighbors] = level
+        frontier = neighbors
+    return dist
+
+
+def component_labels(offsets: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Label every node with the smallest node id in its connected component"""
+    size = len(offsets) - 1
+    sources = np.repeat(np.arange(size), np.diff(offsets))
+    labels = np.arange(size)
+    while True:
+        merged = labels.copy()
+        np.minimum.at(merged, sources, labels[targets])
+        merged = merged[merged]
+        if np.array_equal(merged, labels):
+            return labels
+        labels = merged
+
+
+def dense_hops(adjacency: np.ndarray) -> np.ndarray:
+    """All-pairs hop distances for a small component from its 0/1 matrix"""
+    size = adjacency.shape[0]
+    dist = np.full((size, size), UNREACHABLE, dtype=CACHE_DTYPE)
+    np.fill_diagonal(dist, 0)
+    reached = np.eye(size, dtype=bool)
+    frontier = np.eye(size, dtype=np.float32)
+    level = 0
+    while True:
+        level += 1
+        step = (frontier @ adjacency) > 0
+        step &= ~reached
+        if not step.any():
+            return dist
+        dist[step] = level
+        reached |= step
+        frontier = step.astype(np.float32)
+
+
+class _Component:
+    """Cached distances for one connected component"""
+
+    __slots__ = ("codes", "dense", "rows")
+
+    def __init__(self, codes: List[str]):
+        self.codes = codes
+        self.dense: Optional[np.ndarray] = None
+        # Origin code -> distances in ``codes`` order (large components only)
+        self.rows: Dict[str, np.ndarray] = {}
+
+
+class HopDistanceIndex:
+    """Per-component hop distance cache kept in step with a RouteGraph"""
+
+    def __init__(self, graph: RouteGraph, dense_limit: int = DENSE_COMPONENT_LIMIT):
+        self.graph = graph
+        self.dense_limit = dense_limit
+        self._components: Dict[str, _Component] = {}
+        self._dirty: Optional[set] = None
+        self._csr_version = -1
+        self._offsets = self._targets = None
+        graph.subscribe(self._invalidate)
+
+    def _invalidate(self, codes: Optional[Iterable[str]]):
+        if codes is None:
+            self._components = {}
+            self._dirty = None
+            self._csr_version = -1
+            return
+        if self._dirty is None:
+            self._dirty = set()
+        self._dirty.update(codes)
+
+    def _refresh(self):
+        """Relabel components and keep cached ones no mutation touched"""
+        csr = self.graph.csr()
+        if self._csr_version == self.graph.version:
+            return csr
+        offsets = np.frombuffer(csr.offsets, dtype=np.int32).astype(np.int64)
+        targets = np.frombuffer(csr.targets, dtype=np.int32).astype(np.int64)
+        dirty = self._dirty or set()
+        previous = self._components
+        components: Dict[str, _Component] = {}
+        labels = component_labels(offsets, targets)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.flatnonzero(np.diff(labels[order])) + 1
+        for members in np.split(order, bounds) if len(order) else []:
+            codes = [csr.codes[i] for i in members]
+            cached = previous.get(codes[0])
+            if cached is not None and not dirty.intersection(codes) and len(cached.codes) == len(codes):
+                component = cached
+            else:
+                component = _Component(codes)
+            for code in codes:
+                components[code] = component
+        self._components = components
+        self._dirty = set()
+        self._offsets, self._targets = offsets, targets
+        self._csr_version = self.graph.version
+        return csr
+
+    def _component_rows(self, component: _Component, origins: List[str], csr) -> Dict[str, np.ndarray]:
+        if len(component.codes) <= self.dense_limit:
+            if component.dense is None:
+                members = np.array([csr.index[code] for code in component.codes], dtype=np.int64)
+                local = np.full(len(csr.codes), -1, dtype=np.int64)
+                local[members] = np.arange(len(members))
+                adjacency = np.zeros((len(members), len(members)), dtype=np.float32)
+                for i, node in enumerate(members):
+                    neighbors = self._targets[self._offsets[node]:self._offsets[node + 1]]
+                    adjacency[i, local[neighbors]] = 1
+                component.dense = dense_hops(adjacency)
+            position = {code: i for i, code in enumerate(component.codes)}
+            return {origin: component.dense[position[origin]] for origin in origins}
+        members = None
+        for origin in origins:
+            if origin not in component.rows:
+                if members is None:
+                    members = np.array([csr.index[code] for code in component.codes], dtype=np.int64)
+                full = bfs_hops(self._offsets, self._targets, csr.index[origin])
+                component.rows[origin] = full[members].astype(CACHE_DTYPE)
+        return {origin: component.rows[origin] for origin in origins}
+
+    def distances(self, origins: Optional[List[str]] = None) -> Dict:
+        """Hop distances from ``origins`` (default: every airport) to every airport.
+
+        Returns the airport column order, one row per origin with ``-1`` for
+        unreachable airports, and the number of connected components.
+        """
+        csr = self._refresh()
+        if origins is None:
+            origins = list(csr.codes)
+        by_component: Dict[int, List[str]] = {}
+        for origin in origins:
+            by_component.setdefault(id(self._components[origin]), []).append(origin)
+
+        rows = {}
+        for grouped in by_component.values():
+            component = self._components[grouped[0]]
+            columns = np.array([csr.index[code] for code in component.codes], dtype=np.int64)
+            for origin, local_row in self._component_rows(component, grouped, csr).items():
+                row = np.full(len(csr.codes), UNREACHABLE, dtype=CACHE_DTYPE)
+                row[columns] = local_row
+                rows[origin] = row
+
+        return {
+            "airports": list(csr.codes),
+            "origins": origins,
+            "matrix": np.stack([rows[origin] for origin in origins]) if origins else
+                      np.empty((0, len(csr.codes)), dtype=CACHE_DTYPE),
+            "components": len({id(component) for component in self._components.values()})
+        }
@@ -0,0 +1,109 @@
+"""Resizable separate-chaining hash table keyed by strings.
+
+Backs the resident ticket index: lookups hash once with ``zlib.crc32``
+(deterministic across processes, unlike ``hash()``) and scan one short
+chain. When the load factor passes ``max_load`` the table doubles and
+rehashes, which keeps chains O(1) on average.
+"""
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_SIZE = 16
+DEFAULT_MAX_LOAD = 0.75
+
+
+def bucket_of(key: str, size: int) -> int:
+    return zlib.crc32(key.encode("utf-8")) % size
+
+
+class HashTable:
+    """String-keyed hash table with load-factor driven rehashing"""
+
+    def __init__(self, initial_size: int = DEFAULT_SIZE, max_load: float = DEFAULT_MAX_LOAD):
+        if initial_size < 1:
+            raise ValueError("initial_size must be at least 1")
+        if max_load <= 0:
+            raise ValueError("max_load must be positive")
+        self.initial_size = initial_size
+        self.max_load = max_load
+        self._buckets: List[List[Tuple[str, Any]]] = [[] for _ in range(initial_size)]
+        self._count = 0
+        self.resizes = 0
+        # Bumped on every change, so views of the table can be cached against it
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    @property
+    def size(self) -> int:
+        return len(self._buckets)
+
+    @property
+    def load_factor(self) -> float:
+        return self._count / len(self._buckets)
+
+    def clear(self):
+        self._buckets = [[] for _ in range(self.initial_size)]
+        self._count = 0
+        self.version += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        for entry_key, value in self._buckets[bucket_of(key, len(self._buckets))]:
+            if entry_key == key:
+                return value
+        return None
+
+    def put(self, key: str, value: Any):
+        """Insert or replace ``key``"""
+        self.version += 1
+        chain = self._buckets[bucket_of(key, len(self._buckets))]
+        for i, (entry_key, _) in enumerate(chain):
+            if entry_key == key:
+                chain[i] = (key, value)
+                return
+        chain.append((key, value))
+        self._count += 1
+        if self._count > self.max_load * len(self._buckets):
+            self._resize(len(self._buckets) * 2)
+
+    def remove(self, key: str) -> bool:
+        chain = self._buckets[bucket_of(key, len(self._buckets))]
+        for i, (entry_key, _) in enumerate(chain):
+            if entry_key == key:
+                chain.pop(i)
+                self._count -= 1
+                self.version += 1
+                return True
+        return False
+
+    def _resize(self, size: int):
+        buckets: List[List[Tuple[str, Any]]] = [[] for _ in range(size)]
+        for chain in self._buckets:
+            for entry in chain:
+                buckets[bucket_of(entry[0], size)].append(entry)
+        self._buckets = buckets
+        self.resizes += 1
+
+    def buckets(self) -> Iterator[Tuple[int, List[Tuple[str, Any]]]]:
+        """``(bucket index, chain)`` for every bucket"""
+        return enumerate(self._buckets)
+
+    def stats(self) -> Dict:
+        """Chain-length aggregates rather than the table contents"""
+        histogram: Dict[int, int] = {}
+        for chain in self._buckets:
+            histogram[len(chain)] = histogram.get(len(chain), 0) + 1
+        return {
+            "size": len(self._buckets),
+            "entries": self._count,
+            "load_factor": round(self.load_factor, 4),
+            "max_load": self.max_load,
+            "max_chain": max(histogram),
+            "empty_buckets": histogram.get(0, 0),
+            "chain_histogram": dict(sorted(histogram.items())),
+            "resizes": self.resizes
+        }
@@ -0,0 +1,231 @@
+"""Time-dependent itinerary search over the resident route graph.
+
+Flights repeat daily at their ``departure_time``. A connection is viable
+when it departs at least ``min_connection`` minutes after the previous leg
+lands; the search bisects into each airport's time-sorted departure list so
+it only ever looks at departures that can actually be caught, in the order
+they leave.
+"""
+import heapq
+from bisect import bisect_left
+from itertools import count
+from typing import Dict, List, Optional
+
+from route_graph import MINUTES_PER_DAY, RouteEdge, RouteGraph
+
+OBJECTIVES = ("earliest_arrival", "fewest_hops", "least_layover")
+
+
+def format_minutes(minutes: int) -> str:
+    """Format absolute minutes as an "HH:MM" time of day"""
+    minutes %= MINUTES_PER_DAY
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _viable_departures(graph: RouteGraph, node: int, ready: int, max_wait: int):
+    """Yield ``(departure, edge)`` for flights leaving ``node`` at or after
+    ``ready`` (absolute minutes), in departure order, for up to ``max_wait``
+    minutes. Each daily flight is yielded at most once.
+    """
+    minutes, edges = graph.departures(node)
+    total = len(minutes)
+    if not total:
+        return
+    day_start = ready - ready % MINUTES_PER_DAY
+    start = bisect_left(minutes, ready % MINUTES_PER_DAY)
+    for i in range(total):
+        idx = start + i
+        if idx < total:
+            departure = day_start + minutes[idx]
+        else:
+            idx -= total
+            departure = day_start + MINUTES_PER_DAY + minutes[idx]
+        if departure - ready > max_wait:
+            return
+        yield departure, edges[idx]
+
+
+def _by_airport(graph, src, dst, depart_after, min_connection, by_hops):
+    """Label-setting search with one label per airport.
+
+    Exact for earliest arrival and fewest hops when layovers are uncapped:
+    waiting is always allowed, so arriving earlier (or in fewer hops) at an
+    airport never hurts later legs. The secondary criterion only breaks ties
+    between labels at the same airport. This is the cheap path for the
+    common query.
+    """
+    tie = count()
+    best = {src: (0, depart_after) if by_hops else (depart_after, 0)}
+    via = {}
+    heap = [(best[src], next(tie), src, depart_after, 0)]
+    settled = set()
+    while heap:
+        key, _, node, arrival, hops = heapq.heappop(heap)
+        if node in settled:
+            continue
+        settled.add(node)
+        if node == dst:
+            break
+        ready = arrival if node == src else arrival + min_connection
+        # Uncapped waits reach every daily departure once, so walk the
+        # timetable directly from the first catchable slot, wrapping midnight
+        minutes, edges = graph.departures(node)
+        offset = ready % MINUTES_PER_DAY
+        first = bisect_left(minutes, offset)
+        day_start = ready - offset
+        for base, lo, hi in ((day_start, first, len(minutes)), (day_start + MINUTES_PER_DAY, 0, first)):
+            for idx in range(lo, hi):
+                edge = edges[idx]
+                nxt = edge.v
+                if nxt in settled:
+                    continue
+                landed = base + minutes[idx] + edge.duration
+                label = (hops + 1, landed) if by_hops else (landed, hops + 1)
+                # Nothing worse than the best label already at the destination can win
+                if dst in best and label >= best[dst]:
+                    continue
+                if nxt not in best or label < best[nxt]:
+                    best[nxt] = label
+                    via[nxt] = (node, edge, base + minutes[idx])
+                    heapq.heappush(heap, (label, next(tie), nxt, landed, hops + 1))
+    if dst not in settled:
+        return None
+    legs = []
+    node = dst
+    while node != src:
+        prev, edge, departure = via[node]
+        legs.append((edge, departure))
+        node = prev
+    legs.reverse()
+    return legs
+
+
+def _label(objective: str, landed: int, hops: int, layover: int) -> tuple:
+    if objective == "fewest_hops":
+        return (hops, landed)
+    if objective == "least_layover":
+        return (layover, landed)
+    return (landed, hops)
+
+
+def _by_flight(graph, src, dst, depart_after, min_connection, max_wait, objective):
+    """Label-setting search with one label per flight.
+
+    Used for least layover, which is not monotone in arrival time (landing
+    later can mean a shorter wait), and whenever layovers are capped, since
+    then arriving earlier can rule out a later connection. A flight always
+    lands at the same time of day, so its best label decides everything
+    that can follow it.
+    """
+    tie = count()
+    best: Dict[str, tuple] = {}
+    via: Dict[str, tuple] = {}
+    heap = []
+    incumbent = None
+    for departure, edge in _viable_departures(graph, src, depart_after, MINUTES_PER_DAY):
+        landed = departure + edge.duration
+        label = _label(objective, landed, 1, 0)
+        if edge.v == dst and (incumbent is None or label < incumbent):
+            incumbent = label
+        best[edge.key] = label
+        via[edge.key] = (None, departure)
+        heapq.heappush(heap, (label, next(tie), edge, landed, 1, 0))
+    settled = set()
+    found: Optional[RouteEdge] = None
+    while heap:
+        _, _, edge, landed, hops, layover = heapq.heappop(heap)
+        if edge.key in settled:
+            continue
+        settled.add(edge.key)
+        if edge.v == dst:
+            found = edge
+            break
+        for departure, nxt in _viable_departures(graph, edge.v, landed + min_connection, max_wait):
+            if nxt.key in settled:
+                continue
+            wait = departure - landed
+            label = _label(objective, departure + nxt.duration, hops + 1, layover + wait)
+            if incumbent is not None and label >= incumbent:
+                continue
+            if nxt.key not in best or label < best[nxt.key]:
+                if nxt.v == dst:
+                    incumbent = label
+                best[nxt.key] = label
+                via[nxt.key] = (edge, departure)
+                heapq.heappush(heap, (label, next(tie), nxt, departure + nxt.duration,
+                                      hops + 1, layover + wait))
+    if found is None:
+        return None
+    legs = []
+    edge = found
+    while edge is not None:
+        prev, departure = via[edge.key]
+        legs.append((edge, departure))
+        edge = prev
+    legs.reverse()
+    return legs
+
+
+def plan_itinerary(
+    graph: RouteGraph,
+    start: str,
+    end: str,
+    depart_after: int = 0,
+    min_connection: int = 45,
+    objective: str = "earliest_arrival",
+    max_layover: Optional[int] = None,
+) -> Optional[Dict]:
+    """Find the best itinerary from ``start`` to ``end``.
+
+    ``depart_after`` is minutes after midnight on day 0. ``max_layover``
+    caps the wait at connecting airports (defaults to a full day, i.e. any
+    connection). Returns ``None`` when no itinerary exists.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective}")
+    src = graph.node_id(start)
+    dst = graph.node_id(end)
+    if src is None or dst is None:
+        raise KeyError(start if src is None else end)
+    if src == dst:
+        return None
+    if objective == "least_layover" or max_layover is not None:
+        max_wait = MINUTES_PER_DAY if max_layover is None else max_layover
+        legs = _by_flight(graph, src, dst, depart_after, min_connection, max_wait, objective)
+    else:
+        legs = _by_airport(graph, src, dst, depart_after, min_connection,
+                           by_hops=objective == "fewest_hops")
+    if legs is None:
+        return None
+
+    itinerary: List[Dict] = []
+    layover_total = 0
+    previous_landing = None
+    for edge, departure in legs:
+        landed = departure + edge.duration
+        layover = departure - previous_landing if previous_landing is not None else 0
+        layover_total += layover
+        itinerary.append({
+            "flight_id": edge.flight_id,
+            "source": graph.code(edge.u),
+            "destination": graph.code(edge.v),
+            "departure_time": format_minutes(departure),
+            "departure_day": departure // MINUTES_PER_DAY,
+            "arrival_time": format_minutes(landed),
+            "arrival_day": landed // MINUTES_PER_DAY,
+            "duration_minutes": edge.duration,
+            "layover_minutes": layover
+        })
+        previous_landing = landed
+
+    first_departure = legs[0][1]
+    return {
+        "itinerary": itinerary,
+        "objective": objective,
+        "hops": len(itinerary),
+        "departure_time": itinerary[0]["departure_time"],
+        "arrival_time": itinerary[-1]["arrival_time"],
+        "arrival_day": itinerary[-1]["arrival_day"],
+        "total_minutes": previous_landing - first_departure,
+        "layover_minutes": layover_total
+    }
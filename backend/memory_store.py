@@ -0,0 +1,749 @@
+"""In-memory repositories, selected with ``STORAGE_BACKEND=memory``.
+
+The same repositories as ``mongo_store`` over plain Python structures, for
+running the API and its test suite without MongoDB and for what-if
+simulations at memory speed:
+
+- airports, flights and passengers are dicts keyed by their natural id,
+  with the secondary lookups the endpoints need (passport, flight) kept
+  alongside;
+- each flight's boarding queue is a deque in line order;
+- cancellations are a list used as a stack.
+
+No method awaits, so each call runs to completion before another request
+gets a turn and is as atomic as the single MongoDB update it stands in
+for. Documents are copied on the way in and out, so callers never hold a
+reference into the store. Write methods bump ``versions`` like their
+MongoDB counterparts.
+"""
+import functools
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from itertools import count, islice
+from operator import itemgetter
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+
+from seat_map import bits_by_word
+
+_position = itemgetter('position')
+
+
+def _copy(doc: Dict, keep_id: bool = False) -> Dict:
+    """Copy a stored document one level deep, normally without its _id"""
+    copied = {}
+    for key, value in doc.items():
+        if key == '_id' and not keep_id:
+            continue
+        if isinstance(value, list):
+            value = list(value)
+        elif isinstance(value, dict):
+            value = dict(value)
+        copied[key] = value
+    return copied
+
+
+def _matches(doc: Dict, filters: Dict[str, Any]) -> bool:
+    return all(doc.get(key) == value for key, value in filters.items())
+
+
+class VersionRepository:
+    """Change counters by collection name; the generation is new with every store"""
+
+    def __init__(self):
+        self._versions: Dict[str, Any] = {"generation": uuid.uuid4().hex}
+
+    async def bump(self, names: tuple):
+        for name in names:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    async def read(self) -> Dict[str, Any]:
+        return dict(self._versions)
+
+
+def _writes(method):
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            await self.versions.bump((self.name,))
+    return wrapper
+
+
+class _Rows:
+    """Documents in ascending ``_id`` order, seekable for keyset pages"""
+
+    def __init__(self):
+        self.docs: Dict[int, Dict] = {}
+        # Ascending ids, including some deleted since the last compaction
+        self._ids: List[int] = []
+        self._next_id = count(1)
+        self.last_id: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, doc: Dict) -> Dict:
+        doc['_id'] = self.last_id = next(self._next_id)
+        self.docs[doc['_id']] = doc
+        self._ids.append(doc['_id'])
+        return doc
+
+    def remove(self, doc: Dict):
+        del self.docs[doc['_id']]
+        if len(self._ids) > 2 * len(self.docs) + 64:
+            self._ids = list(self.docs)
+
+    def after(self, last_id: Optional[int]) -> Iterator[Dict]:
+        start = 0 if last_id is None else bisect_right(self._ids, last_id)
+        for i in range(start, len(self._ids)):
+            doc = self.docs.get(self._ids[i])
+            if doc is not None:
+                yield doc
+
+    def clear(self):
+        self.docs = {}
+        self._ids = []
+
+
+class MemoryRepository:
+    """Documents keyed by a unique natural key; subclasses keep extra lookups in `_index`/`_unindex`"""
+
+    name = ""
+    sort: List[tuple] = [("_id", 1)]
+    keys: tuple = ()
+
+    def __init__(self, versions: VersionRepository):
+        self.versions = versions
+        self.rows = _Rows()
+        self._by_key: Dict[tuple, Dict] = {}
+
+    def _key(self, doc: Dict) -> tuple:
+        return tuple(doc.get(key) for key in self.keys)
+
+    def _index(self, doc: Dict):
+        pass
+
+    def _unindex(self, doc: Dict):
+        pass
+
+    def _find(self, *key) -> Optional[Dict]:
+        return self._by_key.get(key)
+
+    def _add(self, doc: Dict) -> bool:
+        key = self._key(doc)
+        if key in self._by_key:
+            return False
+        doc = self.rows.add(_copy(doc))
+        self._by_key[key] = doc
+        self._index(doc)
+        return True
+
+    def _remove(self, doc: Dict):
+        self._unindex(doc)
+        del self._by_key[self._key(doc)]
+        self.rows.remove(doc)
+
+    def _candidates(self, filters: Dict[str, Any], last_id: Optional[int]) -> Iterator[Dict]:
+        """Documents past `last_id` in _id order, at least those matching `filters`"""
+        return self.rows.after(last_id)
+
+    async def page(self, filters: Dict[str, Any], fields: List[str], limit: Optional[int],
+                   after: Optional[List]) -> Tuple[List[Dict], Optional[List]]:
+        docs = []
+        for doc in self._candidates(filters, after[0] if after else None):
+            if _matches(doc, filters):
+                docs.append(doc)
+                if limit is not None and len(docs) > limit:
+                    break
+        if limit is None or len(docs) <= limit:
+            return [_copy(doc, keep_id=True) for doc in docs], None
+        docs = [_copy(doc, keep_id=True) for doc in docs[:limit]]
+        return docs, [docs[-1][key] for key, _ in self.sort]
+
+    async def all(self, limit: Optional[int] = None) -> List[Dict]:
+        return [_copy(doc) for doc in islice(self.rows.docs.values(), limit)]
+
+    async def scan(self, batch_size: int = 1000, until: Any = None) -> AsyncIterator[Dict]:
+        # Listed up front: the consumer may await, and writes in between must not break iteration
+        for doc in list(self.rows.docs.values()):
+            if until is None or doc['_id'] <= until:
+                yield _copy(doc)
+
+    async def high_water(self) -> Any:
+        return self.rows.last_id if len(self.rows) else None
+
+    async def count(self) -> int:
+        return len(self.rows)
+
+    @_writes
+    async def clear(self):
+        self.rows.clear()
+        self._by_key = {}
+
+    @_writes
+    async def insert_many(self, docs: List[Dict], ordered: bool = True) -> List[Tuple[int, str]]:
+        errors = []
+        for idx, doc in enumerate(docs):
+            if not self._add(doc):
+                errors.append((idx, f"Duplicate key {dict(zip(self.keys, self._key(doc)))}"))
+                if ordered:
+                    break
+        return errors
+
+    @_writes
+    async def upsert_many(self, docs: List[Dict]) -> List[Tuple[int, str]]:
+        for doc in docs:
+            existing = self._by_key.get(self._key(doc))
+            if existing is None:
+                self._add(doc)
+                continue
+            self._unindex(existing)
+            existing.update(_copy(doc))
+            self._index(existing)
+        return []
+
+    async def get(self, *key) -> Optional[Dict]:
+        doc = self._find(*key)
+        return _copy(doc) if doc else None
+
+    @_writes
+    async def insert(self, doc: Dict) -> bool:
+        return self._add(doc)
+
+
+class AirportRepository(MemoryRepository):
+    name = "airports"
+    keys = ("code",)
+
+    @_writes
+    async def delete(self, code: str) -> bool:
+        airport = self._find(code)
+        if airport is None:
+            return False
+        self._remove(airport)
+        return True
+
+
+class FlightRepository(MemoryRepository):
+    name = "flights"
+    keys = ("flight_id",)
+
+    async def get_many(self, flight_ids: List[str]) -> Dict[str, Dict]:
+        return {flight_id: _copy(self._find(flight_id)) for flight_id in flight_ids if self._find(flight_id)}
+
+    @_writes
+    async def delete(self, flight_id: str) -> Optional[Dict]:
+        flight = self._find(flight_id)
+        if flight is None:
+            return None
+        self._remove(flight)
+        return _copy(flight)
+
+    async def first_departure(self) -> Optional[Dict]:
+        flight = min(self.rows.docs.values(), key=itemgetter('departure_time'), default=None)
+        if flight is None:
+            return None
+        summary = _copy(flight)
+        summary.pop('seat_words', None)
+        return summary
+
+    async def seat_totals(self, flight_ids: Optional[List[str]] = None, only_missing: bool = False) -> Dict[str, int]:
+        flights = self.rows.docs.values() if flight_ids is None else filter(None, map(self._find, flight_ids))
+        return {
+            flight['flight_id']: flight['total_seats']
+            for flight in flights
+            if not (only_missing and 'seat_words' in flight)
+        }
+
+    @_writes
+    async def set_inventory(self, flight_id: str, seat_words: List[int], booked_seats: int, only_missing: bool = False):
+        flight = self._find(flight_id)
+        if flight is None or (only_missing and 'seat_words' in flight):
+            return
+        flight['seat_words'] = list(seat_words)
+        flight['booked_seats'] = booked_seats
+
+    @_writes
+    async def reserve_seats(self, flight_id: str, seats: List[Optional[int]]) -> bool:
+        flight = self._find(flight_id)
+        if flight is None or flight['booked_seats'] + len(seats) > flight['total_seats']:
+            return False
+        masks = {word: sum(1 << bit for bit in bits)
+                 for word, bits in bits_by_word([seat for seat in seats if seat is not None]).items()}
+        words = flight.get('seat_words')
+        if masks and (words is None or any(word >= len(words) or words[word] & mask for word, mask in masks.items())):
+            return False
+        for word, mask in masks.items():
+            words[word] |= mask
+        flight['booked_seats'] += len(seats)
+        return True
+
+    @_writes
+    async def release_seats(self, flight_id: str, seats: List[Optional[int]]):
+        flight = self._find(flight_id)
+        if flight is None or flight['booked_seats'] < len(seats):
+            return
+        flight['booked_seats'] -= len(seats)
+        words = flight.get('seat_words') or []
+        for word, bits in bits_by_word([seat for seat in seats if seat is not None]).items():
+            if word < len(words):
+                words[word] &= ~sum(1 << bit for bit in bits)
+
+    async def occupancy(self) -> List[Dict]:
+        rows = []
+        for flight in self.rows.docs.values():
+            total, booked = flight['total_seats'], flight['booked_seats']
+            rows.append((flight['_id'], {
+                "flight_id": flight['flight_id'],
+                "route": f"{flight['source_code']}-{flight['destination_code']}",
+                "booked": booked,
+                "total": total,
+                "occupancy": booked / total * 100 if total > 0 else 0
+            }))
+        rows.sort(key=lambda row: (-row[1]['occupancy'], row[0]))
+        return [row for _, row in rows]
+
+    async def route_counts(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        flights = self.rows.docs.values()
+        return (dict(Counter(flight['source_code'] for flight in flights)),
+                dict(Counter(flight['destination_code'] for flight in flights)))
+
+
+class PassengerRepository(MemoryRepository):
+    name = "passengers"
+    keys = ("ticket_id",)
+
+    def __init__(self, versions: VersionRepository):
+        super().__init__(versions)
+        # passport / flight_id -> {_id: passenger}, each in insertion order
+        self._by_passport: Dict[str, Dict[int, Dict]] = {}
+        self._by_flight: Dict[str, Dict[int, Dict]] = {}
+
+    def _index(self, doc: Dict):
+        self._by_passport.setdefault(doc.get('passport'), {})[doc['_id']] = doc
+        self._by_flight.setdefault(doc.get('flight_id'), {})[doc['_id']] = doc
+
+    def _unindex(self, doc: Dict):
+        for lookup, key in ((self._by_passport, doc.get('passport')), (self._by_flight, doc.get('flight_id'))):
+            lookup[key].pop(doc['_id'], None)
+            if not lookup[key]:
+                del lookup[key]
+
+    def _candidates(self, filters: Dict[str, Any], last_id: Optional[int]) -> Iterator[Dict]:
+        if 'flight_id' not in filters:
+            return self.rows.after(last_id)
+        on_flight = self._by_flight.get(filters['flight_id'], {})
+        return (on_flight[_id] for _id in sorted(on_flight) if last_id is None or _id > last_id)
+
+    async def get_many(self, ticket_ids: List[str]) -> Dict[str, Dict]:
+        return {ticket_id: _copy(self._find(ticket_id)) for ticket_id in ticket_ids if self._find(ticket_id)}
+
+    async def find_by_passport(self, passport: str) -> Optional[Dict]:
+        holders = self._by_passport.get(passport)
+        return _copy(next(iter(holders.values()))) if holders else None
+
+    @_writes
+    async def board(self, ticket_ids: List[str]) -> Dict[str, int]:
+        moved = {"cancelled": 0, "pending": 0}
+        for ticket_id in dict.fromkeys(ticket_ids):
+            passenger = self._find(ticket_id)
+            if passenger is None or passenger['status'] == "boarded":
+                continue
+            moved["cancelled" if passenger['status'] == "cancelled" else "pending"] += 1
+            passenger['status'] = "boarded"
+        return moved
+
+    @_writes
+    async def cancel(self, ticket_id: str) -> Optional[str]:
+        passenger = self._find(ticket_id)
+        if passenger is None or passenger['status'] == "cancelled":
+            return None
+        previous, passenger['status'] = passenger['status'], "cancelled"
+        return previous
+
+    async def seat_holders(self, flight_ids: List[str]) -> AsyncIterator[Dict]:
+        holders = [
+            {"flight_id": p['flight_id'], "seat_number": p['seat_number']}
+            for flight_id in flight_ids
+            for p in self._by_flight.get(flight_id, {}).values()
+            if p['status'] != "cancelled"
+        ]
+        for holder in holders:
+            yield holder
+
+    async def status_counts(self) -> Dict[str, int]:
+        return dict(Counter(p.get('status') for p in self.rows.docs.values()))
+
+    async def flight_status_counts(self) -> List[Tuple[str, str, int]]:
+        counts = Counter((p.get('flight_id'), p.get('status')) for p in self.rows.docs.values())
+        return [(flight_id, status, tickets) for (flight_id, status), tickets in counts.items()]
+
+    async def clear(self):
+        await super().clear()
+        self._by_passport = {}
+        self._by_flight = {}
+
+
+class BoardingQueueRepository:
+    """One deque per flight, in line order; `position` holds the sequence number from `allocate`"""
+
+    name = "boarding_queue"
+    sort = [("position", 1), ("_id", 1)]
+    keys = ("flight_id", "ticket_id")
+
+    def __init__(self, versions: VersionRepository):
+        self.versions = versions
+        self._queues: Dict[str, deque] = {}
+        self._counters: Dict[str, int] = {}
+        # ticket_id -> flights it is queued for, and claim token -> flight
+        self._tickets: Dict[str, Counter] = {}
+        self._claims: Dict[str, str] = {}
+        self._next_id = count(1)
+        self._last_id: Optional[int] = None
+
+    def _place(self, entry: Dict) -> bool:
+        """Queue an entry by sequence number; False if the number is taken"""
+        queue = self._queues.setdefault(entry['flight_id'], deque())
+        if not queue or _position(queue[-1]) < entry['position']:
+            queue.append(entry)
+        else:
+            idx = bisect_left(queue, entry['position'], key=_position)
+            if idx < len(queue) and _position(queue[idx]) == entry['position']:
+                return False
+            queue.insert(idx, entry)
+        self._tickets.setdefault(entry['ticket_id'], Counter())[entry['flight_id']] += 1
+        return True
+
+    def _add(self, item: Dict) -> bool:
+        entry = _copy(item)
+        entry.pop('claim', None)
+        entry['_id'] = next(self._next_id)
+        if not self._place(entry):
+            return False
+        self._last_id = entry['_id']
+        return True
+
+    def _discard(self, flight_id: str, entries: List[Dict]):
+        """Drop entries of one flight's queue"""
+        gone = {id(entry) for entry in entries}
+        queue = self._queues[flight_id]
+        if len(gone) == 1 and queue and id(queue[0]) in gone:
+            queue.popleft()
+        else:
+            self._queues[flight_id] = deque(entry for entry in queue if id(entry) not in gone)
+        for entry in entries:
+            flights = self._tickets[entry['ticket_id']]
+            flights[flight_id] -= 1
+            if flights[flight_id] <= 0:
+                del flights[flight_id]
+            if not flights:
+                del self._tickets[entry['ticket_id']]
+        if not self._queues[flight_id]:
+            del self._queues[flight_id]
+
+    @staticmethod
+    def _public(entry: Dict) -> Dict:
+        item = _copy(entry)
+        item.pop('claim', None)
+        return item
+
+    async def allocate(self, flight_id: str, count: int = 1) -> int:
+        if flight_id not in self._counters:
+            queue = self._queues.get(flight_id)
+            self._counters[flight_id] = _position(queue[-1]) + 1 if queue else 0
+        first = self._counters[flight_id]
+        self._counters[flight_id] += count
+        return first
+
+    async def seed(self, items: List[Dict]):
+        for item in items:
+            flight_id = item['flight_id']
+            self._counters[flight_id] = max(self._counters.get(flight_id, 0), item.get('position', 0) + 1)
+
+    @_writes
+    async def insert(self, item: Dict):
+        if not self._add(item):
+            raise ValueError(f"Queue position {item['position']} is taken on flight {item['flight_id']}")
+
+    async def rank(self, flight_id: str, position: int) -> int:
+        return bisect_left(self._queues.get(flight_id, ()), position, key=_position)
+
+    async def queued(self, flight_id: str, ticket_ids: List[str]) -> Set[str]:
+        return {ticket_id for ticket_id in ticket_ids if flight_id in self._tickets.get(ticket_id, ())}
+
+    @_writes
+    async def pop(self, flight_id: str) -> Optional[Dict]:
+        for entry in self._queues.get(flight_id, ()):
+            if 'claim' not in entry:
+                self._discard(flight_id, [entry])
+                return self._public(entry)
+        return None
+
+    async def claim(self, flight_id: str, count: int) -> Tuple[str, List[Dict]]:
+        claim = uuid.uuid4().hex
+        group = []
+        for entry in self._queues.get(flight_id, ()):
+            if len(group) >= count:
+                break
+            if 'claim' not in entry:
+                entry['claim'] = claim
+                group.append(entry)
+        if group:
+            self._claims[claim] = flight_id
+        return claim, [self._public(entry) for entry in group]
+
+    @_writes
+    async def remove_claimed(self, claim: str):
+        flight_id = self._claims.pop(claim, None)
+        if flight_id in self._queues:
+            self._discard(flight_id, [entry for entry in self._queues[flight_id] if entry.get('claim') == claim])
+
+    @_writes
+    async def remove_ticket(self, ticket_id: str):
+        for flight_id in list(self._tickets.get(ticket_id, ())):
+            self._discard(flight_id, [entry for entry in self._queues[flight_id] if entry['ticket_id'] == ticket_id])
+
+    async def lengths(self) -> Dict[str, int]:
+        return {flight_id: len(queue) for flight_id, queue in self._queues.items()}
+
+    async def grouped(self) -> Dict[str, List[Dict]]:
+        return {
+            flight_id: [{"ticket_id": entry['ticket_id'], "passenger_name": entry['passenger_name'],
+                         "flight_id": flight_id, "position": entry['position']} for entry in queue]
+            for flight_id, queue in self._queues.items()
+        }
+
+    async def page(self, filters: Dict[str, Any], fields: List[str], limit: Optional[int],
+                   after: Optional[List]) -> Tuple[List[Dict], Optional[List]]:
+        if 'flight_id' in filters:
+            entries = self._queues.get(filters['flight_id'], deque())
+        else:
+            entries = sorted((entry for queue in self._queues.values() for entry in queue),
+                             key=lambda entry: (entry['position'], entry['_id']))
+        start = 0
+        if after:
+            start = bisect_right(entries, (after[0], after[1]), key=lambda entry: (entry['position'], entry['_id']))
+        docs = []
+        for idx in range(start, len(entries)):
+            if _matches(entries[idx], filters):
+                docs.append(entries[idx])
+                if limit is not None and len(docs) > limit:
+                    break
+        more = limit is not None and len(docs) > limit
+        docs = [self._public(entry) | {"_id": entry['_id']} for entry in docs[:limit]]
+        return docs, [docs[-1]['position'], docs[-1]['_id']] if more else None
+
+    async def all(self, limit: Optional[int] = None) -> List[Dict]:
+        entries = (entry for queue in self._queues.values() for entry in queue)
+        return [_copy(entry) for entry in islice(entries, limit)]
+
+    async def scan(self, batch_size: int = 1000, until: Any = None) -> AsyncIterator[Dict]:
+        for entry in [entry for queue in self._queues.values() for entry in queue]:
+            if until is None or entry['_id'] <= until:
+                yield _copy(entry)
+
+    async def high_water(self) -> Any:
+        return self._last_id if self._queues else None
+
+    async def count(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    @_writes
+    async def clear(self):
+        self._queues = {}
+        self._counters = {}
+        self._tickets = {}
+        self._claims = {}
+
+    @_writes
+    async def insert_many(self, docs: List[Dict], ordered: bool = True) -> List[Tuple[int, str]]:
+        errors = []
+        for idx, doc in enumerate(docs):
+            if not self._add(doc):
+                errors.append((idx, f"Queue position {doc['position']} is taken on flight {doc['flight_id']}"))
+                if ordered:
+                    break
+        await self.seed(docs)
+        return errors
+
+    @_writes
+    async def upsert_many(self, docs: List[Dict]) -> List[Tuple[int, str]]:
+        errors = []
+        for idx, doc in enumerate(docs):
+            queue = self._queues.get(doc['flight_id'], ())
+            existing = next((entry for entry in queue if entry['ticket_id'] == doc['ticket_id']), None)
+            if existing is None:
+                placed = self._add(doc)
+            else:
+                self._discard(doc['flight_id'], [existing])
+                placed = self._place({**existing, **_copy(doc)})
+                if not placed:
+                    self._place(existing)
+            if not placed:
+                errors.append((idx, f"Queue position {doc['position']} is taken on flight {doc['flight_id']}"))
+        await self.seed(docs)
+        return errors
+
+
+def _stack_key(doc: Dict) -> tuple:
+    return (str(doc.get('timestamp', '')), doc['_id'])
+
+
+class CancellationRepository(MemoryRepository):
+    """A list kept in (timestamp, _id) order; the end is the top of the stack"""
+
+    name = "cancellations"
+    sort = [("timestamp", -1), ("_id", -1)]
+    keys = ("ticket_id", "timestamp")
+
+    def __init__(self, versions: VersionRepository):
+        super().__init__(versions)
+        self._stack: List[Dict] = []
+
+    def _add(self, doc: Dict) -> bool:
+        # Like MongoDB, nothing stops the same ticket and time from being recorded twice
+        doc = self.rows.add(_copy(doc))
+        self._by_key.setdefault(self._key(doc), doc)
+        if not self._stack or _stack_key(self._stack[-1]) < _stack_key(doc):
+            self._stack.append(doc)
+        else:
+            self._stack.insert(bisect_left(self._stack, _stack_key(doc), key=_stack_key), doc)
+        return True
+
+    def _remove(self, doc: Dict):
+        if self._by_key.get(self._key(doc)) is doc:
+            del self._by_key[self._key(doc)]
+        del self._stack[bisect_left(self._stack, _stack_key(doc), key=_stack_key)]
+        self.rows.remove(doc)
+
+    @_writes
+    async def push(self, doc: Dict):
+        self._add(doc)
+
+    @_writes
+    async def pop(self) -> Optional[Dict]:
+        if not self._stack:
+            return None
+        doc = self._stack[-1]
+        self._remove(doc)
+        return _copy(doc)
+
+    async def page(self, filters: Dict[str, Any], fields: List[str], limit: Optional[int],
+                   after: Optional[List]) -> Tuple[List[Dict], Optional[List]]:
+        start = len(self._stack)
+        if after:
+            start = bisect_left(self._stack, (str(after[0]), after[1]), key=_stack_key)
+        docs = []
+        for idx in range(start - 1, -1, -1):
+            if _matches(self._stack[idx], filters):
+                docs.append(self._stack[idx])
+                if limit is not None and len(docs) > limit:
+                    break
+        more = limit is not None and len(docs) > limit
+        docs = [_copy(doc, keep_id=True) for doc in docs[:limit]]
+        return docs, [docs[-1]['timestamp'], docs[-1]['_id']] if more else None
+
+    @_writes
+    async def upsert_many(self, docs: List[Dict]) -> List[Tuple[int, str]]:
+        for doc in docs:
+            existing = self._by_key.get(self._key(doc))
+            if existing is None:
+                self._add(doc)
+            else:
+                # Key fields include the timestamp, so the stack order is unchanged
+                existing.update(_copy(doc))
+        return []
+
+    async def clear(self):
+        await super().clear()
+        self._stack = []
+
+
+class StatsRepository:
+    """Analytics counters: the totals and upcoming flight, plus counters per flight"""
+
+    name = "stats"
+
+    def __init__(self, versions: VersionRepository):
+        self.versions = versions
+        self._totals: Optional[Dict] = None
+        self._flights: Dict[str, Dict[str, int]] = {}
+
+    async def totals(self, fields: tuple) -> Optional[Dict]:
+        if self._totals is None:
+            return None
+        totals = {field: self._totals[field] for field in fields if field in self._totals}
+        upcoming = self._totals.get('upcoming_flight')
+        totals['upcoming_flight'] = dict(upcoming) if upcoming else upcoming
+        return totals
+
+    async def flight(self, flight_id: str) -> Dict[str, int]:
+        return dict(self._flights.get(flight_id, {}))
+
+    @_writes
+    async def bump(self, totals: Dict[str, int], per_flight: Dict[str, Dict[str, int]]) -> bool:
+        for flight_id, counters in per_flight.items():
+            current = self._flights.setdefault(flight_id, {})
+            for key, value in counters.items():
+                current[key] = current.get(key, 0) + value
+        if not totals:
+            return True
+        if self._totals is None:
+            return False
+        for key, value in totals.items():
+            self._totals[key] = self._totals.get(key, 0) + value
+        return True
+
+    @_writes
+    async def offer_upcoming(self, flight: Dict):
+        if self._totals is None:
+            return
+        current = self._totals.get('upcoming_flight')
+        if current is None or current['departure_time'] > flight['departure_time']:
+            self._totals['upcoming_flight'] = _copy(flight)
+
+    @_writes
+    async def clear_upcoming(self, flight_id: str) -> bool:
+        current = (self._totals or {}).get('upcoming_flight')
+        if current is None or current.get('flight_id') != flight_id:
+            return False
+        self._totals['upcoming_flight'] = None
+        return True
+
+    @_writes
+    async def replace(self, totals: Dict, flights: Dict[str, Dict[str, int]]):
+        self._totals = _copy(totals)
+        self._flights = {flight_id: dict(counters) for flight_id, counters in flights.items()}
+
+    async def is_current(self) -> bool:
+        return self._totals is not None
+
+
+class MemoryStore:
+    """Every repository, held in this process"""
+
+    backend = "memory"
+
+    def __init__(self):
+        self.versions = VersionRepository()
+        self.airports = AirportRepository(self.versions)
+        self.flights = FlightRepository(self.versions)
+        self.passengers = PassengerRepository(self.versions)
+        self.boarding_queue = BoardingQueueRepository(self.versions)
+        self.cancellations = CancellationRepository(self.versions)
+        self.stats = StatsRepository(self.versions)
+
+    async def ensure_indexes(self, logger) -> List[Dict]:
+        # Every lookup the repositories make is already a dict or deque access
+        return []
+
+    async def index_audit(self) -> List[Dict]:
+        raise NotImplementedError("The index audit explains MongoDB queries; the memory backend has none")
+
+    async def drop(self):
+        self.__init__()
+
+    def close(self):
+        pass
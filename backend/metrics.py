@@ -0,0 +1,274 @@
+"""Request and database metrics in the Prometheus text format.
+
+``RequestMetrics`` is a plain ASGI middleware: it times every request,
+counts the bytes it sends back and labels both with the route template
+(``/api/flights/{flight_id}``), never the raw path, so label cardinality is
+bounded by the number of routes. ``CommandMetrics`` is a pymongo command
+listener. Besides totals per command and collection, it charges each
+command to the request that issued it through a context variable. Motor
+copies the caller's context into its executor threads, so the per-request
+count survives the hop, and a route whose operation count grows with its
+input (an N+1 loop) shows up in the ``http_request_db_operations``
+histogram.
+
+Recording is a dict lookup and a few additions per request. Series are
+rendered on scrape from that live state, so nothing is buffered between
+scrapes.
+"""
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+from starlette.routing import Match
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+DB_OPERATION_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+DB_TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# Metric types; label values are passed positionally as a tuple in label_names order
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.label_names, labels)} {_format(value)}"
+                for labels, value in sorted(self._values.copy().items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, labels: Tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        # bisect_left puts a value equal to a bound into that bound's bucket (le is inclusive)
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, labels: Tuple) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in sorted(self._series.copy().items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), list(counts)):
+                cumulative += bucket
+                le = 'le="' + _format(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_format(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics rendered together on a scrape"""
+
+    def __init__(self):
+        self._metrics: list = []
+
+    def register(self, metric):
+        if any(existing.name == metric.name for existing in self._metrics):
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Per-request database accounting
+class RequestUsage:
+    __slots__ = ("operations", "seconds")
+
+    def __init__(self):
+        self.operations = 0
+        self.seconds = 0.0
+
+
+# The usage of the request being served; None outside a request (startup, background work)
+request_usage: ContextVar[Optional[RequestUsage]] = ContextVar("request_usage", default=None)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Counts MongoDB commands and their time, in total and per request"""
+
+    def __init__(self, registry: Registry):
+        labels = ("command", "collection")
+        self.operations = registry.register(Counter(
+            "mongodb_commands_total", "MongoDB commands completed", labels))
+        self.seconds = registry.register(Counter(
+            "mongodb_command_seconds_total", "Time spent in MongoDB commands", labels))
+        self.failures = registry.register(Counter(
+            "mongodb_command_failures_total", "MongoDB commands that returned an error", labels))
+        # Listener callbacks run on Motor's executor threads
+        self._lock = threading.Lock()
+        self._collections: Dict[int, str] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        # getMore names its collection separately; the command's own value is the cursor id
+        collection = target if isinstance(target, str) else event.command.get("collection", "")
+        self._collections[event.request_id] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event):
+        self._record(event, failed=False)
+
+    def failed(self, event):
+        self._record(event, failed=True)
+
+    def _record(self, event, failed: bool):
+        labels = (event.command_name, self._collections.pop(event.request_id, ""))
+        seconds = event.duration_micros / 1e6
+        usage = request_usage.get()
+        with self._lock:
+            self.operations.inc(labels)
+            self.seconds.inc(labels, seconds)
+            if failed:
+                self.failures.inc(labels)
+            if usage is not None:
+                usage.operations += 1
+                usage.seconds += seconds
+
+
+class RequestMetrics:
+    """ASGI middleware recording latency, response size and database work per route"""
+
+    def __init__(self, app, registry: Registry, commands: Optional[CommandMetrics] = None):
+        self.app = app
+        self.track_db = commands is not None
+        route_labels = ("method", "route")
+        self.requests = registry.register(Counter(
+            "http_requests_total", "HTTP requests served", route_labels + ("status",)))
+        self.latency = registry.register(Histogram(
+            "http_request_duration_seconds", "Time from receiving a request to sending the last byte",
+            route_labels, LATENCY_BUCKETS))
+        self.in_flight = registry.register(Gauge(
+            "http_requests_in_flight", "Requests being served, including open event streams", ("method",)))
+        self.sizes = registry.register(Histogram(
+            "http_response_size_bytes", "Response body bytes sent", route_labels, SIZE_BUCKETS))
+        if self.track_db:
+            self.db_operations = registry.register(Histogram(
+                "http_request_db_operations", "MongoDB commands issued per request",
+                route_labels, DB_OPERATION_BUCKETS))
+            self.db_seconds = registry.register(Histogram(
+                "http_request_db_seconds", "Time per request spent in MongoDB commands",
+                route_labels, DB_TIME_BUCKETS))
+        # Path -> template for routes without path parameters, resolved outside the router
+        self._static_routes: Dict[str, str] = {}
+
+    def route_of(self, scope) -> str:
+        """The template of the route that served a request.
+
+        The router records it in the scope. Requests answered before
+        routing (cached GETs, 304s) are matched against the routes here.
+        """
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        path = scope["path"]
+        template = self._static_routes.get(path)
+        if template is not None:
+            return template
+        router = getattr(scope.get("app"), "router", None)
+        for candidate in getattr(router, "routes", ()):
+            match, _ = candidate.matches(scope)
+            if match != Match.NONE:
+                template = getattr(candidate, "path", UNMATCHED_ROUTE)
+                if template == path:
+                    self._static_routes[path] = template
+                return template
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        size = 0
+
+        async def record_send(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        usage = RequestUsage()
+        token = request_usage.set(usage)
+        self.in_flight.inc((method,))
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, record_send)
+        finally:
+            elapsed = perf_counter() - start
+            self.in_flight.dec((method,))
+            request_usage.reset(token)
+            labels = (method, self.route_of(scope))
+            self.requests.inc(labels + (str(status),))
+            self.latency.observe(labels, elapsed)
+            self.sizes.observe(labels, size)
+            if self.track_db:
+                self.db_operations.observe(labels, usage.operations)
+                self.db_seconds.observe(labels, usage.seconds)
@@ -0,0 +1,678 @@
+"""MongoDB repositories behind the endpoints.
+
+Each entity the API stores (airports, flights, passengers, boarding
+queues, cancellations and the analytics counters) has a repository here
+that owns its collection and every query against it. Endpoints call these
+methods instead of building queries themselves, so ``memory_store`` can
+stand in with the same methods over plain dicts and deques.
+
+Documents go in and come out without ``_id``, except in ``page`` results,
+whose sort keys (``_id`` among them) make up the next page's cursor. Every
+write method bumps its collection's counter in ``versions``, which is what
+the response cache keys on.
+"""
+import functools
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from bson.int64 import Int64
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+from seat_map import bits_by_word
+
+STATS_ID = "analytics"
+VERSIONS_ID = "versions"
+
+
+def _write_errors(e: BulkWriteError, offset: int = 0) -> List[Tuple[int, str]]:
+    return [(offset + error['index'], error.get('errmsg', 'Write failed')) for error in e.details.get('writeErrors', [])]
+
+
+class VersionRepository:
+    """Change counters by collection name, shared by every worker.
+
+    `generation` is set when the document is created, so counters that
+    restart from zero after it is lost never repeat an earlier key.
+    """
+
+    def __init__(self, db):
+        self.collection = db.cache_versions
+
+    async def bump(self, names: tuple):
+        update = {"$setOnInsert": {"generation": uuid.uuid4().hex}}
+        if names:
+            update["$inc"] = {name: 1 for name in names}
+        await self.collection.update_one({"_id": VERSIONS_ID}, update, upsert=True)
+
+    async def read(self) -> Dict[str, Any]:
+        versions = await self.collection.find_one({"_id": VERSIONS_ID}, {"_id": 0})
+        if versions is None:
+            await self.bump(())
+            versions = await self.collection.find_one({"_id": VERSIONS_ID}, {"_id": 0})
+        return versions
+
+
+def _writes(method):
+    """Bump the repository's version once `method` is done, even if it failed part-way"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            await self.versions.bump((self.name,))
+    return wrapper
+
+
+class MongoRepository:
+    """One collection; subclasses set its name, page order and natural key"""
+
+    name = ""
+    # Keyset order of `page`; the last key must be unique
+    sort: List[tuple] = [("_id", ASCENDING)]
+    # Fields identifying a document across exports, for upserts
+    keys: tuple = ()
+
+    def __init__(self, db, versions: VersionRepository):
+        self.collection = db[self.name]
+        self.versions = versions
+
+    async def page(self, filters: Dict[str, Any], fields: List[str], limit: Optional[int],
+                   after: Optional[List]) -> Tuple[List[Dict], Optional[List]]:
+        """Up to `limit` documents matching `filters` past the `after` sort values.
+
+        Returns the documents, carrying at least `fields` and the sort keys,
+        and the sort values of the last one when more remain.
+        """
+        query = dict(filters)
+        if after:
+            # (k1, k2, ...) strictly past the cursor in sort order
+            branches = []
+            for i, (key, direction) in enumerate(self.sort):
+                branch = {self.sort[j][0]: after[j] for j in range(i)}
+                branch[key] = {"$gt" if direction == ASCENDING else "$lt": after[i]}
+                branches.append(branch)
+            query = {"$and": [query, {"$or": branches}]}
+
+        projection = {name: 1 for name in fields}
+        projection.update({key: 1 for key, _ in self.sort})
+        cursor = self.collection.find(query, projection, sort=self.sort)
+        if limit is not None:
+            cursor = cursor.limit(limit + 1)
+        docs = await cursor.to_list(None)
+        if limit is None or len(docs) <= limit:
+            return docs, None
+        docs = docs[:limit]
+        return docs, [docs[-1][key] for key, _ in self.sort]
+
+    async def all(self, limit: Optional[int] = None) -> List[Dict]:
+        """Every document, or the first `limit` in storage order"""
+        return await self.collection.find({}, {"_id": 0}).to_list(limit)
+
+    async def scan(self, batch_size: int = 1000, until: Any = None) -> AsyncIterator[Dict]:
+        """Every document, or those up to an `until` mark from `high_water`"""
+        query = {} if until is None else {"_id": {"$lte": until}}
+        async for doc in self.collection.find(query, {"_id": 0}).batch_size(batch_size):
+            yield doc
+
+    async def high_water(self) -> Any:
+        """Mark of the newest document so far, or None when empty"""
+        newest = await self.collection.find_one({}, {"_id": 1}, sort=[("_id", DESCENDING)])
+        return newest['_id'] if newest else None
+
+    async def count(self) -> int:
+        return await self.collection.count_documents({})
+
+    @_writes
+    async def clear(self):
+        await self.collection.delete_many({})
+
+    @_writes
+    async def insert_many(self, docs: List[Dict], ordered: bool = True) -> List[Tuple[int, str]]:
+        """Insert documents; returns (index, message) for each one rejected"""
+        if not docs:
+            return []
+        try:
+            await self.collection.insert_many(docs, ordered=ordered)
+        except BulkWriteError as e:
+            return _write_errors(e)
+        finally:
+            # insert_many adds _id to the caller's dicts
+            for doc in docs:
+                doc.pop('_id', None)
+        return []
+
+    @_writes
+    async def upsert_many(self, docs: List[Dict]) -> List[Tuple[int, str]]:
+        """Insert or update documents matched on their natural key"""
+        if not docs:
+            return []
+        try:
+            await self.collection.bulk_write(
+                [UpdateOne({key: doc[key] for key in self.keys}, {"$set": doc}, upsert=True) for doc in docs],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            return _write_errors(e)
+        return []
+
+
+class AirportRepository(MongoRepository):
+    name = "airports"
+    keys = ("code",)
+
+    async def get(self, code: str) -> Optional[Dict]:
+        return await self.collection.find_one({"code": code}, {"_id": 0})
+
+    @_writes
+    async def insert(self, doc: Dict) -> bool:
+        """False if the code is taken"""
+        try:
+            await self.collection.insert_one({**doc})
+        except DuplicateKeyError:
+            return False
+        return True
+
+    @_writes
+    async def delete(self, code: str) -> bool:
+        result = await self.collection.delete_one({"code": code})
+        return result.deleted_count == 1
+
+
+class FlightRepository(MongoRepository):
+    name = "flights"
+    keys = ("flight_id",)
+
+    async def get(self, flight_id: str) -> Optional[Dict]:
+        return await self.collection.find_one({"flight_id": flight_id}, {"_id": 0})
+
+    async def get_many(self, flight_ids: List[str]) -> Dict[str, Dict]:
+        return {
+            f['flight_id']: f
+            async for f in self.collection.find({"flight_id": {"$in": flight_ids}}, {"_id": 0})
+        }
+
+    @_writes
+    async def insert(self, doc: Dict) -> bool:
+        """False if the flight_id is taken"""
+        try:
+            await self.collection.insert_one({**doc})
+        except DuplicateKeyError:
+            return False
+        return True
+
+    @_writes
+    async def delete(self, flight_id: str) -> Optional[Dict]:
+        """Remove a flight; returns it, or None if there was none"""
+        return await self.collection.find_one_and_delete({"flight_id": flight_id}, {"_id": 0})
+
+    async def first_departure(self) -> Optional[Dict]:
+        """The flight with the earliest departure_time, without its seat bitmap"""
+        return await self.collection.find_one({}, {"_id": 0, "seat_words": 0}, sort=[("departure_time", ASCENDING)])
+
+    async def seat_totals(self, flight_ids: Optional[List[str]] = None, only_missing: bool = False) -> Dict[str, int]:
+        """total_seats by flight_id, optionally only for flights without a seat bitmap"""
+        query = {} if flight_ids is None else {"flight_id": {"$in": flight_ids}}
+        if only_missing:
+            query["seat_words"] = {"$exists": False}
+        return {
+            f['flight_id']: f['total_seats']
+            async for f in self.collection.find(query, {"_id": 0, "flight_id": 1, "total_seats": 1})
+        }
+
+    @_writes
+    async def set_inventory(self, flight_id: str, seat_words: List[int], booked_seats: int, only_missing: bool = False):
+        target = {"flight_id": flight_id}
+        if only_missing:
+            target["seat_words"] = {"$exists": False}
+        await self.collection.update_one(target, {"$set": {"seat_words": seat_words, "booked_seats": booked_seats}})
+
+    @_writes
+    async def reserve_seats(self, flight_id: str, seats: List[Optional[int]]) -> bool:
+        """Claim seats and count them in one conditional update.
+
+        The update only matches while every seat bit is clear and the flight
+        has room for all of them, so concurrent bookings can neither overbook
+        nor share a seat. None stands for a free-form label, which takes
+        capacity but has no bit to claim. False if nothing was claimed.
+        """
+        target = {"flight_id": flight_id,
+                  "$expr": {"$lte": [{"$add": ["$booked_seats", len(seats)]}, "$total_seats"]}}
+        update = {"$inc": {"booked_seats": len(seats)}}
+        for word, bits in bits_by_word([seat for seat in seats if seat is not None]).items():
+            target[f"seat_words.{word}"] = {"$bitsAllClear": bits}
+            update.setdefault("$bit", {})[f"seat_words.{word}"] = {"or": Int64(sum(1 << bit for bit in bits))}
+        result = await self.collection.update_one(target, update)
+        return result.modified_count == 1
+
+    @_writes
+    async def release_seats(self, flight_id: str, seats: List[Optional[int]]):
+        """Give seats back and uncount them"""
+        update = {"$inc": {"booked_seats": -len(seats)}}
+        for word, bits in bits_by_word([seat for seat in seats if seat is not None]).items():
+            update.setdefault("$bit", {})[f"seat_words.{word}"] = {"and": Int64(~sum(1 << bit for bit in bits))}
+        await self.collection.update_one({"flight_id": flight_id, "booked_seats": {"$gte": len(seats)}}, update)
+
+    async def occupancy(self) -> List[Dict]:
+        """Per-flight load factor, fullest first"""
+        # One row per flight, so this runs on its own rather than inside a
+        # $facet, whose output is a single document capped at 16 MB
+        pipeline = [
+            {"$project": {
+                "flight_id": 1,
+                "route": {"$concat": ["$source_code", "-", "$destination_code"]},
+                "booked": "$booked_seats",
+                "total": "$total_seats",
+                "occupancy": {"$cond": [
+                    {"$gt": ["$total_seats", 0]},
+                    {"$multiply": [{"$divide": ["$booked_seats", "$total_seats"]}, 100]},
+                    0
+                ]}
+            }},
+            {"$sort": {"occupancy": -1, "_id": 1}},
+            {"$project": {"_id": 0}}
+        ]
+        return await self.collection.aggregate(pipeline).to_list(None)
+
+    async def route_counts(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Departures and arrivals by airport code"""
+        # Per-airport counts stay bounded by the number of airports
+        pipeline = [{"$facet": {
+            "departures": [{"$group": {"_id": "$source_code", "count": {"$sum": 1}}}],
+            "arrivals": [{"$group": {"_id": "$destination_code", "count": {"$sum": 1}}}]
+        }}]
+        (facets,) = await self.collection.aggregate(pipeline).to_list(None)
+        return ({row['_id']: row['count'] for row in facets['departures']},
+                {row['_id']: row['count'] for row in facets['arrivals']})
+
+
+class PassengerRepository(MongoRepository):
+    name = "passengers"
+    keys = ("ticket_id",)
+
+    async def get(self, ticket_id: str) -> Optional[Dict]:
+        return await self.collection.find_one({"ticket_id": ticket_id}, {"_id": 0})
+
+    async def get_many(self, ticket_ids: List[str]) -> Dict[str, Dict]:
+        return {
+            p['ticket_id']: p
+            async for p in self.collection.find({"ticket_id": {"$in": ticket_ids}}, {"_id": 0})
+        }
+
+    async def find_by_passport(self, passport: str) -> Optional[Dict]:
+        return await self.collection.find_one({"passport": passport}, {"_id": 0})
+
+    @_writes
+    async def insert(self, doc: Dict) -> bool:
+        """False if the ticket_id is taken"""
+        try:
+            await self.collection.insert_one({**doc})
+        except DuplicateKeyError:
+            return False
+        return True
+
+    @_writes
+    async def board(self, ticket_ids: List[str]) -> Dict[str, int]:
+        """Mark tickets boarded; returns how many moved from each previous status"""
+        moved = {}
+        for status, previous in (("cancelled", "cancelled"), ({"$ne": "boarded"}, "pending")):
+            result = await self.collection.update_many(
+                {"ticket_id": {"$in": ticket_ids}, "status": status},
+                {"$set": {"status": "boarded"}}
+            )
+            moved[previous] = result.modified_count
+        return moved
+
+    @_writes
+    async def cancel(self, ticket_id: str) -> Optional[str]:
+        """Cancel a ticket; returns its previous status, or None if it was already cancelled"""
+        # Only one concurrent cancellation of a ticket may go through
+        previous = await self.collection.find_one_and_update(
+            {"ticket_id": ticket_id, "status": {"$ne": "cancelled"}},
+            {"$set": {"status": "cancelled"}},
+            projection={"_id": 0, "status": 1}
+        )
+        return previous['status'] if previous else None
+
+    async def seat_holders(self, flight_ids: List[str]) -> AsyncIterator[Dict]:
+        """flight_id and seat_number of every ticket on these flights that still holds a seat"""
+        async for p in self.collection.find(
+            {"flight_id": {"$in": flight_ids}, "status": {"$ne": "cancelled"}},
+            {"_id": 0, "flight_id": 1, "seat_number": 1}
+        ):
+            yield p
+
+    async def status_counts(self) -> Dict[str, int]:
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        return {row['_id']: row['count'] async for row in self.collection.aggregate(pipeline)}
+
+    async def flight_status_counts(self) -> List[Tuple[str, str, int]]:
+        """(flight_id, status, tickets) for every pair that has tickets"""
+        pipeline = [{"$group": {"_id": {"flight_id": "$flight_id", "status": "$status"}, "count": {"$sum": 1}}}]
+        return [
+            (row['_id']['flight_id'], row['_id']['status'], row['count'])
+            async for row in self.collection.aggregate(pipeline)
+        ]
+
+
+class BoardingQueueRepository(MongoRepository):
+    """Queue entries store a per-flight sequence number in `position`; place in line is derived on read"""
+
+    name = "boarding_queue"
+    sort = [("position", ASCENDING), ("_id", ASCENDING)]
+    keys = ("flight_id", "ticket_id")
+
+    def __init__(self, db, versions: VersionRepository):
+        super().__init__(db, versions)
+        self.counters = db.queue_counters
+
+    async def allocate(self, flight_id: str, count: int = 1) -> int:
+        """Atomically reserve `count` consecutive sequence numbers; returns the first"""
+        counter = await self.counters.find_one_and_update(
+            {"_id": flight_id},
+            {"$inc": {"next": count}},
+            return_document=ReturnDocument.AFTER
+        )
+        if counter is None:
+            # First use for this flight: start after any entries already queued
+            tail = await self.collection.find_one({"flight_id": flight_id}, {"_id": 0, "position": 1}, sort=[("position", -1)])
+            try:
+                await self.counters.update_one(
+                    {"_id": flight_id},
+                    {"$max": {"next": tail['position'] + 1 if tail else 0}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                pass  # A concurrent request created it first
+            counter = await self.counters.find_one_and_update(
+                {"_id": flight_id},
+                {"$inc": {"next": count}},
+                return_document=ReturnDocument.AFTER
+            )
+        return counter['next'] - count
+
+    async def seed(self, items: List[Dict]):
+        """Make sure counters start after these (imported) entries"""
+        tails = {}
+        for item in items:
+            tails[item['flight_id']] = max(tails.get(item['flight_id'], -1), item.get('position', 0))
+        for flight_id, tail in tails.items():
+            await self.counters.update_one({"_id": flight_id}, {"$max": {"next": tail + 1}}, upsert=True)
+
+    @_writes
+    async def insert(self, item: Dict):
+        await self.collection.insert_one({**item})
+
+    async def rank(self, flight_id: str, position: int) -> int:
+        """Entries queued ahead of sequence number `position`"""
+        return await self.collection.count_documents({"flight_id": flight_id, "position": {"$lt": position}})
+
+    async def queued(self, flight_id: str, ticket_ids: List[str]) -> Set[str]:
+        """Which of these tickets are already queued for the flight"""
+        return {
+            q['ticket_id']
+            async for q in self.collection.find({"flight_id": flight_id, "ticket_id": {"$in": ticket_ids}},
+                                                {"_id": 0, "ticket_id": 1})
+        }
+
+    @_writes
+    async def pop(self, flight_id: str) -> Optional[Dict]:
+        """Claim and remove the head in one step so concurrent dequeues never board the same passenger"""
+        return await self.collection.find_one_and_delete(
+            {"flight_id": flight_id, "claim": {"$exists": False}},
+            projection={"_id": 0},
+            sort=[("position", ASCENDING)]
+        )
+
+    async def claim(self, flight_id: str, count: int) -> Tuple[str, List[Dict]]:
+        """Tag up to `count` entries from the head with a claim token and return them in line order.
+
+        A concurrent claim cannot take the same entries. They stay queued
+        until `remove_claimed`.
+        """
+        claim = uuid.uuid4().hex
+        head = await self.collection.find(
+            {"flight_id": flight_id, "claim": {"$exists": False}},
+            {"_id": 0, "position": 1},
+            sort=[("position", ASCENDING)]
+        ).limit(count).to_list(count)
+        if not head:
+            return claim, []
+        await self.collection.update_many(
+            {"flight_id": flight_id, "position": {"$lte": head[-1]['position']}, "claim": {"$exists": False}},
+            {"$set": {"claim": claim}}
+        )
+        group = await self.collection.find({"claim": claim}, {"_id": 0, "claim": 0},
+                                           sort=[("position", ASCENDING)]).to_list(count)
+        return claim, group
+
+    @_writes
+    async def remove_claimed(self, claim: str):
+        await self.collection.delete_many({"claim": claim})
+
+    @_writes
+    async def remove_ticket(self, ticket_id: str):
+        await self.collection.delete_many({"ticket_id": ticket_id})
+
+    async def lengths(self) -> Dict[str, int]:
+        """Queue length by flight_id, for flights with anyone queued"""
+        pipeline = [{"$group": {"_id": "$flight_id", "count": {"$sum": 1}}}]
+        return {row['_id']: row['count'] async for row in self.collection.aggregate(pipeline)}
+
+    async def grouped(self) -> Dict[str, List[Dict]]:
+        """Every flight's queue in line order, from one grouped aggregation"""
+        pipeline = [
+            {"$sort": {"flight_id": 1, "position": 1}},
+            {"$group": {
+                "_id": "$flight_id",
+                "queue": {"$push": {"ticket_id": "$ticket_id", "passenger_name": "$passenger_name",
+                                    "flight_id": "$flight_id", "position": "$position"}}
+            }}
+        ]
+        return {group['_id']: group['queue'] async for group in self.collection.aggregate(pipeline)}
+
+    @_writes
+    async def clear(self):
+        await self.collection.delete_many({})
+        await self.counters.delete_many({})
+
+    async def insert_many(self, docs: List[Dict], ordered: bool = True) -> List[Tuple[int, str]]:
+        errors = await super().insert_many(docs, ordered)
+        await self.seed(docs)
+        return errors
+
+    async def upsert_many(self, docs: List[Dict]) -> List[Tuple[int, str]]:
+        errors = await super().upsert_many(docs)
+        await self.seed(docs)
+        return errors
+
+
+class CancellationRepository(MongoRepository):
+    """The cancellation stack; the newest timestamp is the top"""
+
+    name = "cancellations"
+    sort = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+    keys = ("ticket_id", "timestamp")
+
+    @_writes
+    async def push(self, doc: Dict):
+        await self.collection.insert_one({**doc})
+
+    @_writes
+    async def pop(self) -> Optional[Dict]:
+        return await self.collection.find_one_and_delete({}, {"_id": 0}, sort=self.sort)
+
+
+class StatsRepository:
+    """Analytics counters.
+
+    Totals and the upcoming flight live in one document that every write
+    path updates with $inc, so the dashboard summary is a single read
+    instead of a collection scan. Per-flight counters are documents in
+    flight_stats keyed by flight_id, so a flight_id is never spliced into a
+    field path.
+    """
+
+    name = "stats"
+
+    def __init__(self, db, versions: VersionRepository):
+        self.stats = db.stats
+        self.flights = db.flight_stats
+        self.versions = versions
+
+    async def totals(self, fields: tuple) -> Optional[Dict]:
+        """`fields` and the upcoming flight, or None if there are no counters yet"""
+        projection = {"_id": 0, "upcoming_flight": 1, **{field: 1 for field in fields}}
+        return await self.stats.find_one({"_id": STATS_ID}, projection)
+
+    async def flight(self, flight_id: str) -> Dict[str, int]:
+        return await self.flights.find_one({"_id": flight_id}, {"_id": 0}) or {}
+
+    @_writes
+    async def bump(self, totals: Dict[str, int], per_flight: Dict[str, Dict[str, int]]) -> bool:
+        """Add to the counters; False if there was no totals document to add to"""
+        if per_flight:
+            await self.flights.bulk_write(
+                [UpdateOne({"_id": flight_id}, {"$inc": counters}, upsert=True) for flight_id, counters in per_flight.items()],
+                ordered=False
+            )
+        if totals:
+            result = await self.stats.update_one({"_id": STATS_ID}, {"$inc": totals})
+            return result.matched_count == 1
+        return True
+
+    @_writes
+    async def offer_upcoming(self, flight: Dict):
+        """Make `flight` the upcoming flight if it departs before the current one"""
+        await self.stats.update_one(
+            {"_id": STATS_ID, "$or": [{"upcoming_flight": None}, {"upcoming_flight.departure_time": {"$gt": flight['departure_time']}}]},
+            {"$set": {"upcoming_flight": flight}}
+        )
+
+    @_writes
+    async def clear_upcoming(self, flight_id: str) -> bool:
+        """Unset the upcoming flight if it is `flight_id`; True if it was"""
+        result = await self.stats.update_one(
+            {"_id": STATS_ID, "upcoming_flight.flight_id": flight_id},
+            {"$set": {"upcoming_flight": None}}
+        )
+        return result.modified_count == 1
+
+    @_writes
+    async def replace(self, totals: Dict, flights: Dict[str, Dict[str, int]]):
+        await self.flights.delete_many({})
+        if flights:
+            await self.flights.insert_many([{"_id": flight_id, **counters} for flight_id, counters in flights.items()])
+        await self.stats.replace_one({"_id": STATS_ID}, totals, upsert=True)
+
+    async def is_current(self) -> bool:
+        """False when there are no counters, or they predate the flight_stats collection"""
+        return await self.stats.find_one({"_id": STATS_ID, "flights": {"$exists": False}}, {"_id": 1}) is not None
+
+
+# (collection, keys, unique) for every lookup, filter and sort the repositories rely on
+INDEXES = [
+    ("airports", [("code", ASCENDING)], True),
+    ("flights", [("flight_id", ASCENDING)], True),
+    ("flights", [("departure_time", ASCENDING)], False),
+    ("flights", [("source_code", ASCENDING)], False),
+    ("flights", [("destination_code", ASCENDING)], False),
+    ("passengers", [("ticket_id", ASCENDING)], True),
+    ("passengers", [("passport", ASCENDING)], False),
+    ("passengers", [("flight_id", ASCENDING), ("status", ASCENDING)], False),
+    ("passengers", [("status", ASCENDING)], False),
+    ("boarding_queue", [("flight_id", ASCENDING), ("position", ASCENDING)], True),
+    ("boarding_queue", [("ticket_id", ASCENDING)], False),
+    ("boarding_queue", [("claim", ASCENDING)], False),
+    ("cancellations", [("timestamp", DESCENDING), ("_id", DESCENDING)], False),
+    ("cancellations", [("ticket_id", ASCENDING)], False),
+]
+
+# (name, collection, filter, sort) of the hot query shapes, with placeholder values
+QUERY_SHAPES = [
+    ("airport by code", "airports", {"code": "AUDIT"}, None),
+    ("flight by flight_id", "flights", {"flight_id": "AUDIT"}, None),
+    ("upcoming flight", "flights", {}, [("departure_time", ASCENDING)]),
+    ("flights by source", "flights", {"source_code": "AUDIT"}, None),
+    ("passenger by ticket_id", "passengers", {"ticket_id": "AUDIT"}, None),
+    ("passenger by passport", "passengers", {"passport": "AUDIT"}, None),
+    ("seat holders by flight", "passengers", {"flight_id": {"$in": ["AUDIT"]}, "status": {"$ne": "cancelled"}}, None),
+    ("passengers by status", "passengers", {"status": "pending"}, None),
+    ("queue head", "boarding_queue", {"flight_id": "AUDIT", "claim": {"$exists": False}}, [("position", ASCENDING)]),
+    ("queue entry by ticket", "boarding_queue", {"ticket_id": "AUDIT"}, None),
+    ("claimed queue group", "boarding_queue", {"claim": "AUDIT"}, [("position", ASCENDING)]),
+    ("latest cancellation", "cancellations", {}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+]
+
+
+def plan_stages(plan: Dict) -> List[Dict]:
+    """Flatten an explain plan tree into its stages, root first"""
+    stages = [plan]
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            stages.extend(plan_stages(child))
+    return stages
+
+
+class MongoStore:
+    """Every repository over one MongoDB database"""
+
+    backend = "mongo"
+
+    def __init__(self, url: str, db_name: str, event_listeners=()):
+        self.client = AsyncIOMotorClient(url, event_listeners=list(event_listeners))
+        self.db_name = db_name
+        self.db = self.client[db_name]
+        self.versions = VersionRepository(self.db)
+        self.airports = AirportRepository(self.db, self.versions)
+        self.flights = FlightRepository(self.db, self.versions)
+        self.passengers = PassengerRepository(self.db, self.versions)
+        self.boarding_queue = BoardingQueueRepository(self.db, self.versions)
+        self.cancellations = CancellationRepository(self.db, self.versions)
+        self.stats = StatsRepository(self.db, self.versions)
+
+    async def ensure_index(self, collection: str, keys: List[tuple], unique: bool, logger) -> Dict:
+        """Create one index, falling back to non-unique if existing data has duplicates"""
+        try:
+            name = await self.db[collection].create_index(keys, unique=unique)
+            return {"collection": collection, "name": name, "unique": unique}
+        except (DuplicateKeyError, OperationFailure) as e:
+            if not unique:
+                raise
+            logger.warning("Cannot make %s %s unique (%s); creating a plain index", collection, keys, e)
+            name = await self.db[collection].create_index(keys)
+            return {"collection": collection, "name": name, "unique": False, "wanted_unique": True}
+
+    async def ensure_indexes(self, logger) -> List[Dict]:
+        return [await self.ensure_index(collection, keys, unique, logger) for collection, keys, unique in INDEXES]
+
+    async def index_audit(self) -> List[Dict]:
+        """Explain every hot query shape and report whether an index serves it"""
+        results = []
+        for name, collection, query, sort in QUERY_SHAPES:
+            cursor = self.db[collection].find(query).limit(1)
+            if sort:
+                cursor = cursor.sort(sort)
+            explain = await cursor.explain()
+            winning = explain.get("queryPlanner", {}).get("winningPlan", {})
+            stages = plan_stages(winning.get("queryPlan", winning))
+            names = [stage.get("stage") for stage in stages]
+            execution = explain.get("executionStats", {})
+            results.append({
+                "query": name,
+                "collection": collection,
+                "stages": names,
+                "index": next((stage["indexName"] for stage in stages if "indexName" in stage), None),
+                "uses_index": "COLLSCAN" not in names,
+                "in_memory_sort": "SORT" in names,
+                "docs_examined": execution.get("totalDocsExamined"),
+                "keys_examined": execution.get("totalKeysExamined")
+            })
+        return results
+
+    async def drop(self):
+        await self.client.drop_database(self.db_name)
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,77 @@
+"""Byte-bounded LRU cache for rendered GET responses.
+
+Entries are keyed by whatever the caller derives from the request and the
+data it depends on, so a stale entry is never invalidated in place: it just
+stops being asked for and ages out. The bound is on the summed body sizes,
+not the entry count, because a full passenger listing and a single-airport
+page differ by orders of magnitude.
+"""
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    headers: Dict[str, str]
+
+
+class ResponseCache:
+    """Least-recently-used response bodies, at most ``max_bytes`` in total"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        if max_bytes < 0:
+            raise ValueError("max_bytes must not be negative")
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, body: bytes, headers: Dict[str, str]) -> bool:
+        """Store a body, evicting the least recently used ones to make room.
+
+        Bodies bigger than the whole cache are not stored.
+        """
+        if len(body) > self.max_bytes:
+            return False
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= len(previous.body)
+        while self._entries and self.bytes + len(body) > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= len(evicted.body)
+            self.evictions += 1
+        self._entries[key] = CachedResponse(body, headers)
+        self.bytes += len(body)
+        return True
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions
+        }
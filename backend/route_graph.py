@@ -0,0 +1,400 @@
+"""Process-resident route graph index.
+
+Airports are interned to dense integer ids and every flight is stored once
+as an undirected edge, so the graph endpoints can answer from memory
+instead of rebuilding an adjacency list from MongoDB on every request.
+The index is loaded at startup and kept current by the write endpoints.
+"""
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+DEFAULT_DURATION_MINUTES = 120
+
+
+def parse_departure_minutes(value) -> Optional[int]:
+    """Parse an "HH:MM" departure time into minutes after midnight"""
+    try:
+        hours, minutes = (int(part) for part in str(value).split(":")[:2])
+    except (TypeError, ValueError):
+        return None
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        return None
+    return hours * 60 + minutes
+
+
+class RouteEdge:
+    """A single flight route between two interned airports"""
+
+    __slots__ = ("key", "flight_id", "u", "v", "departure_time", "departure_minutes", "duration")
+
+    def __init__(self, key: str, flight_id: str, u: int, v: int, departure_time: str,
+                 duration: int = DEFAULT_DURATION_MINUTES):
+        self.key = key
+        self.flight_id = flight_id
+        self.u = u
+        self.v = v
+        self.departure_time = departure_time
+        self.departure_minutes = parse_departure_minutes(departure_time)
+        self.duration = duration
+
+    def other(self, node: int) -> int:
+        return self.v if node == self.u else self.u
+
+
+class CSRGraph(NamedTuple):
+    """Compressed sparse row adjacency over present airports.
+
+    The neighbours of ``codes[i]`` are ``targets[offsets[i]:offsets[i + 1]]``
+    and ``index`` maps a code back to its dense id. Cheap to pickle.
+    """
+    codes: List[str]
+    index: Dict[str, int]
+    offsets: array
+    targets: array
+
+
+def bfs_parents(offsets: Sequence[int], targets: Sequence[int], source: int) -> array:
+    """Breadth-first search tree from ``source`` as a parent array.
+
+    ``parents[v]`` is the predecessor of ``v`` on a shortest hop path, the
+    source is its own parent and unreachable nodes are ``-1``.
+    """
+    parents = array('i', [-1]) * (len(offsets) - 1)
+    parents[source] = source
+    frontier = [source]
+    for node in frontier:
+        for neighbor in targets[offsets[node]:offsets[node + 1]]:
+            if parents[neighbor] < 0:
+                parents[neighbor] = node
+                frontier.append(neighbor)
+    return parents
+
+
+def bfs_distances(offsets: Sequence[int], targets: Sequence[int], source: int) -> array:
+    """Hop distance from ``source`` to every node, ``-1`` when unreachable"""
+    dist = array('i', [-1]) * (len(offsets) - 1)
+    dist[source] = 0
+    frontier = [source]
+    for node in frontier:
+        hops = dist[node] + 1
+        for neighbor in targets[offsets[node]:offsets[node + 1]]:
+            if dist[neighbor] < 0:
+                dist[neighbor] = hops
+                frontier.append(neighbor)
+    return dist
+
+
+def simple_paths(
+    offsets: Sequence[int],
+    targets: Sequence[int],
+    source: int,
+    target: int,
+    max_hops: int,
+    exact_hops: Optional[int] = None,
+    heartbeat: int = 0,
+    remaining: Optional[Sequence[int]] = None,
+) -> Iterator[Optional[List[int]]]:
+    """Enumerate simple paths from ``source`` to ``target`` depth first.
+
+    Uses an explicit stack of neighbour cursors, so long chains cannot hit
+    the recursion limit and the path is only copied when it is yielded.
+    Paths longer than ``max_hops`` (or not exactly ``exact_hops``) are
+    skipped, and branches that cannot reach ``target`` within the limit are
+    pruned using hop distances from ``target``. With ``heartbeat`` set,
+    ``None`` is yielded every that many expansions so a caller can check a
+    time budget or hand control back to an event loop. ``remaining`` may
+    pass in precomputed ``bfs_distances`` from ``target``.
+    """
+    if source == target:
+        if not exact_hops:
+            yield [source]
+        return
+    limit = max_hops if exact_hops is None else exact_hops
+    if remaining is None:
+        remaining = bfs_distances(offsets, targets, target)
+    if remaining[source] < 0 or remaining[source] > limit:
+        return
+    on_path = bytearray(len(offsets) - 1)
+    on_path[source] = 1
+    path = [source]
+    cursors = [offsets[source]]
+    expansions = 0
+    while cursors:
+        node = path[-1]
+        cursor = cursors[-1]
+        if cursor == offsets[node + 1]:
+            cursors.pop()
+            on_path[path.pop()] = 0
+            continue
+        cursors[-1] = cursor + 1
+        neighbor = targets[cursor]
+        if on_path[neighbor]:
+            continue
+        hops = len(path)
+        if neighbor == target:
+            if exact_hops is None or hops == exact_hops:
+                yield path + [neighbor]
+            continue
+        if remaining[neighbor] < 0 or hops + remaining[neighbor] > limit:
+            continue
+        path.append(neighbor)
+        on_path[neighbor] = 1
+        cursors.append(offsets[neighbor])
+        expansions += 1
+        if heartbeat and expansions % heartbeat == 0:
+            yield None
+
+
+def shortest_simple_paths(offsets, targets, source, target, max_hops, heartbeat=0):
+    """Simple paths in non-decreasing hop order by iterative deepening.
+
+    Each depth only enumerates paths of exactly that many hops, and distance
+    pruning keeps the shallower levels cheap, so the first ``k`` results are
+    the ``k`` fewest-hop paths.
+    """
+    if source == target:
+        yield [source]
+        return
+    remaining = bfs_distances(offsets, targets, target)
+    if remaining[source] < 0:
+        return
+    for hops in range(remaining[source], max_hops + 1):
+        yield from simple_paths(offsets, targets, source, target, max_hops,
+                                exact_hops=hops, heartbeat=heartbeat, remaining=remaining)
+
+
+def trace_path(parents: Sequence[int], source: int, target: int) -> Optional[List[int]]:
+    """Walk a parent array back from ``target``; ``None`` if unreachable"""
+    if parents[target] < 0:
+        return None
+    path = [target]
+    while target != source:
+        target = parents[target]
+        path.append(target)
+    path.reverse()
+    return path
+
+
+def paths_from_sources(offsets, targets, jobs) -> List[List[Optional[List[int]]]]:
+    """Resolve ``[(source, [target, ...]), ...]`` with one BFS per source.
+
+    Module level so it can run in a worker process.
+    """
+    results = []
+    for source, wanted in jobs:
+        parents = bfs_parents(offsets, targets, source)
+        results.append([trace_path(parents, source, target) for target in wanted])
+    return results
+
+
+def flight_key(flight: Dict) -> str:
+    """Stable identity of a flight document inside the index"""
+    return flight.get('id') or flight['flight_id']
+
+
+class RouteGraph:
+    """Undirected airport/flight graph with integer-indexed adjacency"""
+
+    def __init__(self):
+        # Called with the airport codes touched by each mutation, or None
+        # when the whole graph was replaced
+        self._listeners: List[Callable[[Optional[Iterable[str]]], None]] = []
+        self.clear()
+
+    def subscribe(self, listener: Callable[[Optional[Iterable[str]]], None]):
+        self._listeners.append(listener)
+
+    def _notify(self, codes: Optional[Iterable[str]]):
+        for listener in self._listeners:
+            listener(codes)
+
+    def clear(self):
+        self._ids: Dict[str, int] = {}
+        self._codes: List[str] = []
+        self._present = bytearray()
+        # Present airports in insertion order, mirroring collection order
+        self._airports: Dict[str, int] = {}
+        self._edges: Dict[str, RouteEdge] = {}
+        # Per node: edge key -> RouteEdge, in insertion order
+        self._incident: List[Dict[str, RouteEdge]] = []
+        # Per node: edge key -> neighbour id, the hot path for traversals
+        self._neighbors: List[Dict[str, int]] = []
+        # Per node: (departure minutes, edges) sorted by time, built on demand
+        self._departures: Dict[int, Tuple[List[int], List[RouteEdge]]] = {}
+        self.version = 0
+        self._csr: Optional[Tuple[int, CSRGraph]] = None
+        self._notify(None)
+
+    def load(self, airports: List[Dict], flights: List[Dict]):
+        """Rebuild the index from full airport and flight listings"""
+        self.clear()
+        for airport in airports:
+            self.add_airport(airport['code'])
+        for flight in flights:
+            self.add_flight(flight)
+
+    def _intern(self, code: str) -> int:
+        node = self._ids.get(code)
+        if node is None:
+            node = len(self._codes)
+            self._ids[code] = node
+            self._codes.append(code)
+            self._present.append(0)
+            self._incident.append({})
+            self._neighbors.append({})
+        return node
+
+    def __len__(self) -> int:
+        return len(self._airports)
+
+    @property
+    def flight_count(self) -> int:
+        return len(self._edges)
+
+    def has_airport(self, code: str) -> bool:
+        return code in self._airports
+
+    def node_id(self, code: str) -> Optional[int]:
+        return self._airports.get(code)
+
+    def code(self, node: int) -> str:
+        return self._codes[node]
+
+    def is_present(self, node: int) -> bool:
+        return bool(self._present[node])
+
+    def airport_codes(self) -> List[str]:
+        return list(self._airports)
+
+    def add_airport(self, code: str):
+        node = self._intern(code)
+        if not self._present[node]:
+            self._present[node] = 1
+            self._airports[code] = node
+            self._departures.clear()
+            self.version += 1
+            self._notify((code,))
+
+    def remove_airport(self, code: str):
+        node = self._airports.pop(code, None)
+        if node is not None:
+            self._present[node] = 0
+            self._departures.clear()
+            self.version += 1
+            self._notify((code,))
+
+    def add_flight(self, flight: Dict):
+        key = flight_key(flight)
+        if key in self._edges:
+            self.remove_flight(flight)
+        u = self._intern(flight['source_code'])
+        v = self._intern(flight['destination_code'])
+        duration = flight.get('duration_minutes') or DEFAULT_DURATION_MINUTES
+        edge = RouteEdge(key, flight['flight_id'], u, v, flight['departure_time'], duration)
+        self._edges[key] = edge
+        self._incident[u][key] = edge
+        self._incident[v][key] = edge
+        self._neighbors[u][key] = v
+        self._neighbors[v][key] = u
+        self._departures.pop(u, None)
+        self.version += 1
+        self._notify((flight['source_code'], flight['destination_code']))
+
+    def remove_flight(self, flight: Dict):
+        edge = self._edges.pop(flight_key(flight), None)
+        if edge is None:
+            return
+        for node in (edge.u, edge.v):
+            self._incident[node].pop(edge.key, None)
+            self._neighbors[node].pop(edge.key, None)
+        self._departures.pop(edge.u, None)
+        self.version += 1
+        self._notify((self._codes[edge.u], self._codes[edge.v]))
+
+    def neighbors(self, code: str) -> List[str]:
+        """Neighbouring airport codes, one entry per connecting flight"""
+        node = self._airports.get(code)
+        if node is None:
+            return []
+        present = self._present
+        codes = self._codes
+        return [codes[w] for w in self._neighbors[node].values() if present[w]]
+
+    def departures(self, node: int) -> Tuple[List[int], List[RouteEdge]]:
+        """Scheduled departures out of ``node`` sorted by time of day.
+
+        Returns parallel lists of departure minutes and edges so callers can
+        ``bisect`` straight to the first viable connection. Flights with an
+        unparseable departure time or a deleted destination are left out.
+        """
+        timetable = self._departures.get(node)
+        if timetable is None:
+            present = self._present
+            entries = sorted(
+                (edge.departure_minutes, edge.flight_id, edge.key)
+                for edge in self._incident[node].values()
+                if edge.u == node and edge.departure_minutes is not None and present[edge.v]
+            )
+            edges = self._edges
+            timetable = ([minutes for minutes, _, _ in entries], [edges[key] for _, _, key in entries])
+            self._departures[node] = timetable
+        return timetable
+
+    def shortest_path(self, start: str, end: str) -> Optional[List[str]]:
+        """Fewest-hop path using parent pointers, stopping once ``end`` is found"""
+        source = self._airports.get(start)
+        target = self._airports.get(end)
+        if source is None or target is None:
+            return None
+        present = self._present
+        neighbors = self._neighbors
+        parents = {source: source}
+        frontier = [source]
+        for node in frontier:
+            if node == target:
+                break
+            for neighbor in neighbors[node].values():
+                if neighbor not in parents and present[neighbor]:
+                    parents[neighbor] = node
+                    frontier.append(neighbor)
+        if target not in parents:
+            return None
+        path = [target]
+        while path[-1] != source:
+            path.append(parents[path[-1]])
+        codes = self._codes
+        return [codes[node] for node in reversed(path)]
+
+    def adjacency_list(self) -> Dict[str, List[Dict]]:
+        adj_list = {}
+        codes = self._codes
+        for code, node in self._airports.items():
+            adj_list[code] = [
+                {
+                    "destination": codes[edge.other(node)],
+                    "flight_id": edge.flight_id,
+                    "departure_time": edge.departure_time
+                }
+                for edge in self._incident[node].values()
+            ]
+        return adj_list
+
+    def csr(self) -> CSRGraph:
+        """Compressed sparse row view over present airports, rebuilt lazily
+        after a mutation"""
+        if self._csr is not None and self._csr[0] == self.version:
+            return self._csr[1]
+        codes = list(self._airports)
+        index = {code: i for i, code in enumerate(codes)}
+        dense = {node: i for i, node in enumerate(self._airports.values())}
+        offsets = array('i', [0])
+        targets = array('i')
+        for node in self._airports.values():
+            # Parallel flights collapse to one entry; traversals only need reachability
+            neighbors = dict.fromkeys(self._neighbors[node].values())
+            targets.extend(dense[w] for w in neighbors if w in dense)
+            offsets.append(len(targets))
+        graph = CSRGraph(codes, index, offsets, targets)
+        self._csr = (self.version, graph)
+        return graph
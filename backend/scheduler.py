@@ -0,0 +1,92 @@
+"""Process-resident departure scheduler.
+
+Flights live in one list kept sorted by ``(departure minutes, flight_id,
+insertion sequence)``, so ties always break the same way and never fall
+through to comparing documents. Departure times are parsed once, when a
+flight is pushed.
+
+Every read is a bisect to the start of its window followed by a slice:
+the first ``k`` departures at or after a time, or everything between two
+times, cost O(log n + k) however many flights depart earlier in the day.
+Pushes and removes bisect too, and then shift the tail of the list; that
+memmove is cheap next to the database write behind each of those calls.
+"""
+from bisect import bisect_left, insort
+from itertools import count
+from typing import Dict, Iterable, List, Optional
+
+from route_graph import MINUTES_PER_DAY, flight_key, parse_departure_minutes
+
+# Unparseable departure times sort after every real one
+UNSCHEDULED = MINUTES_PER_DAY
+
+
+class DepartureScheduler:
+    """Flights sorted by time of departure"""
+
+    def __init__(self):
+        # (minutes, flight_id, seq, key) of every scheduled flight, in departure order
+        self._timeline: List[tuple] = []
+        self._entries: Dict[str, tuple] = {}
+        self._flights: Dict[str, Dict] = {}
+        self._seq = count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._timeline = []
+        self._entries = {}
+        self._flights = {}
+
+    def load(self, flights: Iterable[Dict]):
+        self.clear()
+        for flight in flights:
+            self._entry(flight)
+        # A key loaded twice keeps only its last entry
+        self._timeline = sorted(self._entries.values())
+
+    def _entry(self, flight: Dict) -> tuple:
+        key = flight_key(flight)
+        minutes = parse_departure_minutes(flight.get('departure_time'))
+        entry = (UNSCHEDULED if minutes is None else minutes, flight['flight_id'], next(self._seq), key)
+        self._entries[key] = entry
+        self._flights[key] = {k: v for k, v in flight.items() if k not in ("_id", "seat_words")}
+        return entry
+
+    def push(self, flight: Dict):
+        """Schedule a flight, replacing any earlier version of it"""
+        self.remove(flight_key(flight))
+        insort(self._timeline, self._entry(flight))
+
+    def remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        del self._flights[key]
+        del self._timeline[bisect_left(self._timeline, entry)]
+        return True
+
+    def _window(self, start: int, end: int, limit: Optional[int] = None) -> List[Dict]:
+        """Up to ``limit`` flights departing from ``start`` through ``end`` minutes"""
+        first = bisect_left(self._timeline, (start,))
+        last = bisect_left(self._timeline, (end + 1,), first)
+        if limit is not None:
+            last = min(last, first + limit)
+        return [self._flights[entry[-1]] for entry in self._timeline[first:last]]
+
+    def ordered(self) -> List[Dict]:
+        return [self._flights[entry[-1]] for entry in self._timeline]
+
+    def next(self, k: int, after: Optional[int] = None) -> List[Dict]:
+        """The first ``k`` flights departing at or after ``after`` minutes"""
+        return self._window(0 if after is None else after, UNSCHEDULED, k)
+
+    def between(self, start: int, end: int, limit: Optional[int] = None) -> List[Dict]:
+        """Flights departing from ``start`` through ``end`` minutes, wrapping past midnight when ``start > end``"""
+        if start <= end:
+            return self._window(start, end, limit)
+        flights = self._window(start, MINUTES_PER_DAY - 1, limit)
+        if limit is not None:
+            limit -= len(flights)
+        return flights + self._window(0, end, limit)
@@ -0,0 +1,111 @@
+"""Per-flight seat inventory stored as a compact bitmap.
+
+Seats are numbered row by row ("1A".."1F", "2A", ...) and seat ``i`` is
+bit ``i % 32`` of word ``i // 32`` in the flight's ``seat_words`` array.
+Keeping the words as small integers lets MongoDB test and set a single
+seat atomically with ``$bitsAllClear`` and ``$bit``.
+"""
+import base64
+import re
+from typing import Dict, Iterable, List, Optional
+
+from bson.int64 import Int64
+
+SEAT_LETTERS = "ABCDEF"
+WORD_BITS = 32
+
+_SEAT_PATTERN = re.compile(r"^\s*(\d+)\s*([A-Za-z])\s*$")
+
+
+def word_count(total_seats: int) -> int:
+    return max(1, -(-total_seats // WORD_BITS))
+
+
+def seat_index(seat_number: str, total_seats: int) -> Optional[int]:
+    """Map a seat label such as "12A" to its bit index, or None if invalid"""
+    match = _SEAT_PATTERN.match(seat_number or "")
+    if not match:
+        return None
+    row = int(match.group(1))
+    letter = SEAT_LETTERS.find(match.group(2).upper())
+    if row < 1 or letter < 0:
+        return None
+    idx = (row - 1) * len(SEAT_LETTERS) + letter
+    return idx if idx < total_seats else None
+
+
+def seat_label(idx: int) -> str:
+    row, letter = divmod(idx, len(SEAT_LETTERS))
+    return f"{row + 1}{SEAT_LETTERS[letter]}"
+
+
+def seat_word(idx: int) -> tuple:
+    """``(word index, bit index)`` of a seat in ``seat_words``"""
+    return divmod(idx, WORD_BITS)
+
+
+def empty_words(total_seats: int) -> List[Int64]:
+    return [Int64(0)] * word_count(total_seats)
+
+
+def bits_by_word(seat_indices: Iterable[int]) -> Dict[int, List[int]]:
+    """Group seat indices into ``{word index: [bit, ...]}``"""
+    grouped: Dict[int, List[int]] = {}
+    for idx in seat_indices:
+        word, bit = seat_word(idx)
+        grouped.setdefault(word, []).append(bit)
+    return grouped
+
+
+def build_words(seat_indices: Iterable[int], total_seats: int) -> List[Int64]:
+    words = [0] * word_count(total_seats)
+    for idx in seat_indices:
+        word, bit = seat_word(idx)
+        words[word] |= 1 << bit
+    return [Int64(word) for word in words]
+
+
+class SeatMap:
+    """Read-side view of a flight's seat bitmap"""
+
+    def __init__(self, words: Iterable[int], total_seats: int):
+        self.total_seats = total_seats
+        self.words = [int(word) for word in words]
+        self.words += [0] * (word_count(total_seats) - len(self.words))
+
+    def is_free(self, idx: int) -> bool:
+        word, bit = seat_word(idx)
+        return not (self.words[word] >> bit) & 1
+
+    @property
+    def occupied(self) -> int:
+        return sum(bin(word).count("1") for word in self.words)
+
+    def to_bytes(self) -> bytes:
+        """Little-endian bitmap, one bit per seat in seat-index order"""
+        data = b"".join(word.to_bytes(WORD_BITS // 8, "little") for word in self.words)
+        return data[:-(-self.total_seats // 8)]
+
+    def encoded(self) -> str:
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    def best_block(self, count: int = 1) -> List[str]:
+        """Pick ``count`` free seats, preferring the frontmost contiguous run
+        within one row and falling back to the first free seats anywhere.
+        Returns an empty list when fewer than ``count`` seats are free.
+        """
+        per_row = len(SEAT_LETTERS)
+        if count <= per_row:
+            for row_start in range(0, self.total_seats, per_row):
+                run = []
+                for idx in range(row_start, min(row_start + per_row, self.total_seats)):
+                    run = run + [idx] if self.is_free(idx) else []
+                    if len(run) == count:
+                        return [seat_label(seat) for seat in run]
+        free = []
+        for idx in range(self.total_seats):
+            if self.is_free(idx):
+                free.append(idx)
+                if len(free) == count:
+                    return [seat_label(seat) for seat in free]
+        return []
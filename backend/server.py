@@ -1,27 +1,102 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from bson import json_util
 import os
+import json
+import base64
+import hashlib
+import zlib
+import time
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, ValidationError
 from typing import List, Optional, Dict
+import re
 import uuid
 from datetime import datetime, timezone
-import heapq
-from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from route_graph import (
+    RouteGraph, flight_key, parse_departure_minutes, paths_from_sources, shortest_simple_paths, simple_paths
+)
+from itinerary import OBJECTIVES, plan_itinerary
+from distance_matrix import HopDistanceIndex
+from scheduler import DepartureScheduler
+from hash_table import DEFAULT_MAX_LOAD, DEFAULT_SIZE, HashTable
+from response_cache import DEFAULT_MAX_BYTES, ResponseCache
+from change_feed import DEFAULT_CAPACITY, ChangeFeed, StaleToken
+from memory_store import MemoryStore
+from mongo_store import MongoStore
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, CommandMetrics, Registry, RequestMetrics
+from snapshot import INT_COLUMN, STRING_COLUMN, SnapshotReader, SnapshotWriter
+from seat_map import SEAT_LETTERS, SeatMap, build_words, empty_words, seat_index
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# "mongo" (default) or "memory": the same repositories over process-local structures, for runs without MongoDB
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo')
+# Request latency, size and database metrics served at /metrics
+metrics_registry = Registry()
+# Only MongoDB reports its commands; the memory backend has nothing to count
+command_metrics: Optional[CommandMetrics] = None
+if STORAGE_BACKEND == 'memory':
+    store = MemoryStore()
+elif STORAGE_BACKEND == 'mongo':
+    command_metrics = CommandMetrics(metrics_registry)
+    store = MongoStore(os.environ['MONGO_URL'], os.environ.get('DB_NAME', 'flight_simulator'), [command_metrics])
+else:
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}; expected 'mongo' or 'memory'")
+# Export key -> repository, in the order they are written (and must be restored)
+REPOSITORIES = {
+    "airports": store.airports,
+    "flights": store.flights,
+    "passengers": store.passengers,
+    "boarding_queues": store.boarding_queue,
+    "cancellations": store.cancellations
+}
 
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
+# Resident airport/flight graph, loaded at startup and kept current by the write endpoints
+route_graph = RouteGraph()
+# All-pairs hop distances, cached per connected component of route_graph
+distance_index = HopDistanceIndex(route_graph)
+
+# Resident departure heap behind the scheduler endpoints
+departure_scheduler = DepartureScheduler()
+
+# Resident ticket_id -> passenger index behind search and the hash-table view
+ticket_index = HashTable(
+    initial_size=int(os.environ.get('TICKET_TABLE_SIZE', DEFAULT_SIZE)),
+    max_load=float(os.environ.get('TICKET_TABLE_MAX_LOAD', DEFAULT_MAX_LOAD))
+)
+
+# Rendered GET responses, keyed on the versions of the collections behind them
+response_cache = ResponseCache(int(os.environ.get('RESPONSE_CACHE_BYTES', DEFAULT_MAX_BYTES)))
+
+# Recent write events behind the /events stream
+changes = ChangeFeed(int(os.environ.get('EVENT_BUFFER_SIZE', DEFAULT_CAPACITY)))
+EVENT_HEARTBEAT_SECONDS = float(os.environ.get('EVENT_HEARTBEAT_SECONDS', 15))
+
+# Worker processes for large batched path queries, started on first use
+path_pool: Optional[ProcessPoolExecutor] = None
+PATH_POOL_WORKERS = int(os.environ.get('PATH_POOL_WORKERS', os.cpu_count() or 2))
+PATH_POOL_MIN_SOURCES = int(os.environ.get('PATH_POOL_MIN_SOURCES', 64))
+
+# Documents per insert_many call in bulk write paths
+BULK_INSERT_CHUNK = 1000
+
+# Where binary state snapshots are saved and restored from; outside the source tree by default
+SNAPSHOT_DIR = Path(os.environ.get(
+    'SNAPSHOT_DIR',
+    Path(os.environ.get('XDG_DATA_HOME', Path.home() / '.local' / 'share')) / 'flight-simulator' / 'snapshots'
+))
+
 # Pydantic Models
 class Airport(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -42,6 +117,7 @@ class FlightRoute(BaseModel):
     source_code: str
     destination_code: str
     departure_time: str
+    duration_minutes: int = 120
     total_seats: int = 180
     booked_seats: int = 0
 
@@ -50,6 +126,7 @@ class FlightRouteCreate(BaseModel):
     source_code: str
     destination_code: str
     departure_time: str
+    duration_minutes: int = 120
     total_seats: int = 180
 
 class Passenger(BaseModel):
@@ -81,6 +158,14 @@ class CancellationItem(BaseModel):
     flight_id: str
     timestamp: str
 
+class RoutePair(BaseModel):
+    source: str
+    destination: str
+
+class PathBatchRequest(BaseModel):
+    pairs: List[RoutePair]
+    parallel: bool = False
+
 class Analytics(BaseModel):
     total_airports: int
     total_flights: int
@@ -90,141 +175,312 @@ class Analytics(BaseModel):
     pending: int
     upcoming_flight: Optional[Dict] = None
 
-# Helper function to generate hash
-def generate_hash(value: str, table_size: int = 10) -> int:
-    hash_val = 0
-    for char in value:
-        hash_val = (hash_val * 31 + ord(char)) % table_size
-    return hash_val
+# Keyset pagination shared by the list endpoints; a request without `limit`
+# gets the default page, and the rest is reached by following X-Next-Cursor
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(values: List) -> str:
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+def decode_cursor(token: str, size: int) -> List:
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(token.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def parse_fields(fields: Optional[str], model) -> Optional[List[str]]:
+    """Validate a comma-separated field list against a response model"""
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in model.model_fields]
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+async def fetch_page(repo, filters: Dict, model, limit: Optional[int],
+                     after: Optional[str], fields: Optional[List[str]]):
+    """One page of `repo` in its keyset order, resuming after the `after` cursor.
+    
+    The cursor holds the last document's sort values, the final one unique
+    (normally `_id`), so it is an exact position. Returns the documents and
+    the cursor for the next page, if any.
+    
+    Without `limit` a page holds DEFAULT_PAGE_SIZE documents. To read a whole
+    collection, pass each response's X-Next-Cursor header back as `after`
+    until a response comes without one.
+    """
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    elif not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"Limit must be between 1 and {MAX_PAGE_SIZE}")
+    values = decode_cursor(after, len(repo.sort)) if after else None
+    docs, last = await repo.page(filters, fields or list(model.model_fields), limit, values)
+    
+    next_cursor = encode_cursor(last) if last else None
+    if fields:
+        docs = [{name: doc[name] for name in fields if name in doc} for doc in docs]
+    else:
+        docs = [model(**doc).model_dump() for doc in docs]
+    return docs, next_cursor
+
+def page_response(docs: List[Dict], next_cursor: Optional[str]) -> JSONResponse:
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return JSONResponse(jsonable_encoder(docs), headers=headers)
+
+# Ticket index helpers; entries are stored as tuples in Passenger field order to stay compact
+PASSENGER_FIELDS = tuple(Passenger.model_fields)
+
+def index_passenger(doc: Dict):
+    ticket_index.put(doc['ticket_id'], tuple(doc.get(field) for field in PASSENGER_FIELDS))
+
+def indexed_passenger(entry: tuple) -> Dict:
+    return dict(zip(PASSENGER_FIELDS, entry))
+
+def set_indexed_status(ticket_ids: List[str], status: str):
+    position = PASSENGER_FIELDS.index('status')
+    for ticket_id in ticket_ids:
+        entry = ticket_index.get(ticket_id)
+        if entry is not None:
+            ticket_index.put(ticket_id, entry[:position] + (status,) + entry[position + 1:])
 
 # Airport APIs
 @api_router.post("/airports", response_model=Airport)
 async def create_airport(airport: AirportCreate):
-    existing = await db.airports.find_one({"code": airport.code}, {"_id": 0})
+    existing = await store.airports.get(airport.code)
     if existing:
         raise HTTPException(status_code=400, detail="Airport code already exists")
     
     airport_obj = Airport(**airport.model_dump())
-    doc = airport_obj.model_dump()
-    await db.airports.insert_one(doc)
+    if not await store.airports.insert(airport_obj.model_dump()):
+        raise HTTPException(status_code=400, detail="Airport code already exists")
+    await bump_stats({"total_airports": 1})
+    route_graph.add_airport(airport_obj.code)
+    changes.publish("airport", "create", airport_obj.code, data=airport_obj.model_dump())
     return airport_obj
 
 @api_router.get("/airports", response_model=List[Airport])
-async def get_airports():
-    airports = await db.airports.find({}, {"_id": 0}).to_list(1000)
-    return airports
+async def get_airports(limit: Optional[int] = None, after: Optional[str] = None, city: Optional[str] = None,
+                       fields: Optional[str] = None):
+    query = {"city": city} if city else {}
+    airports, next_cursor = await fetch_page(store.airports, query, Airport, limit, after,
+                                             parse_fields(fields, Airport))
+    return page_response(airports, next_cursor)
 
 @api_router.delete("/airports/{code}")
 async def delete_airport(code: str):
-    result = await db.airports.delete_one({"code": code})
-    if result.deleted_count == 0:
+    if not await store.airports.delete(code):
         raise HTTPException(status_code=404, detail="Airport not found")
+    await bump_stats({"total_airports": -1})
+    route_graph.remove_airport(code)
+    changes.publish("airport", "delete", code)
     return {"message": "Airport deleted"}
 
 # Flight Route APIs
 @api_router.post("/flights", response_model=FlightRoute)
 async def create_flight(flight: FlightRouteCreate):
-    source = await db.airports.find_one({"code": flight.source_code}, {"_id": 0})
-    dest = await db.airports.find_one({"code": flight.destination_code}, {"_id": 0})
+    source = await store.airports.get(flight.source_code)
+    dest = await store.airports.get(flight.destination_code)
     
     if not source or not dest:
         raise HTTPException(status_code=400, detail="Source or destination airport not found")
     
     flight_obj = FlightRoute(**flight.model_dump())
     doc = flight_obj.model_dump()
-    await db.flights.insert_one(doc)
+    doc['seat_words'] = empty_words(flight_obj.total_seats)
+    if not await store.flights.insert(doc):
+        raise HTTPException(status_code=400, detail="Flight ID already exists")
+    await bump_stats({"total_flights": 1})
+    await offer_upcoming_flight(doc)
+    route_graph.add_flight(doc)
+    departure_scheduler.push(doc)
+    changes.publish("flight", "create", flight_obj.flight_id, flight_obj.flight_id, flight_obj.model_dump())
     return flight_obj
 
 @api_router.get("/flights", response_model=List[FlightRoute])
-async def get_flights():
-    flights = await db.flights.find({}, {"_id": 0}).to_list(1000)
-    return flights
+async def get_flights(limit: Optional[int] = None, after: Optional[str] = None, source: Optional[str] = None,
+                      destination: Optional[str] = None, fields: Optional[str] = None):
+    query = {}
+    if source:
+        query["source_code"] = source
+    if destination:
+        query["destination_code"] = destination
+    flights, next_cursor = await fetch_page(store.flights, query, FlightRoute, limit, after,
+                                            parse_fields(fields, FlightRoute))
+    return page_response(flights, next_cursor)
 
 @api_router.delete("/flights/{flight_id}")
 async def delete_flight(flight_id: str):
-    result = await db.flights.delete_one({"flight_id": flight_id})
-    if result.deleted_count == 0:
+    deleted = await store.flights.delete(flight_id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Flight not found")
+    await bump_stats({"total_flights": -1})
+    await replace_upcoming_flight(flight_id)
+    route_graph.remove_flight(deleted)
+    departure_scheduler.remove(flight_key(deleted))
+    changes.publish("flight", "delete", flight_id, flight_id)
     return {"message": "Flight deleted"}
 
 # Adjacency List API
 @api_router.get("/graph/adjacency-list")
 async def get_adjacency_list():
-    flights = await db.flights.find({}, {"_id": 0}).to_list(1000)
-    airports = await db.airports.find({}, {"_id": 0}).to_list(1000)
+    return route_graph.adjacency_list()
+
+# Seat Inventory APIs
+async def rebuild_seat_inventory(flight_ids: Optional[List[str]] = None, only_missing: bool = False):
+    """Recompute seat bitmaps and booked_seats from passengers who still hold a seat"""
+    totals = await store.flights.seat_totals(flight_ids, only_missing)
+    if not totals:
+        return
     
-    adj_list = {}
-    for airport in airports:
-        adj_list[airport['code']] = []
-    
-    for flight in flights:
-        source = flight['source_code']
-        dest = flight['destination_code']
-        if source in adj_list:
-            adj_list[source].append({
-                "destination": dest,
-                "flight_id": flight['flight_id'],
-                "departure_time": flight['departure_time']
-            })
-        if dest in adj_list:
-            adj_list[dest].append({
-                "destination": source,
-                "flight_id": flight['flight_id'],
-                "departure_time": flight['departure_time']
-            })
-    
-    return adj_list
+    taken = {flight_id: [] for flight_id in totals}
+    booked = dict.fromkeys(totals, 0)
+    async for p in store.passengers.seat_holders(list(totals)):
+        booked[p['flight_id']] += 1
+        idx = seat_index(p['seat_number'], totals[p['flight_id']])
+        if idx is not None:
+            taken[p['flight_id']].append(idx)
+    
+    for flight_id, seats in taken.items():
+        await store.flights.set_inventory(flight_id, build_words(seats, totals[flight_id]), booked[flight_id],
+                                          only_missing)
+
+async def reserve_seat(flight: Dict, idx: Optional[int]) -> bool:
+    """Claim one seat and count the booking in a single conditional update.
+    
+    Labels outside the row/letter scheme (`idx` None) have no bit to claim
+    and only take capacity.
+    """
+    if await store.flights.reserve_seats(flight['flight_id'], [idx]):
+        return True
+    if 'seat_words' not in flight and idx is not None:
+        # Flight predates seat inventory; build its bitmap once and retry
+        await rebuild_seat_inventory([flight['flight_id']], only_missing=True)
+        return await reserve_seat({**flight, 'seat_words': None}, idx)
+    return False
+
+async def release_seat(flight: Dict, seat_number: str):
+    """Give a seat back and uncount the booking"""
+    if 'seat_words' not in flight:
+        await rebuild_seat_inventory([flight['flight_id']], only_missing=True)
+    await store.flights.release_seats(flight['flight_id'], [seat_index(seat_number, flight['total_seats'])])
+
+async def booking_error(flight_id: str) -> str:
+    """Explain why a conditional seat reservation did not match"""
+    flight = await store.flights.get(flight_id)
+    if flight and flight['booked_seats'] >= flight['total_seats']:
+        return "Flight is full"
+    return "Seat already taken"
+
+async def load_seat_map(flight_id: str):
+    """Fetch a flight and its SeatMap"""
+    flight = await store.flights.get(flight_id)
+    if not flight:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    if 'seat_words' not in flight:
+        await rebuild_seat_inventory([flight_id], only_missing=True)
+        flight = await store.flights.get(flight_id)
+    return flight, SeatMap(flight['seat_words'], flight['total_seats'])
+
+@api_router.get("/flights/{flight_id}/seats")
+async def get_seat_map(flight_id: str):
+    """Seat map as a base64 bitmap, one bit per seat in row order (1A, 1B, ...)"""
+    flight, seat_map = await load_seat_map(flight_id)
+    return {
+        "flight_id": flight_id,
+        "total_seats": flight['total_seats'],
+        "booked_seats": flight['booked_seats'],
+        # Free-form seat labels take capacity without a bit, so both limits apply
+        "available": min(seat_map.total_seats - seat_map.occupied, flight['total_seats'] - flight['booked_seats']),
+        "letters": SEAT_LETTERS,
+        "rows": -(-seat_map.total_seats // len(SEAT_LETTERS)),
+        "bitmap": seat_map.encoded()
+    }
+
+@api_router.get("/flights/{flight_id}/seats/next")
+async def suggest_seats(flight_id: str, count: int = 1):
+    """Suggest the next free seat, or the best block of seats for a group"""
+    if count < 1:
+        raise HTTPException(status_code=400, detail="Count must be at least 1")
+    flight, seat_map = await load_seat_map(flight_id)
+    seats = seat_map.best_block(count) if flight['total_seats'] - flight['booked_seats'] >= count else []
+    if not seats:
+        raise HTTPException(status_code=400, detail="Not enough free seats")
+    return {"flight_id": flight_id, "seats": seats}
 
 # Passenger APIs (Hash Table)
 @api_router.post("/passengers", response_model=Passenger)
 async def create_passenger(passenger: PassengerCreate):
-    flight = await db.flights.find_one({"flight_id": passenger.flight_id}, {"_id": 0})
+    flight = await store.flights.get(passenger.flight_id)
     if not flight:
         raise HTTPException(status_code=400, detail="Flight not found")
     
-    if flight['booked_seats'] >= flight['total_seats']:
-        raise HTTPException(status_code=400, detail="Flight is full")
+    # Free-form labels are accepted as before; they just get no slot in the seat map
+    idx = seat_index(passenger.seat_number, flight['total_seats'])
+    if not await reserve_seat(flight, idx):
+        raise HTTPException(status_code=400, detail=await booking_error(passenger.flight_id))
     
     ticket_id = f"TKT{uuid.uuid4().hex[:8].upper()}"
     passenger_obj = Passenger(ticket_id=ticket_id, **passenger.model_dump())
     doc = passenger_obj.model_dump()
     
-    await db.passengers.insert_one(doc)
-    await db.flights.update_one(
-        {"flight_id": passenger.flight_id},
-        {"$inc": {"booked_seats": 1}}
-    )
+    try:
+        if not await store.passengers.insert(doc):
+            raise HTTPException(status_code=409, detail="Ticket ID already exists; please retry")
+    except Exception:
+        await release_seat(flight, passenger.seat_number)
+        raise
     
+    await bump_stats(ticket_stats(passenger.flight_id, None, "pending"))
+    index_passenger(doc)
+    changes.publish("passenger", "create", ticket_id, passenger.flight_id,
+                    {"name": passenger.name, "seat_number": passenger.seat_number, "status": passenger_obj.status})
     return passenger_obj
 
 @api_router.get("/passengers", response_model=List[Passenger])
-async def get_passengers():
-    passengers = await db.passengers.find({}, {"_id": 0}).to_list(1000)
-    return passengers
+async def get_passengers(limit: Optional[int] = None, after: Optional[str] = None, status: Optional[str] = None,
+                         flight_id: Optional[str] = None, fields: Optional[str] = None):
+    query = {}
+    if status:
+        query["status"] = status
+    if flight_id:
+        query["flight_id"] = flight_id
+    passengers, next_cursor = await fetch_page(store.passengers, query, Passenger, limit, after,
+                                               parse_fields(fields, Passenger))
+    return page_response(passengers, next_cursor)
 
 @api_router.get("/passengers/search/{ticket_id}", response_model=Passenger)
 async def search_passenger(ticket_id: str):
-    passenger = await db.passengers.find_one({"ticket_id": ticket_id}, {"_id": 0})
+    # The resident index only sees this worker's writes, so another worker may
+    # have boarded, cancelled or re-imported the ticket since. Answer from the
+    # unique ticket_id index and refresh the resident entry from the result.
+    passenger = await store.passengers.get(ticket_id)
     if not passenger:
+        ticket_index.remove(ticket_id)
         raise HTTPException(status_code=404, detail="Passenger not found")
+    index_passenger(passenger)
     return passenger
 
 @api_router.get("/passengers/hash-table")
 async def get_hash_table():
-    passengers = await db.passengers.find({}, {"_id": 0}).to_list(1000)
-    table_size = 10
-    hash_table = {i: [] for i in range(table_size)}
-    
-    for passenger in passengers:
-        hash_val = generate_hash(passenger['ticket_id'], table_size)
-        hash_table[hash_val].append(passenger)
-    
-    return hash_table
+    return {
+        idx: [indexed_passenger(entry) for _, entry in chain]
+        for idx, chain in ticket_index.buckets()
+    }
+
+@api_router.get("/passengers/hash-table/stats")
+async def get_hash_table_stats():
+    """Bucket occupancy of the resident ticket index"""
+    return ticket_index.stats()
 
 # Boarding Queue APIs
 @api_router.post("/boarding-queue/{flight_id}/enqueue")
 async def enqueue_passenger(flight_id: str, ticket_id: str):
-    passenger = await db.passengers.find_one({"ticket_id": ticket_id}, {"_id": 0})
+    passenger = await store.passengers.get(ticket_id)
     if not passenger:
         raise HTTPException(status_code=404, detail="Passenger not found")
     
@@ -234,75 +490,110 @@ async def enqueue_passenger(flight_id: str, ticket_id: str):
     if passenger['status'] == "boarded":
         raise HTTPException(status_code=400, detail="Passenger already boarded")
     
-    queue = await db.boarding_queue.find({"flight_id": flight_id}, {"_id": 0}).to_list(1000)
-    position = len(queue)
-    
+    # Entries store a monotonic sequence number in `position`; place in line is derived on read
+    sequence = await store.boarding_queue.allocate(flight_id)
     queue_item = {
         "ticket_id": ticket_id,
         "passenger_name": passenger['name'],
         "flight_id": flight_id,
-        "position": position
+        "position": sequence
     }
-    await db.boarding_queue.insert_one(queue_item)
+    await store.boarding_queue.insert(queue_item)
+    position = await store.boarding_queue.rank(flight_id, sequence)
+    changes.publish("boarding_queue", "enqueue", ticket_id, flight_id,
+                    {"passenger_name": passenger['name'], "position": position})
     
     return {"message": "Passenger added to queue", "position": position}
 
 @api_router.post("/boarding-queue/{flight_id}/dequeue")
-async def dequeue_passenger(flight_id: str):
-    queue_item = await db.boarding_queue.find_one({"flight_id": flight_id}, {"_id": 0}, sort=[("position", 1)])
+async def dequeue_passenger(flight_id: str, count: Optional[int] = None):
+    if count is not None:
+        return await dequeue_group(flight_id, count)
+    
+    queue_item = await store.boarding_queue.pop(flight_id)
     if not queue_item:
         raise HTTPException(status_code=404, detail="Queue is empty")
     
-    await db.boarding_queue.delete_one({"ticket_id": queue_item['ticket_id'], "flight_id": flight_id})
-    await db.passengers.update_one(
-        {"ticket_id": queue_item['ticket_id']},
-        {"$set": {"status": "boarded"}}
-    )
-    
-    remaining = await db.boarding_queue.find({"flight_id": flight_id}, {"_id": 0}).to_list(1000)
-    for idx, item in enumerate(remaining):
-        await db.boarding_queue.update_one(
-            {"ticket_id": item['ticket_id'], "flight_id": flight_id},
-            {"$set": {"position": idx}}
-        )
+    await board_passengers(flight_id, [queue_item['ticket_id']])
     
+    queue_item['position'] = 0
     return {"message": "Passenger boarded", "boarded": queue_item}
 
+async def board_passengers(flight_id: str, ticket_ids: List[str]):
+    """Mark tickets boarded and move their analytics counts by previous status"""
+    inc = {}
+    for previous, moved in (await store.passengers.board(ticket_ids)).items():
+        merge_stats(inc, ticket_stats(flight_id, previous, "boarded", moved))
+    await bump_stats(inc)
+    set_indexed_status(ticket_ids, "boarded")
+    changes.publish("boarding_queue", "board", ticket_ids[0] if len(ticket_ids) == 1 else None, flight_id,
+                    {"ticket_ids": ticket_ids, "status": "boarded"})
+
+async def dequeue_group(flight_id: str, count: int):
+    """Board the first `count` passengers in line with a fixed number of round-trips"""
+    if count < 1:
+        raise HTTPException(status_code=400, detail="Count must be at least 1")
+    
+    # The claim keeps a concurrent dequeue from boarding the same entries
+    claim, group = await store.boarding_queue.claim(flight_id, count)
+    if not group:
+        raise HTTPException(status_code=404, detail="Queue is empty")
+    
+    await board_passengers(flight_id, [item['ticket_id'] for item in group])
+    await store.boarding_queue.remove_claimed(claim)
+    
+    for idx, item in enumerate(group):
+        item['position'] = idx
+    return {"message": f"Boarded {len(group)} passengers", "count": len(group), "boarded": group}
+
 @api_router.get("/boarding-queue/{flight_id}", response_model=List[BoardingQueueItem])
-async def get_boarding_queue(flight_id: str):
-    queue = await db.boarding_queue.find({"flight_id": flight_id}, {"_id": 0}, sort=[("position", 1)]).to_list(1000)
-    return queue
+async def get_boarding_queue(flight_id: str, limit: Optional[int] = None, after: Optional[str] = None,
+                             fields: Optional[str] = None):
+    names = parse_fields(fields, BoardingQueueItem)
+    # Keep the sequence number so the page can be ranked below
+    queue, next_cursor = await fetch_page(store.boarding_queue, {"flight_id": flight_id}, BoardingQueueItem,
+                                          limit, after, names and list(dict.fromkeys(names + ["position"])))
+    
+    # Stored positions are sequence numbers; report place in line
+    ahead = 0
+    if after and queue:
+        ahead = await store.boarding_queue.rank(flight_id, queue[0]['position'])
+    for idx, item in enumerate(queue):
+        item['position'] = ahead + idx
+        if names and "position" not in names:
+            del item['position']
+    return page_response(queue, next_cursor)
 
 # Cancellation Stack APIs
 @api_router.post("/cancellations/push")
 async def push_cancellation(ticket_id: str):
-    passenger = await db.passengers.find_one({"ticket_id": ticket_id}, {"_id": 0})
+    passenger = await store.passengers.get(ticket_id)
     if not passenger:
         raise HTTPException(status_code=404, detail="Passenger not found")
     
     if passenger['status'] == 'cancelled':
         raise HTTPException(status_code=400, detail="Ticket already cancelled")
     
+    # Only one concurrent cancellation of a ticket may release its seat
+    previous = await store.passengers.cancel(ticket_id)
+    if previous is None:
+        raise HTTPException(status_code=400, detail="Ticket already cancelled")
+    await bump_stats(ticket_stats(passenger['flight_id'], previous, "cancelled"))
+    set_indexed_status([ticket_id], "cancelled")
+    
     cancellation = {
         "ticket_id": ticket_id,
         "passenger_name": passenger['name'],
         "flight_id": passenger['flight_id'],
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
-    await db.cancellations.insert_one(cancellation)
-    await db.passengers.update_one(
-        {"ticket_id": ticket_id},
-        {"$set": {"status": "cancelled"}}
-    )
+    await store.cancellations.push(cancellation)
     
-    await db.boarding_queue.delete_many({"ticket_id": ticket_id})
+    await store.boarding_queue.remove_ticket(ticket_id)
     
-    flight = await db.flights.find_one({"flight_id": passenger['flight_id']}, {"_id": 0})
-    if flight and flight['booked_seats'] > 0:
-        await db.flights.update_one(
-            {"flight_id": passenger['flight_id']},
-            {"$inc": {"booked_seats": -1}}
-        )
+    flight = await store.flights.get(passenger['flight_id'])
+    if flight:
+        await release_seat(flight, passenger['seat_number'])
     
     # Return without _id
     cancellation_response = {
@@ -311,76 +602,172 @@ async def push_cancellation(ticket_id: str):
         "flight_id": cancellation["flight_id"],
         "timestamp": cancellation["timestamp"]
     }
+    changes.publish("cancellation", "push", ticket_id, passenger['flight_id'],
+                    {"passenger_name": passenger['name'], "seat_number": passenger['seat_number'],
+                     "status": "cancelled", "timestamp": cancellation["timestamp"]})
     return {"message": "Cancellation recorded", "cancellation": cancellation_response}
 
 @api_router.post("/cancellations/pop")
 async def pop_cancellation():
-    cancellation = await db.cancellations.find_one({}, {"_id": 0}, sort=[("timestamp", -1)])
+    cancellation = await store.cancellations.pop()
     if not cancellation:
         raise HTTPException(status_code=404, detail="No cancellations found")
     
-    await db.cancellations.delete_one({"ticket_id": cancellation['ticket_id']})
+    changes.publish("cancellation", "pop", cancellation['ticket_id'], cancellation['flight_id'])
     return {"message": "Cancellation removed", "cancellation": cancellation}
 
 @api_router.get("/cancellations", response_model=List[CancellationItem])
-async def get_cancellations():
-    cancellations = await db.cancellations.find({}, {"_id": 0}, sort=[("timestamp", -1)]).to_list(1000)
-    return cancellations
+async def get_cancellations(limit: Optional[int] = None, after: Optional[str] = None,
+                            flight_id: Optional[str] = None, fields: Optional[str] = None):
+    query = {"flight_id": flight_id} if flight_id else {}
+    cancellations, next_cursor = await fetch_page(store.cancellations, query, CancellationItem, limit, after,
+                                                  parse_fields(fields, CancellationItem))
+    return page_response(cancellations, next_cursor)
 
 # Flight Scheduler (Min Heap) APIs
+async def with_current_bookings(flights: List[Dict]) -> List[Dict]:
+    """Copy scheduled flights with their live booked_seats"""
+    current = await store.flights.get_many([f['flight_id'] for f in flights])
+    return [
+        {**flight, "booked_seats": current[flight['flight_id']]['booked_seats'] if flight['flight_id'] in current
+         else flight.get('booked_seats', 0)}
+        for flight in flights
+    ]
+
+def parse_clock(value: Optional[str], name: str) -> Optional[int]:
+    if value is None:
+        return None
+    minutes = parse_departure_minutes(value)
+    if minutes is None:
+        raise HTTPException(status_code=400, detail=f"{name} must be in HH:MM format")
+    return minutes
+
 @api_router.get("/scheduler/heap")
 async def get_flight_heap():
-    flights = await db.flights.find({}, {"_id": 0}).to_list(1000)
-    
-    heap_data = []
-    for flight in flights:
-        heap_data.append((flight['departure_time'], flight))
-    
-    heapq.heapify(heap_data)
-    
-    result = []
-    while heap_data:
-        time, flight = heapq.heappop(heap_data)
-        result.append(flight)
-    
-    return result
+    """All flights in departure order, read from the resident schedule"""
+    return await with_current_bookings(departure_scheduler.ordered())
+
+@api_router.get("/scheduler/next")
+async def get_next_departures(k: int = 5, after: Optional[str] = None):
+    """The next `k` departures, optionally at or after an HH:MM time"""
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1")
+    return await with_current_bookings(departure_scheduler.next(k, parse_clock(after, "after")))
+
+@api_router.get("/scheduler/between")
+async def get_departures_between(start: str, end: str, limit: Optional[int] = None):
+    """Departures from `start` through `end` (HH:MM); wraps past midnight when start > end"""
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="Limit must be at least 1")
+    flights = departure_scheduler.between(parse_clock(start, "start"), parse_clock(end, "end"), limit)
+    return await with_current_bookings(flights)
 
 # Analytics API
+# Every write path bumps the counters in store.stats, so the dashboard
+# summary is a single read instead of a collection scan.
+TICKET_STATUSES = ("pending", "boarded", "cancelled")
+
+def merge_stats(total: Dict, inc: Dict) -> Dict:
+    for key, value in inc.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+def ticket_stats(flight_id: str, before: Optional[str], after: str, count: int = 1) -> Dict:
+    """Counter deltas for `count` tickets on a flight moving from `before` (None for new tickets) to `after`.
+    
+    Totals are keyed by field name, per-flight counters by (flight_id, field).
+    """
+    inc = {"total_tickets": count} if before is None else {}
+    for status, sign in ((before, -count), (after, count)):
+        if status is None:
+            continue
+        if status in TICKET_STATUSES:
+            merge_stats(inc, {status: sign})
+        if status != "cancelled":
+            merge_stats(inc, {(flight_id, "booked"): sign})
+        if status in ("boarded", "cancelled"):
+            merge_stats(inc, {(flight_id, status): sign})
+    return inc
+
+async def bump_stats(inc: Dict):
+    totals = {}
+    per_flight: Dict[str, Dict[str, int]] = {}
+    for key, value in inc.items():
+        if not value:
+            continue
+        if isinstance(key, tuple):
+            per_flight.setdefault(key[0], {})[key[1]] = value
+        else:
+            totals[key] = value
+    if not await store.stats.bump(totals, per_flight):
+        # No counters to add to (e.g. dropped by hand); recount, which includes this write
+        await reconcile_stats()
+
+async def offer_upcoming_flight(flight: Optional[Dict]):
+    """Make `flight` the upcoming flight if it departs before the current one"""
+    if not flight:
+        return
+    summary = {key: value for key, value in flight.items() if key not in ("_id", "seat_words")}
+    await store.stats.offer_upcoming(summary)
+
+async def replace_upcoming_flight(flight_id: str):
+    """Pick a new upcoming flight if `flight_id` was it"""
+    if await store.stats.clear_upcoming(flight_id):
+        await offer_upcoming_flight(await store.flights.first_departure())
+
+async def reconcile_stats() -> Dict:
+    """Rebuild the analytics counters from scratch"""
+    stats = {
+        "total_airports": await store.airports.count(),
+        "total_flights": await store.flights.count(),
+        "total_tickets": 0,
+        **{status: 0 for status in TICKET_STATUSES},
+        "upcoming_flight": await store.flights.first_departure()
+    }
+    flights: Dict[str, Dict[str, int]] = {}
+    for flight_id, status, tickets in await store.passengers.flight_status_counts():
+        inc = ticket_stats(flight_id, None, status, tickets)
+        for key, value in inc.items():
+            if isinstance(key, tuple):
+                counters = flights.setdefault(key[0], {"booked": 0, "boarded": 0, "cancelled": 0})
+                counters[key[1]] += value
+            else:
+                stats[key] += value
+    await store.stats.replace(stats, flights)
+    return {**stats, "flights": flights}
+
 @api_router.get("/analytics", response_model=Analytics)
 async def get_analytics():
-    airports_count = await db.airports.count_documents({})
-    flights_count = await db.flights.count_documents({})
-    passengers = await db.passengers.find({}, {"_id": 0}).to_list(1000)
-    
-    total_tickets = len(passengers)
-    boarded = sum(1 for p in passengers if p['status'] == 'boarded')
-    cancelled = sum(1 for p in passengers if p['status'] == 'cancelled')
-    pending = sum(1 for p in passengers if p['status'] == 'pending')
+    stats = await store.stats.totals(("total_airports", "total_flights", "total_tickets") + TICKET_STATUSES)
+    if stats is None:
+        stats = await reconcile_stats()
     
-    flights = await db.flights.find({}, {"_id": 0}).to_list(1000)
-    upcoming_flight = None
-    if flights:
-        sorted_flights = sorted(flights, key=lambda x: x['departure_time'])
-        upcoming_flight = sorted_flights[0] if sorted_flights else None
+    upcoming_flight = stats.get('upcoming_flight')
+    if upcoming_flight:
+        counters = await store.stats.flight(upcoming_flight['flight_id'])
+        upcoming_flight['booked_seats'] = counters.get('booked', 0)
     
     return Analytics(
-        total_airports=airports_count,
-        total_flights=flights_count,
-        total_tickets=total_tickets,
-        boarded=boarded,
-        cancelled=cancelled,
-        pending=pending,
+        total_airports=stats['total_airports'],
+        total_flights=stats['total_flights'],
+        total_tickets=stats['total_tickets'],
+        boarded=stats['boarded'],
+        cancelled=stats['cancelled'],
+        pending=stats['pending'],
         upcoming_flight=upcoming_flight
     )
 
+@api_router.post("/analytics/reconcile")
+async def reconcile_analytics():
+    """Recount the analytics counters from the underlying collections"""
+    stats = await reconcile_stats()
+    return {"message": "Analytics counters rebuilt", "total_tickets": stats['total_tickets'], "flights": len(stats['flights'])}
+
 # Initialize with sample data
 @api_router.post("/initialize-data")
 async def initialize_data():
-    await db.airports.delete_many({})
-    await db.flights.delete_many({})
-    await db.passengers.delete_many({})
-    await db.boarding_queue.delete_many({})
-    await db.cancellations.delete_many({})
+    for repo in REPOSITORIES.values():
+        await repo.clear()
     
     sample_airports = [
         {"id": str(uuid.uuid4()), "code": "DEL", "name": "Indira Gandhi International", "city": "New Delhi"},
@@ -390,7 +777,7 @@ async def initialize_data():
         {"id": str(uuid.uuid4()), "code": "CCU", "name": "Netaji Subhas Chandra Bose International", "city": "Kolkata"},
         {"id": str(uuid.uuid4()), "code": "HYD", "name": "Rajiv Gandhi International", "city": "Hyderabad"}
     ]
-    await db.airports.insert_many(sample_airports)
+    await store.airports.insert_many(sample_airports)
     
     sample_flights = [
         {"id": str(uuid.uuid4()), "flight_id": "AI101", "source_code": "DEL", "destination_code": "BOM", "departure_time": "08:00", "total_seats": 180, "booked_seats": 0},
@@ -402,7 +789,7 @@ async def initialize_data():
         {"id": str(uuid.uuid4()), "flight_id": "AI107", "source_code": "DEL", "destination_code": "BLR", "departure_time": "09:00", "total_seats": 180, "booked_seats": 0},
         {"id": str(uuid.uuid4()), "flight_id": "AI108", "source_code": "BOM", "destination_code": "HYD", "departure_time": "11:00", "total_seats": 180, "booked_seats": 0}
     ]
-    await db.flights.insert_many(sample_flights)
+    await store.flights.insert_many(sample_flights)
     
     sample_passengers = [
         {"ticket_id": "TKTABC12345", "name": "Rajesh Kumar", "passport": "P12345678", "flight_id": "AI101", "seat_number": "12A", "status": "pending"},
@@ -418,57 +805,114 @@ async def initialize_data():
         {"ticket_id": "TKTEFG33445", "name": "Arjun Rao", "passport": "P12340987", "flight_id": "AI106", "seat_number": "22E", "status": "pending"},
         {"ticket_id": "TKTHIJ66778", "name": "Neha Bansal", "passport": "P23451098", "flight_id": "AI106", "seat_number": "23F", "status": "pending"}
     ]
-    await db.passengers.insert_many(sample_passengers)
-    
-    for flight_id in ["AI101", "AI102", "AI103", "AI104", "AI105", "AI106"]:
-        flight_passengers = [p for p in sample_passengers if p['flight_id'] == flight_id]
-        await db.flights.update_one(
-            {"flight_id": flight_id},
-            {"$set": {"booked_seats": len(flight_passengers)}}
-        )
+    await store.passengers.insert_many(sample_passengers)
     
+    # Seat bitmaps and booked_seats from the passengers just added
+    await rebuild_seat_inventory()
+    await reconcile_stats()
+    route_graph.load(sample_airports, sample_flights)
+    departure_scheduler.load(sample_flights)
+    await load_ticket_index()
+    changes.publish("system", "reload")
     return {"message": "Sample data initialized successfully"}
 
 @api_router.post("/reset-system")
 async def reset_system():
-    await db.airports.delete_many({})
-    await db.flights.delete_many({})
-    await db.passengers.delete_many({})
-    await db.boarding_queue.delete_many({})
-    await db.cancellations.delete_many({})
+    for repo in REPOSITORIES.values():
+        await repo.clear()
+    await reconcile_stats()
+    route_graph.clear()
+    departure_scheduler.clear()
+    ticket_index.clear()
+    changes.publish("system", "reload")
     return {"message": "System reset successfully"}
 
 # Bulk Operations APIs
 @api_router.post("/passengers/bulk")
 async def bulk_add_passengers(passengers_data: List[PassengerCreate]):
     """Bulk add multiple passengers at once"""
-    added_passengers = []
     errors = []
     
+    # One lookup for every referenced flight
+    flight_ids = list({p.flight_id for p in passengers_data})
+    if flight_ids:
+        await rebuild_seat_inventory(flight_ids, only_missing=True)
+    flights = await store.flights.get_many(flight_ids)
+    
+    # Validate capacity and seats in memory, grouping accepted passengers by flight
+    seat_maps = {flight_id: SeatMap(f['seat_words'], f['total_seats']) for flight_id, f in flights.items()}
+    remaining = {flight_id: f['total_seats'] - f['booked_seats'] for flight_id, f in flights.items()}
+    claimed = {flight_id: set() for flight_id in flights}
+    accepted: Dict[str, List[tuple]] = {}
     for idx, passenger_data in enumerate(passengers_data):
-        try:
-            flight = await db.flights.find_one({"flight_id": passenger_data.flight_id}, {"_id": 0})
-            if not flight:
-                errors.append({"index": idx, "error": f"Flight {passenger_data.flight_id} not found"})
-                continue
-            
-            if flight['booked_seats'] >= flight['total_seats']:
-                errors.append({"index": idx, "error": f"Flight {passenger_data.flight_id} is full"})
-                continue
-            
-            ticket_id = f"TKT{uuid.uuid4().hex[:8].upper()}"
-            passenger_obj = Passenger(ticket_id=ticket_id, **passenger_data.model_dump())
-            doc = passenger_obj.model_dump()
-            
-            await db.passengers.insert_one(doc)
-            await db.flights.update_one(
-                {"flight_id": passenger_data.flight_id},
-                {"$inc": {"booked_seats": 1}}
-            )
-            added_passengers.append(passenger_obj)
-        except Exception as e:
-            errors.append({"index": idx, "error": str(e)})
+        flight_id = passenger_data.flight_id
+        flight = flights.get(flight_id)
+        if not flight:
+            errors.append({"index": idx, "error": f"Flight {flight_id} not found"})
+            continue
+        
+        # None for free-form labels, which take capacity but no seat-map slot
+        seat = seat_index(passenger_data.seat_number, flight['total_seats'])
+        if remaining[flight_id] <= 0:
+            errors.append({"index": idx, "error": f"Flight {flight_id} is full"})
+            continue
+        
+        if seat is not None and (seat in claimed[flight_id] or not seat_maps[flight_id].is_free(seat)):
+            errors.append({"index": idx, "error": f"Flight {flight_id}: Seat already taken"})
+            continue
+        
+        if seat is not None:
+            claimed[flight_id].add(seat)
+        remaining[flight_id] -= 1
+        accepted.setdefault(flight_id, []).append((idx, seat, passenger_data))
+    
+    # One seat/counter update per flight; fall back to per-seat claims if the flight changed underneath us
+    booked = []
+    for flight_id, group in accepted.items():
+        if await store.flights.reserve_seats(flight_id, [seat for _, seat, _ in group]):
+            booked.extend(group)
+            continue
+        for idx, seat, passenger_data in group:
+            if await reserve_seat(flights[flight_id], seat):
+                booked.append((idx, seat, passenger_data))
+            else:
+                reason = await booking_error(flight_id)
+                errors.append({"index": idx, "error": f"Flight {flight_id}: {reason}"})
+    
+    booked.sort(key=lambda item: item[0])
+    added = {}
+    for idx, _, passenger_data in booked:
+        ticket_id = f"TKT{uuid.uuid4().hex[:8].upper()}"
+        added[idx] = Passenger(ticket_id=ticket_id, **passenger_data.model_dump())
+    
+    # Chunked unordered inserts; give seats back for any document that failed
+    order = list(added)
+    seat_of = {idx: (passenger_data.flight_id, seat) for idx, seat, passenger_data in booked}
+    failed_seats: Dict[str, List[int]] = {}
+    for start in range(0, len(order), BULK_INSERT_CHUNK):
+        chunk = order[start:start + BULK_INSERT_CHUNK]
+        failures = await store.passengers.insert_many([added[idx].model_dump() for idx in chunk], ordered=False)
+        for position, message in failures:
+            idx = chunk[position]
+            errors.append({"index": idx, "error": message})
+            flight_id, seat = seat_of[idx]
+            failed_seats.setdefault(flight_id, []).append(seat)
+            del added[idx]
+    for flight_id, seats in failed_seats.items():
+        await store.flights.release_seats(flight_id, seats)
     
+    errors.sort(key=lambda error: error['index'])
+    added_passengers = [added[idx] for idx in order if idx in added]
+    inc = {}
+    for passenger in added_passengers:
+        merge_stats(inc, ticket_stats(passenger.flight_id, None, "pending"))
+        index_passenger(passenger.model_dump())
+    await bump_stats(inc)
+    by_flight: Dict[str, List[str]] = {}
+    for passenger in added_passengers:
+        by_flight.setdefault(passenger.flight_id, []).append(passenger.ticket_id)
+    for flight_id, tickets in by_flight.items():
+        changes.publish("passenger", "create", None, flight_id, {"ticket_ids": tickets, "status": "pending"})
     return {
         "message": f"Added {len(added_passengers)} passengers",
         "added": len(added_passengers),
@@ -483,40 +927,57 @@ async def bulk_enqueue(flight_id: str, ticket_ids: List[str]):
     enqueued = []
     errors = []
     
+    passengers = await store.passengers.get_many(ticket_ids)
+    queued = await store.boarding_queue.queued(flight_id, ticket_ids)
+    
+    accepted = []
     for ticket_id in ticket_ids:
-        try:
-            passenger = await db.passengers.find_one({"ticket_id": ticket_id}, {"_id": 0})
-            if not passenger:
-                errors.append({"ticket_id": ticket_id, "error": "Passenger not found"})
-                continue
-            
-            if passenger['flight_id'] != flight_id:
-                errors.append({"ticket_id": ticket_id, "error": "Passenger flight mismatch"})
-                continue
-            
-            if passenger['status'] == "boarded":
-                errors.append({"ticket_id": ticket_id, "error": "Passenger already boarded"})
-                continue
-            
-            existing = await db.boarding_queue.find_one({"ticket_id": ticket_id, "flight_id": flight_id})
-            if existing:
-                errors.append({"ticket_id": ticket_id, "error": "Already in queue"})
-                continue
-            
-            queue = await db.boarding_queue.find({"flight_id": flight_id}, {"_id": 0}).to_list(1000)
-            position = len(queue)
-            
-            queue_item = {
-                "ticket_id": ticket_id,
+        passenger = passengers.get(ticket_id)
+        if not passenger:
+            errors.append({"ticket_id": ticket_id, "error": "Passenger not found"})
+            continue
+        
+        if passenger['flight_id'] != flight_id:
+            errors.append({"ticket_id": ticket_id, "error": "Passenger flight mismatch"})
+            continue
+        
+        if passenger['status'] == "boarded":
+            errors.append({"ticket_id": ticket_id, "error": "Passenger already boarded"})
+            continue
+        
+        if ticket_id in queued:
+            errors.append({"ticket_id": ticket_id, "error": "Already in queue"})
+            continue
+        
+        queued.add(ticket_id)
+        accepted.append(passenger)
+    
+    if accepted:
+        first = await store.boarding_queue.allocate(flight_id, len(accepted))
+        queue_items = [
+            {
+                "ticket_id": passenger['ticket_id'],
                 "passenger_name": passenger['name'],
                 "flight_id": flight_id,
-                "position": position
+                "position": first + offset
             }
-            await db.boarding_queue.insert_one(queue_item)
-            enqueued.append({"ticket_id": ticket_id, "position": position})
-        except Exception as e:
-            errors.append({"ticket_id": ticket_id, "error": str(e)})
+            for offset, passenger in enumerate(accepted)
+        ]
+        failed = set()
+        for idx, message in await store.boarding_queue.insert_many(queue_items, ordered=False):
+            failed.add(idx)
+            errors.append({"ticket_id": queue_items[idx]['ticket_id'], "error": message})
+        
+        # The block is contiguous, so ranks follow from the number queued ahead of it
+        ahead = await store.boarding_queue.rank(flight_id, first)
+        for offset, queue_item in enumerate(queue_items):
+            if offset in failed:
+                continue
+            enqueued.append({"ticket_id": queue_item['ticket_id'], "position": ahead + len(enqueued)})
     
+    if enqueued:
+        changes.publish("boarding_queue", "enqueue", None, flight_id,
+                        {"ticket_ids": [item['ticket_id'] for item in enqueued]})
     return {
         "message": f"Enqueued {len(enqueued)} passengers",
         "enqueued": len(enqueued),
@@ -529,11 +990,11 @@ async def bulk_enqueue(flight_id: str, ticket_ids: List[str]):
 @api_router.get("/export/all-data")
 async def export_all_data():
     """Export all system data as JSON"""
-    airports = await db.airports.find({}, {"_id": 0}).to_list(1000)
-    flights = await db.flights.find({}, {"_id": 0}).to_list(1000)
-    passengers = await db.passengers.find({}, {"_id": 0}).to_list(1000)
-    boarding_queues = await db.boarding_queue.find({}, {"_id": 0}).to_list(1000)
-    cancellations = await db.cancellations.find({}, {"_id": 0}).to_list(1000)
+    airports = await store.airports.all(1000)
+    flights = await store.flights.all(1000)
+    passengers = await store.passengers.all(1000)
+    boarding_queues = await store.boarding_queue.all(1000)
+    cancellations = await store.cancellations.all(1000)
     
     return {
         "airports": airports,
@@ -544,152 +1005,681 @@ async def export_all_data():
         "exported_at": datetime.now(timezone.utc).isoformat()
     }
 
+EXPORT_FORMAT = "flight-simulator-export"
+EXPORT_VERSION = 1
+
+async def export_records(batch_size: int):
+    """Yield NDJSON chunks: a header line, one line per document, then a trailer.
+    
+    Each collection is read only up to the high-water mark captured
+    before the first document is written, so rows inserted mid-export never
+    appear. The trailer repeats the snapshot id with per-collection counts;
+    a file without it is incomplete.
+    """
+    snapshot = uuid.uuid4().hex
+    high_water = {}
+    for name, repo in REPOSITORIES.items():
+        high_water[name] = await repo.high_water()
+    header = {
+        "type": "header",
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "snapshot": snapshot,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "collections": list(REPOSITORIES)
+    }
+    yield json.dumps(header) + "\n"
+    
+    counts = {}
+    for name, repo in REPOSITORIES.items():
+        counts[name] = 0
+        if high_water[name] is None:
+            continue
+        lines = []
+        async for doc in repo.scan(batch_size, high_water[name]):
+            lines.append(json.dumps({"collection": name, "data": doc}, default=str))
+            if len(lines) >= batch_size:
+                counts[name] += len(lines)
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            counts[name] += len(lines)
+            yield "\n".join(lines) + "\n"
+    
+    yield json.dumps({"type": "trailer", "snapshot": snapshot, "counts": counts}) + "\n"
+
+async def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+@api_router.get("/export/stream")
+async def export_stream(compress: bool = False, batch_size: int = 1000):
+    """Stream every collection as NDJSON, optionally gzip-compressed"""
+    if not 1 <= batch_size <= 10000:
+        raise HTTPException(status_code=400, detail="Batch size must be between 1 and 10000")
+    
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    if compress:
+        return StreamingResponse(
+            gzip_chunks(export_records(batch_size)),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="export-{stamp}.ndjson.gz"'}
+        )
+    return StreamingResponse(
+        export_records(batch_size),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="export-{stamp}.ndjson"'}
+    )
+
 @api_router.post("/import/data")
 async def import_data(data: Dict):
     """Import system data from JSON"""
+    touched = []
     try:
-        if 'airports' in data and data['airports']:
-            await db.airports.insert_many(data['airports'])
-        if 'flights' in data and data['flights']:
-            await db.flights.insert_many(data['flights'])
-        if 'passengers' in data and data['passengers']:
-            await db.passengers.insert_many(data['passengers'])
-        if 'boarding_queues' in data and data['boarding_queues']:
-            await db.boarding_queue.insert_many(data['boarding_queues'])
-        if 'cancellations' in data and data['cancellations']:
-            await db.cancellations.insert_many(data['cancellations'])
+        # Flights whose seats the import can change, new or already booked
+        touched = sorted({record['flight_id'] for key in ('flights', 'passengers')
+                          for record in data.get(key) or [] if isinstance(record, dict) and 'flight_id' in record})
+        for key, repo in REPOSITORIES.items():
+            if data.get(key):
+                failures = await repo.insert_many(data[key])
+                if failures:
+                    raise ValueError(failures[0][1])
+        if touched:
+            await rebuild_seat_inventory(touched)
+        
+        for airport in data.get('airports') or []:
+            route_graph.add_airport(airport['code'])
+        for flight in data.get('flights') or []:
+            route_graph.add_flight(flight)
+            departure_scheduler.push(flight)
+        await reconcile_stats()
+        if data.get('passengers'):
+            await load_ticket_index()
+        changes.publish("system", "reload")
         
         return {"message": "Data imported successfully"}
     except Exception as e:
+        # A partial insert may have landed; resync the graph, index and counters from what was written
+        if touched:
+            await rebuild_seat_inventory(touched)
+        await load_route_graph()
+        await load_ticket_index()
+        await reconcile_stats()
+        changes.publish("system", "reload")
         raise HTTPException(status_code=400, detail=f"Import failed: {str(e)}")
 
+# Streaming import: export key -> model; upserts match on each repository's natural key
+IMPORT_MODELS = {
+    "airports": Airport,
+    "flights": FlightRoute,
+    "passengers": Passenger,
+    "boarding_queues": BoardingQueueItem,
+    "cancellations": CancellationItem
+}
+MAX_REPORTED_ERRORS = 1000
+
+async def ndjson_lines(request: Request):
+    """Yield request body lines one at a time, gunzipping on the fly if needed"""
+    decompressor = None
+    pending = b""
+    first = True
+    async for chunk in request.stream():
+        if first and chunk:
+            first = False
+            if chunk[:2] == b"\x1f\x8b":
+                decompressor = zlib.decompressobj(wbits=31)
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if decompressor is not None:
+        pending += decompressor.flush()
+    if pending:
+        yield pending
+
+async def write_import_chunk(name: str, rows: List[tuple], upsert: bool) -> List[Dict]:
+    """Write one chunk of (line number, document) pairs; return per-line errors"""
+    repo = REPOSITORIES[name]
+    docs = [doc for _, doc in rows]
+    failures = await (repo.upsert_many(docs) if upsert else repo.insert_many(docs, ordered=False))
+    return [{"line": rows[idx][0], "error": message} for idx, message in failures]
+
+@api_router.post("/import/stream")
+async def import_stream(request: Request, mode: str = "insert", chunk_size: int = BULK_INSERT_CHUNK):
+    """Import an NDJSON export (plain or gzip) line by line in bounded memory.
+    
+    Each record is validated against its model and written in chunks of
+    `chunk_size` with unordered inserts, or upserts keyed on the natural
+    id when `mode=upsert`. Bad lines are reported and skipped.
+    """
+    if mode not in ("insert", "upsert"):
+        raise HTTPException(status_code=400, detail="Mode must be insert or upsert")
+    if not 1 <= chunk_size <= 10000:
+        raise HTTPException(status_code=400, detail="Chunk size must be between 1 and 10000")
+    
+    buffers = {name: [] for name in IMPORT_MODELS}
+    written = {name: 0 for name in IMPORT_MODELS}
+    received = {name: 0 for name in IMPORT_MODELS}
+    errors = []
+    failed = 0
+    header = trailer = None
+    line_number = 0
+    # Flights whose seat inventory the written records can change
+    touched_flights = set()
+    
+    def record_errors(line_errors):
+        nonlocal failed
+        failed += len(line_errors)
+        errors.extend(line_errors[:max(0, MAX_REPORTED_ERRORS - len(errors))])
+    
+    async def flush(name):
+        rows, buffers[name] = buffers[name], []
+        if not rows:
+            return
+        if name in ("flights", "passengers"):
+            touched_flights.update(doc['flight_id'] for _, doc in rows)
+        if name == "passengers" and mode == "upsert":
+            # An upsert can move a ticket to another flight, freeing its old seat
+            tickets = [doc['ticket_id'] for _, doc in rows]
+            for passenger in (await store.passengers.get_many(tickets)).values():
+                touched_flights.add(passenger['flight_id'])
+        line_errors = await write_import_chunk(name, rows, mode == "upsert")
+        written[name] += len(rows) - len(line_errors)
+        record_errors(line_errors)
+        logger.info("Import progress: %d lines read, %s written", line_number, written)
+    
+    try:
+        async for raw in ndjson_lines(request):
+            line_number += 1
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                record_errors([{"line": line_number, "error": "Invalid JSON"}])
+                continue
+            if not isinstance(record, dict):
+                record_errors([{"line": line_number, "error": "Unrecognized record"}])
+                continue
+            
+            if record.get("type") == "header":
+                header = record
+                continue
+            if record.get("type") == "trailer":
+                trailer = record
+                continue
+            
+            name = record.get("collection")
+            if name not in IMPORT_MODELS or not isinstance(record.get("data"), dict):
+                record_errors([{"line": line_number, "error": "Unrecognized record"}])
+                continue
+            received[name] += 1
+            try:
+                doc = IMPORT_MODELS[name](**record["data"]).model_dump()
+            except ValidationError as e:
+                problem = e.errors()[0]
+                field = ".".join(str(part) for part in problem['loc'])
+                record_errors([{"line": line_number, "error": f"{field}: {problem['msg']}"}])
+                continue
+            
+            buffers[name].append((line_number, doc))
+            if len(buffers[name]) >= chunk_size:
+                await flush(name)
+        
+        for name in IMPORT_MODELS:
+            await flush(name)
+    finally:
+        # Whatever landed, bring derived state back in line with it
+        if touched_flights:
+            await rebuild_seat_inventory(sorted(touched_flights))
+        if written['airports'] or written['flights']:
+            await load_route_graph()
+        if written['passengers']:
+            await load_ticket_index()
+        await reconcile_stats()
+        changes.publish("system", "reload")
+    
+    # A file cut short has no trailer, or one whose counts disagree with what was read
+    complete = (
+        header is not None and trailer is not None
+        and trailer.get('snapshot') == header.get('snapshot')
+        and all(trailer.get('counts', {}).get(name, 0) == received[name] for name in IMPORT_MODELS)
+    )
+    return {
+        "message": f"Imported {sum(written.values())} records",
+        "mode": mode,
+        "lines": line_number,
+        "written": written,
+        "failed": failed,
+        "complete": complete,
+        "snapshot": header.get('snapshot') if header else None,
+        "errors": errors
+    }
+
+# Snapshot APIs
+SNAPSHOT_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def snapshot_path(name: str) -> Path:
+    if not SNAPSHOT_NAME.match(name):
+        raise HTTPException(status_code=400, detail="Snapshot name may only contain letters, digits, '-' and '_'")
+    return SNAPSHOT_DIR / f"{name}.snap"
+
+def snapshot_schema(model) -> Dict[str, str]:
+    return {
+        name: INT_COLUMN if field.annotation is int else STRING_COLUMN
+        for name, field in model.model_fields.items()
+    }
+
+def write_snapshot_file(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".tmp")
+    partial.write_bytes(data)
+    partial.replace(path)
+
+@api_router.get("/snapshots")
+async def list_snapshots():
+    snapshots = []
+    for path in sorted(SNAPSHOT_DIR.glob("*.snap")) if SNAPSHOT_DIR.exists() else []:
+        try:
+            with SnapshotReader(path) as reader:
+                rows = {name: reader.row_count(name) for name in reader.table_names()}
+                created_at = reader.meta.get('created_at')
+        except (OSError, ValueError):
+            continue
+        snapshots.append({"name": path.stem, "bytes": path.stat().st_size, "created_at": created_at, "rows": rows})
+    return snapshots
+
+@api_router.post("/snapshots/{name}")
+async def save_snapshot(name: str):
+    """Save every collection to a compact columnar snapshot file"""
+    path = snapshot_path(name)
+    started = time.perf_counter()
+    writer = SnapshotWriter()
+    for key, model in IMPORT_MODELS.items():
+        table = writer.table(key, snapshot_schema(model))
+        batch = []
+        async for doc in REPOSITORIES[key].scan(BULK_INSERT_CHUNK):
+            batch.append(model(**doc).model_dump())
+            if len(batch) >= BULK_INSERT_CHUNK:
+                table.extend(batch)
+                batch = []
+        table.extend(batch)
+    data = writer.to_bytes(meta={"created_at": datetime.now(timezone.utc).isoformat()})
+    await asyncio.to_thread(write_snapshot_file, path, data)
+    
+    return {
+        "message": "Snapshot saved",
+        "name": name,
+        "bytes": len(data),
+        "rows": {key: table.rows for key, table in writer.tables.items()},
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+@api_router.post("/snapshots/{name}/restore")
+async def restore_snapshot(name: str):
+    """Replace all data with the contents of a snapshot"""
+    path = snapshot_path(name)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    try:
+        reader = SnapshotReader(path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    started = time.perf_counter()
+    restored = {}
+    with reader:
+        for repo in REPOSITORIES.values():
+            await repo.clear()
+        for key, repo in REPOSITORIES.items():
+            restored[key] = 0
+            if key not in reader.table_names():
+                continue
+            for batch in reader.rows(key, BULK_INSERT_CHUNK):
+                await repo.insert_many(batch, ordered=False)
+                restored[key] += len(batch)
+    
+    await rebuild_seat_inventory()
+    await load_route_graph()
+    await load_ticket_index()
+    await reconcile_stats()
+    changes.publish("system", "reload")
+    return {
+        "message": "Snapshot restored",
+        "name": name,
+        "rows": restored,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
 # Enhanced Analytics APIs
 @api_router.get("/analytics/detailed")
 async def get_detailed_analytics():
     """Get detailed analytics with charts data"""
-    airports = await db.airports.find({}, {"_id": 0}).to_list(1000)
-    flights = await db.flights.find({}, {"_id": 0}).to_list(1000)
-    passengers = await db.passengers.find({}, {"_id": 0}).to_list(1000)
+    # Independent queries, run concurrently; occupancy has one row per flight, the rest stay small
+    by_status, occupancy, (departures, arrivals), airports, queues = await asyncio.gather(
+        store.passengers.status_counts(),
+        store.flights.occupancy(),
+        store.flights.route_counts(),
+        store.airports.all(),
+        store.boarding_queue.lengths()
+    )
     
     # Status distribution
-    status_counts = {
-        "pending": sum(1 for p in passengers if p['status'] == 'pending'),
-        "boarded": sum(1 for p in passengers if p['status'] == 'boarded'),
-        "cancelled": sum(1 for p in passengers if p['status'] == 'cancelled')
-    }
+    status_counts = {status: by_status.get(status, 0) for status in TICKET_STATUSES}
+    total_tickets = sum(by_status.values())
     
-    # Flight occupancy
-    flight_occupancy = []
-    for flight in flights:
-        occupancy_rate = (flight['booked_seats'] / flight['total_seats'] * 100) if flight['total_seats'] > 0 else 0
-        flight_occupancy.append({
-            "flight_id": flight['flight_id'],
-            "route": f"{flight['source_code']}-{flight['destination_code']}",
-            "booked": flight['booked_seats'],
-            "total": flight['total_seats'],
-            "occupancy": round(occupancy_rate, 2)
-        })
+    # Flight occupancy, sorted server-side
+    for row in occupancy:
+        row['occupancy'] = round(row['occupancy'], 2)
     
     # Airport statistics
     airport_stats = []
     for airport in airports:
-        departures = sum(1 for f in flights if f['source_code'] == airport['code'])
-        arrivals = sum(1 for f in flights if f['destination_code'] == airport['code'])
         airport_stats.append({
             "code": airport['code'],
             "name": airport['name'],
-            "departures": departures,
-            "arrivals": arrivals,
-            "total_flights": departures + arrivals
+            "departures": departures.get(airport['code'], 0),
+            "arrivals": arrivals.get(airport['code'], 0),
+            "total_flights": departures.get(airport['code'], 0) + arrivals.get(airport['code'], 0)
         })
     
-    # Boarding queue statistics
-    all_queues = await db.boarding_queue.find({}, {"_id": 0}).to_list(1000)
-    queue_by_flight = {}
-    for item in all_queues:
-        if item['flight_id'] not in queue_by_flight:
-            queue_by_flight[item['flight_id']] = 0
-        queue_by_flight[item['flight_id']] += 1
-    
     return {
         "status_distribution": status_counts,
-        "flight_occupancy": sorted(flight_occupancy, key=lambda x: x['occupancy'], reverse=True),
+        "flight_occupancy": occupancy,
         "airport_statistics": sorted(airport_stats, key=lambda x: x['total_flights'], reverse=True),
-        "queue_statistics": queue_by_flight,
-        "total_revenue": len([p for p in passengers if p['status'] != 'cancelled']) * 5000,
-        "cancellation_rate": round((status_counts['cancelled'] / len(passengers) * 100) if passengers else 0, 2)
+        "queue_statistics": queues,
+        "total_revenue": (total_tickets - status_counts['cancelled']) * 5000,
+        "cancellation_rate": round((status_counts['cancelled'] / total_tickets * 100) if total_tickets else 0, 2)
     }
 
+# Dashboard Snapshot API
+async def all_documents(repo, model) -> List[Dict]:
+    """Every document of `repo`, in the same order as its paged endpoint"""
+    docs, after = await fetch_page(repo, {}, model, MAX_PAGE_SIZE, None, None)
+    while after:
+        page, after = await fetch_page(repo, {}, model, MAX_PAGE_SIZE, after, None)
+        docs += page
+    return docs
+
+async def all_boarding_queues() -> Dict[str, List[Dict]]:
+    """Every flight's boarding queue in line order"""
+    return {
+        # Stored positions are sequence numbers; report place in line
+        flight_id: [{**item, "position": idx} for idx, item in enumerate(queue)]
+        for flight_id, queue in (await store.boarding_queue.grouped()).items()
+    }
+
+# Section name -> loader; each matches the standalone endpoint's payload
+DASHBOARD_SECTIONS = {
+    "airports": lambda: all_documents(store.airports, Airport),
+    "flights": lambda: all_documents(store.flights, FlightRoute),
+    "passengers": lambda: all_documents(store.passengers, Passenger),
+    "hash_table": lambda: get_hash_table(),
+    "adjacency_list": lambda: get_adjacency_list(),
+    "analytics": lambda: get_analytics(),
+    "cancellations": lambda: all_documents(store.cancellations, CancellationItem),
+    "detailed_analytics": lambda: get_detailed_analytics(),
+    "boarding_queues": all_boarding_queues,
+}
+
+@api_router.get("/dashboard/snapshot")
+async def get_dashboard_snapshot(sections: Optional[str] = None):
+    """Everything the dashboard shows in one payload, optionally limited to comma-separated `sections`"""
+    names = list(DASHBOARD_SECTIONS)
+    if sections:
+        names = list(dict.fromkeys(name.strip() for name in sections.split(",") if name.strip()))
+        unknown = [name for name in names if name not in DASHBOARD_SECTIONS]
+        if not names:
+            raise HTTPException(status_code=400, detail="No sections requested")
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+    
+    results = await asyncio.gather(*(DASHBOARD_SECTIONS[name]() for name in names))
+    return dict(zip(names, results))
+
+# Change Feed APIs (Server-Sent Events)
+def sse_event(event: Dict) -> str:
+    payload = {key: value for key, value in event.items() if key != "seq"}
+    return f"id: {changes.token(event['seq'])}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+def sse_reload(seq: int) -> str:
+    return f"id: {changes.token(seq)}\nevent: reload\ndata: {{}}\n\n"
+
+@api_router.get("/events")
+async def stream_events(request: Request, flight_id: Optional[str] = None, last_event_id: Optional[str] = None):
+    """Stream change events, optionally only those for comma-separated `flight_id`s.
+    
+    Reconnecting clients resume after the `Last-Event-ID` header (or
+    `last_event_id`). When the buffer no longer reaches back that far, or the
+    token is from before a restart, a `reload` event asks for a full refetch.
+    """
+    topics = {topic.strip() for topic in flight_id.split(",") if topic.strip()} if flight_id else None
+    token = request.headers.get("last-event-id") or last_event_id
+    seq = changes.seq
+    stale = False
+    if token:
+        try:
+            seq = changes.parse_token(token)
+        except StaleToken:
+            stale = True
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    async def stream(seq: int):
+        yield "retry: 3000\n\n"
+        if stale:
+            yield sse_reload(seq)
+        while True:
+            try:
+                events = changes.since(seq)
+            except StaleToken:
+                # Fell behind the ring buffer while writing to a slow client
+                seq = changes.seq
+                yield sse_reload(seq)
+                continue
+            for event in events:
+                seq = event['seq']
+                if topics is None or event['flight_id'] in topics or event['entity'] == "system":
+                    yield sse_event(event)
+            if not await changes.wait(seq, EVENT_HEARTBEAT_SECONDS):
+                # An id-only message moves a filtered client's resume point past skipped events
+                yield f": keepalive\nid: {changes.token(seq)}\n\n"
+    
+    return StreamingResponse(stream(seq), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # Graph Algorithm APIs - BFS/DFS Pathfinding
 @api_router.get("/graph/bfs/{start}/{end}")
 async def bfs_pathfinding(start: str, end: str):
     """Find path between airports using BFS"""
-    flights = await db.flights.find({}, {"_id": 0}).to_list(1000)
-    airports = await db.airports.find({}, {"_id": 0}).to_list(1000)
-    airport_codes = {a['code'] for a in airports}
-    
-    if start not in airport_codes or end not in airport_codes:
+    if not route_graph.has_airport(start) or not route_graph.has_airport(end):
         raise HTTPException(status_code=404, detail="Airport not found")
     
-    # Build adjacency list
-    adj_list = {airport['code']: [] for airport in airports}
-    for flight in flights:
-        adj_list[flight['source_code']].append(flight['destination_code'])
-        adj_list[flight['destination_code']].append(flight['source_code'])
-    
-    # BFS
-    from collections import deque
-    queue = deque([(start, [start])])
-    visited = {start}
-    
-    while queue:
-        current, path = queue.popleft()
-        if current == end:
-            return {"path": path, "algorithm": "BFS", "hops": len(path) - 1}
-        
-        for neighbor in adj_list[current]:
-            if neighbor not in visited:
-                visited.add(neighbor)
-                queue.append((neighbor, path + [neighbor]))
-    
+    path = route_graph.shortest_path(start, end)
+    if path:
+        return {"path": path, "algorithm": "BFS", "hops": len(path) - 1}
     return {"path": [], "algorithm": "BFS", "message": "No path found"}
 
+@api_router.post("/graph/paths/batch")
+async def batch_pathfinding(request: PathBatchRequest):
+    """Find paths for many airport pairs, sharing one BFS tree per source"""
+    global path_pool
+    csr = route_graph.csr()
+    
+    # Group requested destinations by source so each source is searched once
+    wanted: Dict[int, Dict[int, None]] = {}
+    for pair in request.pairs:
+        source = csr.index.get(pair.source)
+        destination = csr.index.get(pair.destination)
+        if source is not None and destination is not None:
+            wanted.setdefault(source, {})[destination] = None
+    jobs = [(source, list(destinations)) for source, destinations in wanted.items()]
+    
+    if request.parallel and len(jobs) >= PATH_POOL_MIN_SOURCES:
+        if path_pool is None:
+            path_pool = ProcessPoolExecutor(max_workers=PATH_POOL_WORKERS)
+        loop = asyncio.get_running_loop()
+        chunk_size = -(-len(jobs) // PATH_POOL_WORKERS)
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        chunk_results = await asyncio.gather(*[
+            loop.run_in_executor(path_pool, paths_from_sources, csr.offsets, csr.targets, chunk)
+            for chunk in chunks
+        ])
+        results = [paths for chunk in chunk_results for paths in chunk]
+    else:
+        results = await asyncio.to_thread(paths_from_sources, csr.offsets, csr.targets, jobs)
+    
+    found = {}
+    for (source, destinations), paths in zip(jobs, results):
+        for destination, path in zip(destinations, paths):
+            found[(source, destination)] = path
+    
+    response = []
+    for pair in request.pairs:
+        source = csr.index.get(pair.source)
+        destination = csr.index.get(pair.destination)
+        item = {"source": pair.source, "destination": pair.destination}
+        if source is None or destination is None:
+            item.update({"path": [], "message": "Airport not found"})
+        else:
+            path = found[(source, destination)]
+            if path:
+                item.update({"path": [csr.codes[node] for node in path], "hops": len(path) - 1})
+            else:
+                item.update({"path": [], "message": "No path found"})
+        response.append(item)
+    
+    return {"results": response, "algorithm": "BFS", "sources_searched": len(jobs)}
+
 @api_router.get("/graph/dfs/{start}/{end}")
 async def dfs_pathfinding(start: str, end: str):
     """Find path between airports using DFS"""
-    flights = await db.flights.find({}, {"_id": 0}).to_list(1000)
-    airports = await db.airports.find({}, {"_id": 0}).to_list(1000)
-    airport_codes = {a['code'] for a in airports}
+    if not route_graph.has_airport(start) or not route_graph.has_airport(end):
+        raise HTTPException(status_code=404, detail="Airport not found")
+    
+    # First path in depth-first order, found with an explicit stack
+    csr = route_graph.csr()
+    path = next(simple_paths(csr.offsets, csr.targets, csr.index[start], csr.index[end], len(csr.codes)), None)
+    
+    if path:
+        return {"path": [csr.codes[node] for node in path], "algorithm": "DFS", "hops": len(path) - 1}
+    return {"path": [], "algorithm": "DFS", "message": "No path found"}
+
+@api_router.get("/graph/paths/{start}/{end}")
+async def enumerate_paths(
+    start: str,
+    end: str,
+    mode: str = "shortest",
+    k: Optional[int] = None,
+    max_hops: int = 6,
+    time_budget_ms: int = 2000
+):
+    """Stream simple paths between airports as NDJSON.
     
-    if start not in airport_codes or end not in airport_codes:
+    mode=shortest yields the k fewest-hop paths (k defaults to 10); mode=all
+    yields every simple path up to max_hops in depth-first order, capped at
+    k when given. The last line reports how many paths were sent and why
+    the search stopped.
+    """
+    if not route_graph.has_airport(start) or not route_graph.has_airport(end):
         raise HTTPException(status_code=404, detail="Airport not found")
     
-    # Build adjacency list
-    adj_list = {airport['code']: [] for airport in airports}
-    for flight in flights:
-        adj_list[flight['source_code']].append(flight['destination_code'])
-        adj_list[flight['destination_code']].append(flight['source_code'])
+    if mode not in ("shortest", "all"):
+        raise HTTPException(status_code=400, detail="Mode must be one of: shortest, all")
     
-    # DFS
-    def dfs(current, visited, path):
-        if current == end:
-            return path
-        
-        for neighbor in adj_list[current]:
-            if neighbor not in visited:
-                visited.add(neighbor)
-                result = dfs(neighbor, visited, path + [neighbor])
-                if result:
-                    return result
-                visited.remove(neighbor)
-        return None
+    if max_hops < 1 or time_budget_ms < 1 or (k is not None and k < 1):
+        raise HTTPException(status_code=400, detail="k, max_hops and time_budget_ms must be positive")
     
-    visited = {start}
-    path = dfs(start, visited, [start])
+    limit = k if k is not None or mode == "all" else 10
+    csr = route_graph.csr()
+    search = shortest_simple_paths if mode == "shortest" else simple_paths
+    paths = search(csr.offsets, csr.targets, csr.index[start], csr.index[end], max_hops, heartbeat=2000)
     
-    if path:
-        return {"path": path, "algorithm": "DFS", "hops": len(path) - 1}
-    return {"path": [], "algorithm": "DFS", "message": "No path found"}
+    async def stream():
+        deadline = time.monotonic() + time_budget_ms / 1000
+        sent = 0
+        stopped = "exhausted"
+        for path in paths:
+            if path is not None:
+                sent += 1
+                yield json.dumps({"path": [csr.codes[node] for node in path], "hops": len(path) - 1}) + "\n"
+                if limit is not None and sent >= limit:
+                    stopped = "limit"
+                    break
+            if time.monotonic() > deadline:
+                stopped = "time_budget"
+                break
+            # Let other requests run between heartbeats of a long search
+            await asyncio.sleep(0)
+        yield json.dumps({"done": True, "count": sent, "stopped": stopped, "mode": mode}) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@api_router.get("/graph/distance-matrix")
+async def get_distance_matrix(origins: Optional[str] = None):
+    """Hop distances and unreachable airports, optionally for a comma-separated subset of origins"""
+    origin_codes = None
+    if origins:
+        origin_codes = [code.strip() for code in origins.split(',') if code.strip()]
+        missing = [code for code in origin_codes if not route_graph.has_airport(code)]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Airport not found: {', '.join(missing)}")
+    
+    result = distance_index.distances(origin_codes)
+    airports = result['airports']
+    matrix = result['matrix']
+    unreachable = {
+        origin: [airports[i] for i in (matrix[row] < 0).nonzero()[0]]
+        for row, origin in enumerate(result['origins'])
+    }
+    
+    return {
+        "airports": airports,
+        "origins": result['origins'],
+        "distances": matrix.tolist(),
+        "unreachable": unreachable,
+        "components": result['components']
+    }
+
+@api_router.get("/graph/itinerary/{start}/{end}")
+async def plan_flight_itinerary(
+    start: str,
+    end: str,
+    objective: str = "earliest_arrival",
+    depart_after: str = "00:00",
+    min_connection: int = 45,
+    max_layover: Optional[int] = None
+):
+    """Plan a time-aware itinerary using the departure schedule"""
+    if not route_graph.has_airport(start) or not route_graph.has_airport(end):
+        raise HTTPException(status_code=404, detail="Airport not found")
+    
+    if objective not in OBJECTIVES:
+        raise HTTPException(status_code=400, detail=f"Objective must be one of: {', '.join(OBJECTIVES)}")
+    
+    start_minutes = parse_departure_minutes(depart_after)
+    if start_minutes is None:
+        raise HTTPException(status_code=400, detail="depart_after must be in HH:MM format")
+    
+    if min_connection < 0 or (max_layover is not None and max_layover < 0):
+        raise HTTPException(status_code=400, detail="Connection windows must be non-negative")
+    
+    result = plan_itinerary(
+        route_graph, start, end,
+        depart_after=start_minutes,
+        min_connection=min_connection,
+        objective=objective,
+        max_layover=max_layover
+    )
+    if result is None:
+        return {"itinerary": [], "objective": objective, "message": "No itinerary found"}
+    return result
 
 # Validation API
 @api_router.post("/validate/passenger")
@@ -698,7 +1688,7 @@ async def validate_passenger_data(passenger: PassengerCreate):
     errors = []
     
     # Check flight exists
-    flight = await db.flights.find_one({"flight_id": passenger.flight_id}, {"_id": 0})
+    flight = await store.flights.get(passenger.flight_id)
     if not flight:
         errors.append("Flight does not exist")
     elif flight['booked_seats'] >= flight['total_seats']:
@@ -708,12 +1698,18 @@ async def validate_passenger_data(passenger: PassengerCreate):
     if not passenger.passport or len(passenger.passport) < 8:
         errors.append("Invalid passport number")
     
-    # Check seat number format
+    # Check seat number format and availability
     if not passenger.seat_number or len(passenger.seat_number) < 2:
         errors.append("Invalid seat number")
+    elif flight:
+        seat = seat_index(passenger.seat_number, flight['total_seats'])
+        if seat is None:
+            errors.append("Invalid seat number")
+        elif 'seat_words' in flight and not SeatMap(flight['seat_words'], flight['total_seats']).is_free(seat):
+            errors.append("Seat already taken")
     
     # Check duplicate passport
-    existing = await db.passengers.find_one({"passport": passenger.passport}, {"_id": 0})
+    existing = await store.passengers.find_by_passport(passenger.passport)
     if existing:
         errors.append("Passenger with this passport already exists")
     
@@ -723,22 +1719,150 @@ async def validate_passenger_data(passenger: PassengerCreate):
     }
 
 
+# Index provisioning and audit
+@api_router.get("/admin/index-audit")
+async def index_audit():
+    """Explain every hot query shape and report whether an index serves it"""
+    try:
+        results = await store.index_audit()
+    except NotImplementedError:
+        raise HTTPException(status_code=501, detail="Index audit needs the MongoDB backend")
+    return {
+        "queries": results,
+        "collection_scans": [result["query"] for result in results if not result["uses_index"]]
+    }
+
+@api_router.get("/admin/response-cache")
+async def get_response_cache_stats():
+    """Hit/miss counters and memory use of the GET response cache"""
+    versions = await store.versions.read()
+    return {**response_cache.stats(),
+            "versions": {**versions, **{name: version() for name, version in RESIDENT_VERSIONS.items()}}}
+
 app.include_router(api_router)
 
+# Response Cache
+# Cached GET path -> what its response is built from: collections, whose
+# versions live in the store and are bumped by every repository write, and
+# the resident structures it renders from this process's memory
+CACHED_ROUTES = {
+    "/api/airports": ("airports",),
+    "/api/flights": ("flights",),
+    "/api/passengers": ("passengers",),
+    "/api/passengers/hash-table": ("passengers", "ticket_index"),
+    "/api/graph/adjacency-list": ("airports", "flights", "route_graph"),
+    "/api/analytics": ("airports", "flights", "passengers", "stats"),
+    "/api/cancellations": ("cancellations",),
+    "/api/analytics/detailed": ("airports", "flights", "passengers", "boarding_queue"),
+    "/api/dashboard/snapshot": ("airports", "flights", "passengers", "boarding_queue", "cancellations", "stats",
+                                "route_graph", "ticket_index"),
+}
+
+# Resident structure -> its change counter. These only count this process's
+# changes, so they are qualified by PROCESS_EPOCH in cache keys.
+RESIDENT_VERSIONS = {
+    "route_graph": lambda: route_graph.version,
+    "ticket_index": lambda: ticket_index.version,
+}
+PROCESS_EPOCH = uuid.uuid4().hex
+
+async def current_versions(names) -> str:
+    versions = await store.versions.read()
+    parts = [versions['generation']]
+    for name in names:
+        if name in RESIDENT_VERSIONS:
+            parts.append(f"{name}={PROCESS_EPOCH}.{RESIDENT_VERSIONS[name]()}")
+        else:
+            parts.append(f"{name}={versions.get(name, 0)}")
+    return ",".join(parts)
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+@app.middleware("http")
+async def cache_responses(request: Request, call_next):
+    path = request.url.path
+    if request.method != "GET" or path not in CACHED_ROUTES:
+        return await call_next(request)
+    
+    # Versions are read before the handler runs, so data read later can only be newer than its key
+    key = f"{path}?{request.url.query}#{await current_versions(CACHED_ROUTES[path])}"
+    etag = '"' + hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '"'
+    validators = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=validators)
+    
+    cached = response_cache.get(key)
+    if cached is not None:
+        return Response(content=cached.body, headers={**cached.headers, **validators})
+    
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {name: response.headers[name] for name in ("content-type", "x-next-cursor") if name in response.headers}
+    response_cache.put(key, body, headers)
+    return Response(content=body, headers={**headers, **validators})
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Metrics
+# Added last so it wraps everything else and also times cached responses
+app.add_middleware(RequestMetrics, registry=metrics_registry, commands=command_metrics)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def ensure_indexes():
+    created = await store.ensure_indexes(logger)
+    logger.info("Ensured %d indexes", len(created))
+
+@app.on_event("startup")
+async def backfill_seat_inventory():
+    await rebuild_seat_inventory(only_missing=True)
+
+@app.on_event("startup")
+async def ensure_analytics_stats():
+    # Also recount documents from before per-flight counters moved to flight_stats
+    if not await store.stats.is_current():
+        await reconcile_stats()
+
+@app.on_event("startup")
+async def load_route_graph():
+    airports = await store.airports.all()
+    flights = await store.flights.all()
+    route_graph.load(airports, flights)
+    departure_scheduler.load(flights)
+    logger.info("Route graph loaded: %d airports, %d flights", len(route_graph), route_graph.flight_count)
+
+@app.on_event("startup")
+async def load_ticket_index():
+    ticket_index.clear()
+    async for passenger in store.passengers.scan():
+        index_passenger(passenger)
+    logger.info("Ticket index loaded: %d tickets in %d buckets", len(ticket_index), ticket_index.size)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    store.close()
+    if path_pool is not None:
+        path_pool.shutdown(cancel_futures=True)
@@ -0,0 +1,208 @@
+"""Compact columnar snapshots of the simulator collections.
+
+A snapshot stores each table column by column: integer columns as
+little-endian int64 arrays and string columns as uint32 ids into one
+shared string table, so repeated codes and flight ids are stored once.
+
+File layout::
+
+    b"FSSNAP01" | u64 header length | JSON header | padding | data blocks
+
+The header lists every table's row count and, per column, the offset and
+size of its block relative to the 8-byte aligned start of the data.
+Readers map the file and view columns in place with ``numpy.frombuffer``.
+"""
+import json
+import mmap
+import struct
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+MAGIC = b"FSSNAP01"
+VERSION = 1
+INT_COLUMN = "i64"
+STRING_COLUMN = "str"
+NULL_STRING = 0xFFFFFFFF
+_ALIGN = 8
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _ALIGN) * _ALIGN
+
+
+class TableBuilder:
+    """Accumulates one table's rows as columns"""
+
+    def __init__(self, writer: "SnapshotWriter", schema: Dict[str, str]):
+        self._writer = writer
+        self.schema = schema
+        self.columns: Dict[str, List[int]] = {name: [] for name in schema}
+        self.rows = 0
+
+    def append(self, doc: Dict):
+        self.extend([doc])
+
+    def extend(self, docs: List[Dict]):
+        """Append a batch of documents column by column"""
+        string_ids = self._writer.string_ids
+        for name, kind in self.schema.items():
+            values = [doc.get(name) for doc in docs]
+            if kind == INT_COLUMN:
+                self.columns[name].extend(map(int, values))
+            else:
+                # setdefault hands out the next id to strings seen for the first time
+                self.columns[name].extend(
+                    NULL_STRING if value is None else string_ids.setdefault(str(value), len(string_ids))
+                    for value in values
+                )
+        self.rows += len(docs)
+
+
+class SnapshotWriter:
+    """Builds a snapshot in memory and serialises it in one pass"""
+
+    def __init__(self):
+        self.tables: Dict[str, TableBuilder] = {}
+        self.string_ids: Dict[str, int] = {}
+
+    def table(self, name: str, schema: Dict[str, str]) -> TableBuilder:
+        self.tables[name] = TableBuilder(self, schema)
+        return self.tables[name]
+
+    def to_bytes(self, meta: Optional[Dict] = None) -> bytes:
+        blocks: List[bytes] = []
+        offset = 0
+
+        def add_block(data: bytes) -> Dict:
+            nonlocal offset
+            entry = {"offset": offset, "size": len(data)}
+            padded = _aligned(len(data))
+            blocks.append(data + b"\0" * (padded - len(data)))
+            offset += padded
+            return entry
+
+        tables = []
+        for name, table in self.tables.items():
+            columns = []
+            for column, kind in table.schema.items():
+                dtype = "<i8" if kind == INT_COLUMN else "<u4"
+                data = np.asarray(table.columns[column], dtype=dtype).tobytes()
+                columns.append({"name": column, "kind": kind, **add_block(data)})
+            tables.append({"name": name, "rows": table.rows, "columns": columns})
+
+        encoded = [value.encode("utf-8") for value in self.string_ids]
+        lengths = np.fromiter((len(value) for value in encoded), dtype="<u8", count=len(encoded))
+        offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+        np.cumsum(lengths, out=offsets[1:])
+        strings = {
+            "count": len(encoded),
+            "offsets": add_block(offsets.tobytes()),
+            "data": add_block(b"".join(encoded))
+        }
+
+        header = json.dumps({
+            "version": VERSION,
+            "meta": meta or {},
+            "tables": tables,
+            "strings": strings
+        }).encode("utf-8")
+        prefix = MAGIC + struct.pack("<Q", len(header)) + header
+        prefix += b"\0" * (_aligned(len(prefix)) - len(prefix))
+        return prefix + b"".join(blocks)
+
+
+class SnapshotReader:
+    """Memory-mapped view of a snapshot file"""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("Empty snapshot file")
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError("Not a snapshot file")
+        (header_size,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = json.loads(self._map[start:start + header_size])
+        if self.header.get("version") != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported snapshot version {self.header.get('version')}")
+        self._data = _aligned(start + header_size)
+        self._tables = {table["name"]: table for table in self.header["tables"]}
+        self._strings: Optional[np.ndarray] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    @property
+    def meta(self) -> Dict:
+        return self.header.get("meta", {})
+
+    def table_names(self) -> List[str]:
+        return list(self._tables)
+
+    def row_count(self, name: str) -> int:
+        return self._tables[name]["rows"]
+
+    def _block(self, entry: Dict, dtype: str) -> np.ndarray:
+        itemsize = np.dtype(dtype).itemsize
+        return np.frombuffer(self._map, dtype=dtype, count=entry["size"] // itemsize,
+                             offset=self._data + entry["offset"])
+
+    def strings(self) -> np.ndarray:
+        """The decoded string table as an object array, built on first use.
+
+        One extra trailing ``None`` entry stands in for null strings.
+        """
+        if self._strings is None:
+            table = self.header["strings"]
+            offsets = self._block(table["offsets"], "<u8").tolist()
+            start = self._data + table["data"]["offset"]
+            blob = self._map[start:start + table["data"]["size"]]
+            if blob.isascii():
+                # Byte offsets are character offsets, so decode once and slice
+                blob = blob.decode("ascii")
+                values = [blob[offsets[i]:offsets[i + 1]] for i in range(table["count"])]
+            else:
+                values = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(table["count"])]
+            self._strings = np.array(values + [None], dtype=object)
+        return self._strings
+
+    def column(self, table: str, column: str) -> np.ndarray:
+        for entry in self._tables[table]["columns"]:
+            if entry["name"] == column:
+                return self._block(entry, "<i8" if entry["kind"] == INT_COLUMN else "<u4")
+        raise KeyError(column)
+
+    def rows(self, name: str, batch_size: int = 1000) -> Iterator[List[Dict]]:
+        """Yield the table's rows as dicts, ``batch_size`` at a time"""
+        table = self._tables[name]
+        strings = self.strings()
+        names = [entry["name"] for entry in table["columns"]]
+        columns = [
+            (entry["kind"] == STRING_COLUMN, self.column(name, entry["name"]))
+            for entry in table["columns"]
+        ]
+        for start in range(0, table["rows"], batch_size):
+            stop = min(start + batch_size, table["rows"])
+            decoded = []
+            for is_string, values in columns:
+                chunk = values[start:stop]
+                if is_string:
+                    # NULL_STRING clamps onto the trailing None entry
+                    chunk = strings[np.minimum(chunk, len(strings) - 1)]
+                decoded.append(chunk.tolist())
+            yield [dict(zip(names, row)) for row in zip(*decoded)]
@@ -1,6 +1,9 @@
 import requests
+import os
 import sys
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 class DSALabAPITester:
@@ -139,6 +142,186 @@ class DSALabAPITester:
         
         return success
 
+    def test_route_planning(self):
+        """Test BFS, batched paths and itinerary planning"""
+        print("\n🧭 Testing Route Planning...")
+        
+        success, bfs = self.run_test("BFS Path (DEL-CCU)", "GET", "graph/bfs/DEL/CCU", 200)
+        if success:
+            path = bfs.get('path', [])
+            valid = bool(path) and path[0] == 'DEL' and path[-1] == 'CCU' and bfs.get('hops') == len(path) - 1
+            self.log_test("BFS Path Endpoints", valid, f"Path: {path}")
+        
+        pairs = [
+            {"source": "DEL", "destination": "CCU"},
+            {"source": "DEL", "destination": "MAA"},
+            {"source": "BOM", "destination": "HYD"},
+            {"source": "XXX", "destination": "DEL"}
+        ]
+        success, batch = self.run_test("Batch Paths", "POST", "graph/paths/batch", 200, {"pairs": pairs})
+        if success:
+            results = batch.get('results', [])
+            self.log_test("Batch Paths Preserve Order", [r['source'] for r in results] == [p['source'] for p in pairs])
+            self.log_test("Batch Paths Share Source Trees", batch.get('sources_searched') == 2,
+                          f"Sources searched: {batch.get('sources_searched')}")
+            if bfs and results:
+                self.log_test("Batch Path Matches BFS", len(results[0]['path']) == len(bfs.get('path', [])))
+        
+        success, itinerary = self.run_test("Itinerary (DEL-MAA)", "GET", "graph/itinerary/DEL/MAA", 200,
+                                           params={"depart_after": "07:00", "min_connection": 30})
+        if success:
+            legs = itinerary.get('itinerary', [])
+            chained = all(legs[i]['destination'] == legs[i + 1]['source'] for i in range(len(legs) - 1))
+            self.log_test("Itinerary Legs Connect", bool(legs) and chained and legs[-1]['destination'] == 'MAA')
+        
+        self.run_test("Itinerary Bad Objective (Should Fail)", "GET", "graph/itinerary/DEL/MAA", 400,
+                      params={"objective": "cheapest"})
+        
+        return True
+
+    def test_distance_matrix(self):
+        """Test hop distances on a small known graph and per-component updates"""
+        print("\n📐 Testing Distance Matrix...")
+        
+        def rows(matrix):
+            airports = matrix.get('airports', [])
+            return {
+                origin: dict(zip(airports, row))
+                for origin, row in zip(matrix.get('origins', []), matrix.get('distances', []))
+            }
+        
+        def flight(flight_id, source, destination):
+            return {"flight_id": flight_id, "source_code": source, "destination_code": destination,
+                    "departure_time": "23:00", "total_seats": 60}
+        
+        success, before = self.run_test("Distance Matrix (Sample Graph)", "GET", "graph/distance-matrix", 200)
+        if not success:
+            return False
+        
+        # TSA - TSB - TSC in one component, TSD on its own
+        for code in ("TSA", "TSB", "TSC", "TSD"):
+            self.run_test(f"Add Airport {code}", "POST", "airports", 200,
+                          {"code": code, "name": f"Test {code}", "city": "Test"})
+        self.run_test("Add Flight TS001", "POST", "flights", 200, flight("TS001", "TSA", "TSB"))
+        self.run_test("Add Flight TS002", "POST", "flights", 200, flight("TS002", "TSC", "TSB"))
+        
+        success, split = self.run_test("Distance Matrix (Test Component)", "GET", "graph/distance-matrix", 200,
+                                       params={"origins": "TSA,TSD"})
+        if success:
+            hops = rows(split)
+            expected = {"TSA": 0, "TSB": 1, "TSC": 2, "TSD": -1, "DEL": -1}
+            actual = {code: hops.get('TSA', {}).get(code) for code in expected}
+            self.log_test("Distance Matrix Hop Counts", actual == expected, f"Hops: {actual}")
+            self.log_test("Distance Matrix Unreachable",
+                          split.get('unreachable', {}).get('TSD') == [code for code in split['airports'] if code != 'TSD'],
+                          f"Unreachable: {split.get('unreachable', {}).get('TSD')}")
+            self.log_test("Distance Matrix Components", split.get('components') == before.get('components', 0) + 2,
+                          f"Components: {before.get('components')} -> {split.get('components')}")
+        
+        self.run_test("Add Flight TS003", "POST", "flights", 200, flight("TS003", "TSC", "TSD"))
+        success, joined = self.run_test("Distance Matrix After Add", "GET", "graph/distance-matrix", 200)
+        if success:
+            hops = rows(joined)
+            self.log_test("Added Flight Joins Components", hops.get('TSA', {}).get('TSD') == 3 and
+                          joined.get('components') == before.get('components', 0) + 1,
+                          f"TSA->TSD: {hops.get('TSA', {}).get('TSD')}, components: {joined.get('components')}")
+            # Sample airports still see exactly the distances they had before
+            unchanged = all(
+                {code: hops[origin][code] for code in row} == row
+                for origin, row in rows(before).items()
+            )
+            self.log_test("Added Flight Leaves Other Component", unchanged)
+        
+        self.run_test("Delete Flight TS003", "DELETE", "flights/TS003", 200)
+        success, split = self.run_test("Distance Matrix After Delete", "GET", "graph/distance-matrix", 200)
+        if success:
+            hops = rows(split)
+            self.log_test("Deleted Flight Splits Components", hops.get('TSA', {}).get('TSD') == -1 and
+                          hops.get('TSA', {}).get('TSC') == 2 and
+                          split.get('components') == before.get('components', 0) + 2,
+                          f"TSA->TSD: {hops.get('TSA', {}).get('TSD')}, components: {split.get('components')}")
+            unchanged = all(
+                {code: hops[origin][code] for code in row} == row
+                for origin, row in rows(before).items()
+            )
+            self.log_test("Deleted Flight Leaves Other Component", unchanged)
+        
+        self.run_test("Distance Matrix Unknown Origin (Should Fail)", "GET", "graph/distance-matrix", 404,
+                      params={"origins": "DEL,XXX"})
+        
+        for flight_id in ("TS001", "TS002"):
+            self.run_test(f"Delete Flight {flight_id}", "DELETE", f"flights/{flight_id}", 200)
+        for code in ("TSA", "TSB", "TSC", "TSD"):
+            self.run_test(f"Delete Airport {code}", "DELETE", f"airports/{code}", 200)
+        
+        return True
+
+    def test_path_streaming(self):
+        """Test NDJSON path enumeration in both modes"""
+        print("\n🧵 Testing Path Streaming...")
+        
+        def stream(name, params):
+            """Fetch an NDJSON path stream; returns its path lines and the final summary line"""
+            try:
+                response = requests.get(f"{self.api_url}/graph/paths/DEL/CCU", params=params, stream=True)
+                lines = [json.loads(line) for line in response.iter_lines() if line]
+            except Exception as e:
+                self.log_test(name, False, f"Exception: {str(e)}")
+                return [], {}
+            ok = response.status_code == 200 and response.headers.get('content-type', '').startswith('application/x-ndjson')
+            self.log_test(name, ok and bool(lines), f"Status: {response.status_code}, lines: {len(lines)}")
+            if not ok or not lines:
+                return [], {}
+            return lines[:-1], lines[-1]
+        
+        _, adj_list = self.run_test("Get Adjacency List", "GET", "graph/adjacency-list", 200)
+        edges = {(code, leg['destination']) for code, legs in adj_list.items() for leg in legs}
+        
+        def valid(line):
+            path = line.get('path', [])
+            return (
+                len(path) >= 2 and path[0] == 'DEL' and path[-1] == 'CCU' and len(set(path)) == len(path)
+                and line.get('hops') == len(path) - 1
+                and all((a, b) in edges for a, b in zip(path, path[1:]))
+            )
+        
+        success, bfs = self.run_test("BFS Path (DEL-CCU)", "GET", "graph/bfs/DEL/CCU", 200)
+        
+        shortest, summary = stream("Stream Shortest Paths", {"mode": "shortest", "k": 50})
+        hops = [line.get('hops') for line in shortest]
+        self.log_test("Shortest Paths Valid", bool(shortest) and all(valid(line) for line in shortest))
+        self.log_test("Shortest Paths Ordered By Hops", hops == sorted(hops) and bool(hops) and hops[0] == bfs.get('hops'),
+                      f"Hops: {hops}")
+        self.log_test("Shortest Paths Distinct", len({tuple(line['path']) for line in shortest}) == len(shortest))
+        self.log_test("Shortest Summary", summary.get('done') is True and summary.get('mode') == 'shortest' and
+                      summary.get('count') == len(shortest) and summary.get('stopped') == 'exhausted',
+                      f"Summary: {summary}")
+        
+        everything, summary = stream("Stream All Paths (max_hops=3)", {"mode": "all", "max_hops": 3})
+        self.log_test("All Paths Respect max_hops", bool(everything) and
+                      all(valid(line) and line['hops'] <= 3 for line in everything))
+        # Depth-first order differs, but both modes must find the same set of paths
+        self.log_test("All Paths Match Shortest Paths",
+                      sorted(tuple(line['path']) for line in everything) ==
+                      sorted(tuple(line['path']) for line in shortest if line['hops'] <= 3))
+        self.log_test("All Paths Summary", summary.get('done') is True and summary.get('mode') == 'all' and
+                      summary.get('count') == len(everything) and summary.get('stopped') == 'exhausted',
+                      f"Summary: {summary}")
+        
+        capped, summary = stream("Stream Shortest Paths (k=2)", {"mode": "shortest", "k": 2})
+        self.log_test("Shortest Paths k Cap", [line['path'] for line in capped] == [line['path'] for line in shortest[:2]] and
+                      summary.get('count') == 2 and summary.get('stopped') == 'limit', f"Summary: {summary}")
+        capped, summary = stream("Stream All Paths (k=1)", {"mode": "all", "k": 1})
+        self.log_test("All Paths k Cap", len(capped) == 1 and valid(capped[0]) and
+                      summary.get('count') == 1 and summary.get('stopped') == 'limit', f"Summary: {summary}")
+        
+        self.run_test("Stream Paths Bad Mode (Should Fail)", "GET", "graph/paths/DEL/CCU", 400, params={"mode": "longest"})
+        self.run_test("Stream Paths Zero k (Should Fail)", "GET", "graph/paths/DEL/CCU", 400, params={"k": 0})
+        self.run_test("Stream Paths Zero max_hops (Should Fail)", "GET", "graph/paths/DEL/CCU", 400, params={"max_hops": 0})
+        self.run_test("Stream Paths Unknown Airport (Should Fail)", "GET", "graph/paths/DEL/XXX", 404)
+        
+        return True
+
     def test_passengers_api(self):
         """Test Passenger APIs (Hash Table)"""
         print("\n👥 Testing Passenger APIs...")
@@ -167,6 +350,93 @@ class DSALabAPITester:
             ticket_id = passenger_data['ticket_id']
             success, _ = self.run_test("Search Passenger", "GET", f"passengers/search/{ticket_id}", 200)
         
+        # Walk the passenger list page by page using the next-cursor header
+        success, everyone = self.run_test("Get All Passengers", "GET", "passengers", 200)
+        if success:
+            walked, after = [], None
+            while True:
+                params = {"limit": 5, "after": after} if after else {"limit": 5}
+                response = requests.get(f"{self.api_url}/passengers", params=params)
+                walked += response.json()
+                after = response.headers.get('X-Next-Cursor')
+                if response.status_code != 200 or not after:
+                    break
+            self.log_test("Paginated Passengers Match Full List", walked == everyone,
+                          f"Walked {len(walked)}, expected {len(everyone)}")
+        
+        success, projected = self.run_test("Filter And Project Passengers", "GET", "passengers", 200,
+                                           params={"flight_id": "AI102", "fields": "ticket_id,status"})
+        if success:
+            self.log_test("Projected Passenger Fields",
+                          bool(projected) and all(set(p) == {"ticket_id", "status"} for p in projected))
+        self.run_test("Invalid Cursor (Should Fail)", "GET", "passengers", 400, params={"after": "not-a-cursor"})
+        
+        return True
+
+    def test_seat_inventory(self):
+        """Test seat map and atomic seat reservation under contention"""
+        print("\n💺 Testing Seat Inventory...")
+        
+        success, seat_map = self.run_test("Get Seat Map", "GET", "flights/AI103/seats", 200)
+        if success:
+            self.log_test("Seat Map Counts Booked Seats", seat_map.get('available') == seat_map.get('total_seats', 0) - seat_map.get('booked_seats', 0))
+        
+        success, suggestion = self.run_test("Suggest Seat Block", "GET", "flights/AI103/seats/next", 200, params={"count": 3})
+        if success:
+            self.log_test("Suggested Block Size", len(suggestion.get('seats', [])) == 3)
+        
+        # Labels outside the row/letter scheme are still accepted; they take capacity but no seat-map slot
+        _, before = self.run_test("Seat Map Before Free-Form Seat", "GET", "flights/AI104/seats", 200)
+        self.run_test("Book Free-Form Seat", "POST", "passengers", 200,
+                      {"name": "Free Seat", "passport": "P55555555", "flight_id": "AI104", "seat_number": "99Z"})
+        success, after = self.run_test("Seat Map After Free-Form Seat", "GET", "flights/AI104/seats", 200)
+        if success:
+            self.log_test("Free-Form Seat Takes Capacity Only",
+                          after.get('bitmap') == before.get('bitmap')
+                          and after.get('booked_seats') == before.get('booked_seats', 0) + 1
+                          and after.get('available') == before.get('available', 0) - 1,
+                          f"Before: {before.get('booked_seats')}, after: {after.get('booked_seats')}")
+        
+        def book(seat_number, flight_id, n):
+            passenger = {"name": f"Load Test {n}", "passport": f"PL{n:07d}", "flight_id": flight_id, "seat_number": seat_number}
+            return requests.post(f"{self.api_url}/passengers", json=passenger).status_code
+        
+        # Many clients race for the same seat: exactly one may win
+        workers = 20
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            codes = list(pool.map(lambda n: book("1A", "AI103", n), range(workers)))
+        winners = codes.count(200)
+        self.log_test(f"Same Seat Contention ({winners} of {workers} succeeded)", winners == 1, f"Status codes: {codes}")
+        
+        # Distinct seats on a small flight: capacity is never exceeded
+        flight = {"flight_id": "LOAD1", "source_code": "DEL", "destination_code": "BOM",
+                  "departure_time": "23:00", "total_seats": 12}
+        self.run_test("Create Small Flight", "POST", "flights", 200, flight)
+        seats = [f"{row}{letter}" for row in (1, 2) for letter in "ABCDEF"]
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            codes = list(pool.map(lambda n: book(seats[n % len(seats)], "LOAD1", n), range(len(seats) * 3)))
+        elapsed = time.time() - started
+        booked = codes.count(200)
+        self.log_test(f"No Overbooking ({booked} booked, {len(codes) / elapsed:.1f} req/s)", booked == len(seats),
+                      f"Status codes: {codes}")
+        
+        success, seat_map = self.run_test("Seat Map After Contention", "GET", "flights/LOAD1/seats", 200)
+        if success:
+            self.log_test("Booked Seats Match Bitmap", seat_map.get('booked_seats') == 12 and seat_map.get('available') == 0)
+        
+        # An imported passenger holds their seat on a flight that already has a bitmap
+        _, before = self.run_test("Seat Map Before Import", "GET", "flights/AI102/seats", 200)
+        imported = {"ticket_id": "TKTIMPSEAT1", "name": "Imported Seat", "passport": "P66666666",
+                    "flight_id": "AI102", "seat_number": "6A", "status": "pending"}
+        self.run_test("Import Passenger", "POST", "import/data", 200, {"passengers": [imported]})
+        success, after = self.run_test("Seat Map After Import", "GET", "flights/AI102/seats", 200)
+        if success:
+            self.log_test("Import Counts Booked Seat", after.get('booked_seats') == before.get('booked_seats', 0) + 1,
+                          f"Before: {before.get('booked_seats')}, after: {after.get('booked_seats')}")
+        self.run_test("Book Imported Seat (Should Fail)", "POST", "passengers", 400,
+                      {"name": "Seat Thief", "passport": "P77777777", "flight_id": "AI102", "seat_number": "6A"})
+        
         return True
 
     def test_hash_table(self):
@@ -174,16 +444,22 @@ class DSALabAPITester:
         print("\n🔢 Testing Hash Table...")
         
         success, hash_table = self.run_test("Get Hash Table", "GET", "passengers/hash-table", 200)
-        if success:
-            # Verify hash table structure (buckets 0-9)
-            expected_buckets = set(str(i) for i in range(10))
+        _, stats = self.run_test("Get Hash Table Stats", "GET", "passengers/hash-table/stats", 200)
+        if success and stats:
+            # The table grows as it fills, so its bucket count comes from the stats
+            expected_buckets = set(str(i) for i in range(stats.get('size', 0)))
             actual_buckets = set(hash_table.keys())
             
             if expected_buckets == actual_buckets:
-                self.log_test("Hash Table Buckets (0-9)", True)
+                self.log_test(f"Hash Table Buckets (0-{stats['size'] - 1})", True)
             else:
                 self.log_test("Hash Table Buckets", False, f"Expected {expected_buckets}, got {actual_buckets}")
             
+            entries = sum(len(bucket) for bucket in hash_table.values())
+            self.log_test("Hash Table Stats Match Entries", stats.get('entries') == entries,
+                          f"Stats: {stats.get('entries')}, Table: {entries}")
+            self.log_test("Hash Table Load Factor Bounded", stats.get('load_factor', 1) <= stats.get('max_load', 0))
+            
             # Check for collisions
             collisions = sum(1 for bucket in hash_table.values() if len(bucket) > 1)
             self.log_test(f"Hash Collisions Detection ({collisions} found)", True)
@@ -207,6 +483,16 @@ class DSALabAPITester:
         if success and 'boarded' in dequeue_result:
             self.log_test("Dequeue Returns Boarded Passenger", True)
         
+        # Test group boarding
+        group_flight = "AI102"
+        success, _ = self.run_test("Bulk Enqueue Group", "POST", "boarding-queue/bulk-enqueue", 200,
+                                   ["TKTGHI11223", "TKTJKL44556"], params={"flight_id": group_flight})
+        success, group_result = self.run_test("Dequeue Group (count=2)", "POST", f"boarding-queue/{group_flight}/dequeue", 200,
+                                              params={"count": 2})
+        if success:
+            boarded = [item['ticket_id'] for item in group_result.get('boarded', [])]
+            self.log_test("Group Dequeue Keeps FIFO Order", boarded == ["TKTGHI11223", "TKTJKL44556"], f"Boarded: {boarded}")
+        
         return True
 
     def test_cancellation_stack(self):
@@ -241,13 +527,73 @@ class DSALabAPITester:
             else:
                 self.log_test("Heap Sort Verification", True, "Single or no flights")
         
+            success, upcoming = self.run_test("Next Departures (k=3)", "GET", "scheduler/next", 200, params={"k": 3})
+            if success:
+                self.log_test("Next Departures Are Heap Prefix",
+                              [f['flight_id'] for f in upcoming] == [f['flight_id'] for f in heap_flights[:3]])
+            
+            success, window = self.run_test("Departures Between 09:00-12:00", "GET", "scheduler/between", 200,
+                                            params={"start": "09:00", "end": "12:00"})
+            if success:
+                expected = [f['flight_id'] for f in heap_flights if "09:00" <= f['departure_time'] <= "12:00"]
+                self.log_test("Departure Window Matches Heap", [f['flight_id'] for f in window] == expected)
+        
         return success
 
+    def test_page_size(self):
+        """Test the default page size and walking a collection by cursor"""
+        print("\n📄 Testing Page Size...")
+        
+        codes = [f"PG{i:03d}" for i in range(150)]
+        airports = [{"id": f"paging-{code}", "code": code, "name": f"Paging {code}", "city": "Paging"} for code in codes]
+        self.run_test("Import Paging Airports", "POST", "import/data", 200, {"airports": airports})
+        
+        response = requests.get(f"{self.api_url}/airports")
+        first = response.json() if response.status_code == 200 else []
+        self.log_test("Omitted Limit Returns Default Page", len(first) == 100 and bool(response.headers.get('X-Next-Cursor')),
+                      f"Got {len(first)}, cursor: {response.headers.get('X-Next-Cursor')}")
+        
+        walked, after = list(first), response.headers.get('X-Next-Cursor')
+        while after:
+            response = requests.get(f"{self.api_url}/airports", params={"after": after})
+            if response.status_code != 200:
+                break
+            walked += response.json()
+            after = response.headers.get('X-Next-Cursor')
+        self.log_test("Cursor Walk Reaches Every Airport", set(codes) <= {a['code'] for a in walked} and
+                      len({a['code'] for a in walked}) == len(walked), f"Walked {len(walked)}")
+        
+        success, snapshot = self.run_test("Snapshot Airports Past One Page", "GET", "dashboard/snapshot", 200,
+                                          params={"sections": "airports"})
+        if success:
+            self.log_test("Snapshot Returns Every Airport", snapshot.get('airports') == walked,
+                          f"Snapshot: {len(snapshot.get('airports', []))}, walked: {len(walked)}")
+        
+        self.run_test("Limit Above Maximum (Should Fail)", "GET", "airports", 400, params={"limit": 1001})
+        
+        for code in codes:
+            requests.delete(f"{self.api_url}/airports/{code}")
+        
+        return True
+
     def test_analytics(self):
         """Test Analytics Dashboard"""
         print("\n📈 Testing Analytics...")
         
+        # Flight ids are free-form; dots and dollars must not leak into counter field paths
+        for flight_id, departure in (("DOT.1", "00:01"), ("$DLR", "00:02")):
+            self.run_test(f"Create Flight {flight_id}", "POST", "flights", 200,
+                          {"flight_id": flight_id, "source_code": "DEL", "destination_code": "BOM",
+                           "departure_time": departure, "total_seats": 6})
+            self.run_test(f"Book On {flight_id}", "POST", "passengers", 200,
+                          {"name": "Odd Id", "passport": "P12121212", "flight_id": flight_id, "seat_number": "1A"})
+        
         success, analytics = self.run_test("Get Analytics", "GET", "analytics", 200)
+        if success:
+            upcoming = analytics.get('upcoming_flight') or {}
+            self.log_test("Upcoming Flight Counts Its Bookings",
+                          upcoming.get('flight_id') == "DOT.1" and upcoming.get('booked_seats') == 1,
+                          f"Upcoming: {upcoming}")
         if success:
             required_fields = ['total_airports', 'total_flights', 'total_tickets', 'boarded', 'cancelled', 'pending']
             missing_fields = [field for field in required_fields if field not in analytics]
@@ -268,9 +614,211 @@ class DSALabAPITester:
             else:
                 self.log_test("Analytics Count Consistency", False, 
                             f"Total: {total_tickets}, Sum: {boarded + cancelled + pending}")
+            
+            # Incrementally maintained counters must match a full recount
+            rebuilt, _ = self.run_test("Reconcile Analytics", "POST", "analytics/reconcile", 200)
+            if rebuilt:
+                _, recounted = self.run_test("Get Analytics After Reconcile", "GET", "analytics", 200)
+                self.log_test("Analytics Counters Match Recount", recounted == analytics,
+                            f"Incremental: {analytics}, Recount: {recounted}")
         
         return success
 
+    def test_data_export(self):
+        """Test streaming NDJSON export/import and binary snapshots"""
+        print("\n📦 Testing Data Export...")
+        
+        try:
+            response = requests.get(f"{self.api_url}/export/stream", params={"batch_size": 5}, stream=True)
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+        except Exception as e:
+            self.log_test("Stream Export", False, f"Exception: {str(e)}")
+            return False
+        
+        self.log_test("Stream Export", response.status_code == 200, f"Status: {response.status_code}")
+        header, records, trailer = lines[0], lines[1:-1], lines[-1]
+        self.log_test("Export Header And Trailer Match",
+                      header.get('type') == 'header' and trailer.get('type') == 'trailer'
+                      and header.get('snapshot') == trailer.get('snapshot'))
+        
+        counted = {}
+        for record in records:
+            counted[record['collection']] = counted.get(record['collection'], 0) + 1
+        expected = {name: count for name, count in trailer.get('counts', {}).items() if count}
+        self.log_test("Export Trailer Counts Records", counted == expected, f"Records: {counted}, Trailer: {expected}")
+        
+        # Re-import the same export as upserts; a truncated copy must be flagged incomplete
+        body = "\n".join(json.dumps(line) for line in lines)
+        response = requests.post(f"{self.api_url}/import/stream", params={"mode": "upsert"}, data=body)
+        summary = response.json() if response.status_code == 200 else {}
+        self.log_test("Stream Import Upsert", response.status_code == 200 and summary.get('complete') and not summary.get('failed'),
+                      f"Status: {response.status_code}, Summary: {summary}")
+        
+        truncated = "\n".join(json.dumps(line) for line in lines[:-1])
+        response = requests.post(f"{self.api_url}/import/stream", params={"mode": "upsert"}, data=truncated)
+        self.log_test("Truncated Import Flagged Incomplete", response.status_code == 200 and response.json().get('complete') is False)
+        
+        # Non-object lines are reported per line; an imported passenger holds their seat
+        passenger = {"ticket_id": "TKTSTRSEAT1", "name": "Streamed Seat", "passport": "P88888888",
+                     "flight_id": "AI101", "seat_number": "5A", "status": "pending"}
+        body = "\n".join(['123', '"x"', '[1]', json.dumps({"collection": "passengers", "data": passenger})])
+        response = requests.post(f"{self.api_url}/import/stream", data=body)
+        summary = response.json() if response.status_code == 200 else {}
+        self.log_test("Stream Import Reports Non-Object Lines",
+                      [error['line'] for error in summary.get('errors', [])] == [1, 2, 3]
+                      and summary.get('written', {}).get('passengers') == 1,
+                      f"Status: {response.status_code}, Summary: {summary}")
+        self.run_test("Book Streamed Seat (Should Fail)", "POST", "passengers", 400,
+                      {"name": "Seat Thief", "passport": "P99999999", "flight_id": "AI101", "seat_number": "5A"})
+
+        # Binary snapshot round trip restores the same row counts
+        success, saved = self.run_test("Save Snapshot", "POST", "snapshots/backend-test", 200)
+        if success:
+            success, restored = self.run_test("Restore Snapshot", "POST", "snapshots/backend-test/restore", 200)
+            if success:
+                self.log_test("Snapshot Restores All Rows", restored.get('rows') == saved.get('rows'),
+                              f"Saved: {saved.get('rows')}, Restored: {restored.get('rows')}")
+        
+        return True
+
+    def test_index_audit(self):
+        """Test that every hot query shape is served by an index"""
+        print("\n🗂️ Testing Index Audit...")
+        
+        if requests.get(f"{self.api_url}/admin/index-audit").status_code == 501:
+            print("⏭️  Skipped - the index audit needs the MongoDB backend")
+            return True
+        
+        success, audit = self.run_test("Index Audit", "GET", "admin/index-audit", 200)
+        if success:
+            scans = audit.get('collection_scans', [])
+            self.log_test("Hot Queries Use Indexes", not scans, f"Collection scans: {scans}")
+        
+        return success
+
+    def test_dashboard_snapshot(self):
+        """Test the combined dashboard payload against the standalone endpoints"""
+        print("\n🧩 Testing Dashboard Snapshot...")
+        
+        success, snapshot = self.run_test("Dashboard Snapshot", "GET", "dashboard/snapshot", 200)
+        if success:
+            _, flights = self.run_test("Get Flights For Snapshot", "GET", "flights", 200)
+            self.log_test("Snapshot Flights Match", snapshot.get('flights') == flights,
+                          f"Snapshot: {len(snapshot.get('flights', []))}, standalone: {len(flights)}")
+            for flight_id, queue in snapshot.get('boarding_queues', {}).items():
+                _, standalone = self.run_test(f"Get Queue {flight_id}", "GET", f"boarding-queue/{flight_id}", 200)
+                self.log_test(f"Snapshot Queue {flight_id} Matches", queue == standalone, f"Snapshot: {queue}")
+        
+        success, partial = self.run_test("Dashboard Snapshot Sections", "GET", "dashboard/snapshot", 200,
+                                         params={"sections": "analytics,cancellations"})
+        if success:
+            self.log_test("Only Requested Sections Returned", sorted(partial) == ["analytics", "cancellations"],
+                          f"Sections: {sorted(partial)}")
+        self.run_test("Unknown Snapshot Section", "GET", "dashboard/snapshot", 400, params={"sections": "bogus"})
+        
+        return success
+
+    def test_change_feed(self):
+        """Test the server-sent change events stream and resume tokens"""
+        print("\n📡 Testing Change Feed...")
+        
+        def read_events(response, count):
+            events, current = [], {}
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    field, _, value = line.partition(": ")
+                    current[field] = value
+                else:
+                    if 'data' in current:
+                        events.append(current)
+                    current = {}
+                    if len(events) >= count:
+                        break
+            return events
+        
+        with requests.get(f"{self.api_url}/events", stream=True, timeout=10) as response:
+            self.log_test("Open Event Stream", response.status_code == 200, f"Status: {response.status_code}")
+            self.run_test("Create Event Probe Airport", "POST", "airports", 200,
+                          {"code": "EVT", "name": "Event Probe Airport", "city": "Probe"})
+            self.run_test("Delete Event Probe Airport", "DELETE", "airports/EVT", 200)
+            events = read_events(response, 2)
+        
+        ops = [json.loads(event['data'])['op'] for event in events]
+        self.log_test("Write Events Published", ops == ["create", "delete"], f"Ops: {ops}")
+        if len(events) < 2:
+            return False
+        
+        # Resuming after the first event replays only the second
+        with requests.get(f"{self.api_url}/events", headers={'Last-Event-ID': events[0]['id']},
+                          stream=True, timeout=10) as response:
+            replayed = read_events(response, 1)
+        self.log_test("Resume From Token", replayed and replayed[0]['id'] == events[1]['id'], f"Replayed: {replayed}")
+        
+        with requests.get(f"{self.api_url}/events", headers={'Last-Event-ID': 'stale-1'},
+                          stream=True, timeout=10) as response:
+            reload = read_events(response, 1)
+        self.log_test("Stale Token Requests Reload", reload and reload[0].get('event') == 'reload', f"Events: {reload}")
+        
+        return bool(replayed)
+
+    def test_response_cache(self):
+        """Test ETag revalidation and invalidation on writes"""
+        print("\n🧊 Testing Response Cache...")
+        
+        first = requests.get(f"{self.api_url}/airports")
+        etag = first.headers.get('ETag')
+        self.log_test("Cached GET Returns ETag", first.status_code == 200 and bool(etag), f"Headers: {dict(first.headers)}")
+        if not etag:
+            return False
+        
+        unchanged = requests.get(f"{self.api_url}/airports", headers={'If-None-Match': etag})
+        self.log_test("Unchanged Data Returns 304", unchanged.status_code == 304, f"Status: {unchanged.status_code}")
+        
+        _, before = self.run_test("Response Cache Stats Before Write", "GET", "admin/response-cache", 200)
+        self.run_test("Create Cache Probe Airport", "POST", "airports", 200,
+                      {"code": "ETG", "name": "Cache Probe Airport", "city": "Probe"})
+        changed = requests.get(f"{self.api_url}/airports", headers={'If-None-Match': etag})
+        self.log_test("Write Invalidates ETag",
+                      changed.status_code == 200 and any(a['code'] == 'ETG' for a in changed.json()),
+                      f"Status: {changed.status_code}")
+        self.run_test("Delete Cache Probe Airport", "DELETE", "airports/ETG", 200)
+        
+        success, stats = self.run_test("Response Cache Stats", "GET", "admin/response-cache", 200)
+        if success:
+            self.log_test("Cache Within Memory Bound", stats['bytes'] <= stats['max_bytes'], f"Stats: {stats}")
+            airports_before = before.get('versions', {}).get('airports', 0)
+            self.log_test("Writes Bump Shared Version", stats['versions'].get('airports', 0) >= airports_before + 2,
+                          f"Before: {before.get('versions')}, after: {stats['versions']}")
+        
+        return success
+
+    def test_metrics(self):
+        """Test the Prometheus metrics endpoint"""
+        print("\n📈 Testing Metrics...")
+        
+        requests.get(f"{self.api_url}/airports")
+        response = requests.get(f"{self.base_url}/metrics")
+        self.log_test("Metrics Endpoint", response.status_code == 200 and
+                      response.headers.get('content-type', '').startswith('text/plain'),
+                      f"Status: {response.status_code}")
+        if response.status_code != 200:
+            return False
+        
+        text = response.text
+        route = 'method="GET",route="/api/airports"'
+        self.log_test("Latency Histogram By Route",
+                      f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}' in text, "Missing airports series")
+        self.log_test("Response Size Histogram", f'http_response_size_bytes_count{{{route}}}' in text,
+                      "Missing size series")
+        # Route templates, not raw paths, keep label cardinality bounded
+        requests.get(f"{self.api_url}/flights/NOPE1/seats")
+        text = requests.get(f"{self.base_url}/metrics").text
+        self.log_test("Labels Use Route Templates", 'route="/api/flights/{flight_id}/seats"' in text and
+                      'NOPE1' not in text, "Raw path leaked into labels")
+        self.log_test("In-Flight Gauge", 'http_requests_in_flight{method="GET"}' in text, "Missing gauge")
+        
+        return True
+
     def run_all_tests(self):
         """Run comprehensive test suite"""
         print("🚀 Starting DSA Lab API Testing...")
@@ -282,12 +830,23 @@ class DSALabAPITester:
             self.test_airports_api,
             self.test_flights_api,
             self.test_adjacency_list,
+            self.test_route_planning,
+            self.test_distance_matrix,
+            self.test_path_streaming,
             self.test_passengers_api,
+            self.test_seat_inventory,
             self.test_hash_table,
             self.test_boarding_queue,
             self.test_cancellation_stack,
             self.test_flight_scheduler_heap,
-            self.test_analytics
+            self.test_data_export,
+            self.test_index_audit,
+            self.test_response_cache,
+            self.test_dashboard_snapshot,
+            self.test_change_feed,
+            self.test_metrics,
+            self.test_analytics,
+            self.test_page_size
         ]
         
         for test in tests:
@@ -305,7 +864,9 @@ class DSALabAPITester:
         return self.tests_passed == self.tests_run
 
 def main():
-    tester = DSALabAPITester()
+    # e.g. BACKEND_URL=http://localhost:8001 against `STORAGE_BACKEND=memory uvicorn server:app --port 8001`
+    backend_url = os.environ.get("BACKEND_URL")
+    tester = DSALabAPITester(backend_url) if backend_url else DSALabAPITester()
     success = tester.run_all_tests()
     return 0 if success else 1
 
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import axios from 'axios';
 import { EnhancedGraphVisualization } from './EnhancedGraphVisualization';
 import { EnhancedHashTableVisualization } from './EnhancedHashTableVisualization';
@@ -22,6 +22,23 @@ import html2canvas from 'html2canvas';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Server-computed sections a change leaves stale after its local patch
+const DERIVED_SECTIONS = {
+  airport: ['adjacency_list', 'analytics', 'detailed_analytics'],
+  flight: ['adjacency_list', 'analytics', 'detailed_analytics'],
+  passenger: ['hash_table', 'analytics', 'detailed_analytics'],
+  boarding_queue: ['hash_table', 'analytics', 'detailed_analytics'],
+  cancellation: ['hash_table', 'analytics', 'detailed_analytics'],
+};
+// Refetches triggered by the change stream run at most this often
+const REFRESH_INTERVAL_MS = 30000;
+
+const parseEventId = (token) => {
+  const split = (token || '').lastIndexOf('-');
+  if (split < 1) return null;
+  return { epoch: token.slice(0, split), seq: Number(token.slice(split + 1)) };
+};
+
 export const Dashboard = () => {
   const [airports, setAirports] = useState([]);
   const [flights, setFlights] = useState([]);
@@ -52,55 +69,166 @@ export const Dashboard = () => {
     loadData();
   }, []);
 
-  // Auto-refresh functionality
-  useEffect(() => {
-    if (autoRefresh) {
-      const interval = setInterval(() => {
-        loadData();
-        toast.info('Data refreshed automatically', { duration: 2000 });
-      }, 30000); // Refresh every 30 seconds
-      return () => clearInterval(interval);
+  const applySnapshot = useCallback((data) => {
+    if (data.airports) setAirports(data.airports);
+    if (data.flights) setFlights(data.flights);
+    if (data.passengers) setPassengers(data.passengers);
+    if (data.hash_table) setHashTable(data.hash_table);
+    if (data.adjacency_list) setAdjacencyList(data.adjacency_list);
+    if (data.analytics) setAnalytics(data.analytics);
+    if (data.cancellations) setCancellations(data.cancellations);
+    if (data.detailed_analytics) setDetailedAnalytics(data.detailed_analytics);
+
+    if (data.boarding_queues) {
+      if (data.flights) {
+        const queueMap = {};
+        data.flights.forEach(f => {
+          queueMap[f.flight_id] = data.boarding_queues[f.flight_id] || [];
+        });
+        setBoardingQueues(queueMap);
+      } else {
+        setBoardingQueues(prev => {
+          const queueMap = {};
+          Object.keys(prev).forEach(id => {
+            queueMap[id] = data.boarding_queues[id] || [];
+          });
+          return queueMap;
+        });
+      }
     }
-  }, [autoRefresh]);
+  }, []);
 
   const loadData = useCallback(async () => {
     try {
-      const [airportsRes, flightsRes, passengersRes, hashTableRes, adjListRes, analyticsRes, cancellationsRes, detailedAnalyticsRes] = await Promise.all([
-        axios.get(`${API}/airports`),
-        axios.get(`${API}/flights`),
-        axios.get(`${API}/passengers`),
-        axios.get(`${API}/passengers/hash-table`),
-        axios.get(`${API}/graph/adjacency-list`),
-        axios.get(`${API}/analytics`),
-        axios.get(`${API}/cancellations`),
-        axios.get(`${API}/analytics/detailed`)
-      ]);
-
-      setAirports(airportsRes.data);
-      setFlights(flightsRes.data);
-      setPassengers(passengersRes.data);
-      setHashTable(hashTableRes.data);
-      setAdjacencyList(adjListRes.data);
-      setAnalytics(analyticsRes.data);
-      setCancellations(cancellationsRes.data);
-      setDetailedAnalytics(detailedAnalyticsRes.data);
-
-      const queuePromises = flightsRes.data.map(f => 
-        axios.get(`${API}/boarding-queue/${f.flight_id}`)
-          .then(res => ({ flight_id: f.flight_id, queue: res.data }))
-      );
-      const queues = await Promise.all(queuePromises);
-      const queueMap = {};
-      queues.forEach(q => {
-        queueMap[q.flight_id] = q.queue;
-      });
-      setBoardingQueues(queueMap);
+      const { data } = await axios.get(`${API}/dashboard/snapshot`);
+      applySnapshot(data);
     } catch (error) {
       console.error('Error loading data:', error);
       toast.error('Failed to load data');
     }
+  }, [applySnapshot]);
+
+  const loadSections = useCallback(async (sections) => {
+    try {
+      const { data } = await axios.get(`${API}/dashboard/snapshot`, { params: { sections: sections.join(',') } });
+      applySnapshot(data);
+    } catch (error) {
+      console.error('Error loading data:', error);
+    }
+  }, [applySnapshot]);
+
+  // Patch local state from one change event; returns the sections still to refetch
+  const applyChange = useCallback((event) => {
+    const { entity, op, id, flight_id: flightId, data } = event;
+    const stale = [...(DERIVED_SECTIONS[entity] || [])];
+    const ticketIds = data.ticket_ids || (id ? [id] : []);
+    const dropFromQueue = (ids) => setBoardingQueues(prev => prev[flightId] ? {
+      ...prev,
+      [flightId]: prev[flightId].filter(item => !ids.includes(item.ticket_id))
+        .map((item, position) => ({ ...item, position }))
+    } : prev);
+    const setStatus = (ids, status) => setPassengers(prev => prev.map(p => ids.includes(p.ticket_id) ? { ...p, status } : p));
+    const bookSeats = (delta) => setFlights(prev => prev.map(f => f.flight_id === flightId ? { ...f, booked_seats: f.booked_seats + delta } : f));
+
+    if (entity === 'airport' && op === 'create') {
+      setAirports(prev => [...prev.filter(a => a.code !== id), data]);
+    } else if (entity === 'airport' && op === 'delete') {
+      setAirports(prev => prev.filter(a => a.code !== id));
+    } else if (entity === 'flight' && op === 'create') {
+      setFlights(prev => [...prev.filter(f => f.flight_id !== id), data]);
+      setBoardingQueues(prev => ({ ...prev, [id]: prev[id] || [] }));
+    } else if (entity === 'flight' && op === 'delete') {
+      setFlights(prev => prev.filter(f => f.flight_id !== id));
+      setBoardingQueues(prev => {
+        const queueMap = { ...prev };
+        delete queueMap[id];
+        return queueMap;
+      });
+    } else if (entity === 'passenger' && op === 'create') {
+      if (id) {
+        setPassengers(prev => [...prev, { ticket_id: id, flight_id: flightId, name: data.name, seat_number: data.seat_number, status: data.status }]);
+      } else {
+        // Bulk bookings only carry ticket ids
+        stale.push('passengers');
+      }
+      bookSeats(ticketIds.length);
+    } else if (entity === 'boarding_queue' && op === 'enqueue') {
+      if (id) {
+        setBoardingQueues(prev => ({
+          ...prev,
+          [flightId]: [...(prev[flightId] || []), { ticket_id: id, passenger_name: data.passenger_name, flight_id: flightId, position: data.position }]
+        }));
+      } else {
+        stale.push('boarding_queues');
+      }
+    } else if (entity === 'boarding_queue' && op === 'board') {
+      dropFromQueue(ticketIds);
+      setStatus(ticketIds, data.status);
+    } else if (entity === 'cancellation' && op === 'push') {
+      setCancellations(prev => [{ ticket_id: id, passenger_name: data.passenger_name, flight_id: flightId, timestamp: data.timestamp }, ...prev]);
+      dropFromQueue(ticketIds);
+      setStatus(ticketIds, data.status);
+      bookSeats(-1);
+    } else if (entity === 'cancellation' && op === 'pop') {
+      setCancellations(prev => prev.filter(c => c.ticket_id !== id));
+    } else {
+      // System-wide changes (reset, imports, restores) and anything unrecognised
+      return null;
+    }
+    return stale;
   }, []);
 
+  // Sections waiting to be refetched; null in `sections` means the full snapshot
+  const refresh = useRef({ timer: null, sections: new Set(), last: 0 });
+
+  const scheduleRefresh = useCallback((sections) => {
+    const state = refresh.current;
+    if (sections === null || state.sections === null) {
+      state.sections = null;
+    } else {
+      sections.forEach(name => state.sections.add(name));
+    }
+    if (state.timer || (state.sections && state.sections.size === 0)) return;
+    const wait = Math.max(0, state.last + REFRESH_INTERVAL_MS - Date.now());
+    state.timer = setTimeout(() => {
+      const pending = state.sections;
+      state.timer = null;
+      state.sections = new Set();
+      state.last = Date.now();
+      if (pending === null) {
+        loadData();
+      } else {
+        loadSections([...pending]);
+      }
+    }, wait);
+  }, [loadData, loadSections]);
+
+  // Auto-refresh functionality: patch state from the change stream, falling
+  // back to a full snapshot after a reset or a gap in the sequence
+  useEffect(() => {
+    if (autoRefresh) {
+      let last = null;
+      const onChange = (e) => {
+        const token = parseEventId(e.lastEventId);
+        const gap = last && token && (token.epoch !== last.epoch || token.seq !== last.seq + 1);
+        last = token;
+        scheduleRefresh(gap ? null : applyChange(JSON.parse(e.data)));
+      };
+      const onReload = (e) => {
+        last = parseEventId(e.lastEventId);
+        scheduleRefresh(null);
+      };
+      const events = new EventSource(`${API}/events`);
+      events.onmessage = onChange;
+      events.addEventListener('reload', onReload);
+      return () => {
+        events.close();
+        clearTimeout(refresh.current.timer);
+        refresh.current = { timer: null, sections: new Set(), last: refresh.current.last };
+      };
+    }
+  }, [autoRefresh, applyChange, scheduleRefresh]);
+
   const initializeData = async () => {
     setLoading(true);
     try {